@@ -1,7 +1,11 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
-from .models import list_lowongan, list_perusahaan, list_home, list_distinct_options, list_options
+from . import export
+from .cache import response_cache
+from .models import (list_lowongan, list_perusahaan, list_home, list_options,
+                     iter_lowongan_export, LOWONGAN_API_COLS)
 
 app = FastAPI(title="MagangPulse API", version="1.1.0")
 
@@ -13,17 +17,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# endpoint baca di bawah dilayani lewat response_cache (key = path + query, versi = snapshot scrape):
+# request berulang tidak menyentuh DB sampai scraper menaikkan site_stats.snapshot_id; ETag/304 didukung
+
 @app.get("/api/home")
-def api_home():
-    stats, timeline = list_home()
-    return {"stats": stats, "timeline": timeline}
+def api_home(request: Request):
+    def build():
+        stats, timeline = list_home()
+        return {"stats": stats, "timeline": timeline}
+    return response_cache.respond(request, build)
 
 @app.get("/api/options")
-def api_options():
-    return list_options()
+def api_options(request: Request):
+    return response_cache.respond(request, list_options)
 
 @app.get("/api/lowongan")
 def api_lowongan(
+    request: Request,
     page: int = 1,
     page_size: int = 20,
     query: Optional[str] = None,
@@ -36,17 +46,70 @@ def api_lowongan(
     max_pelamar: Optional[int] = None,
     min_kuota: Optional[int] = None,
     max_kuota: Optional[int] = None,
+    sort: str = "recent",
+    cursor: Optional[str] = None,
+    with_total: Optional[bool] = None,
+):
+    # cursor = next_cursor dari respons sebelumnya (keyset, menggantikan page); total hanya di halaman pertama
+    # kecuali with_total=true
+    def build():
+        try:
+            items, total, next_cursor = list_lowongan(page, page_size, query, perusahaan, lokasi, sektor,
+                                                      min_ar, max_ar, min_pelamar, max_pelamar,
+                                                      min_kuota, max_kuota, sort, cursor, with_total)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"data": items, "total": total, "page": page, "page_size": page_size,
+                "next_cursor": next_cursor, "snapshot": True}
+    return response_cache.respond(request, build)
+
+@app.get("/api/lowongan/export")
+def api_lowongan_export(
+    request: Request,
+    format: str = "csv",
+    query: Optional[str] = None,
+    perusahaan: Optional[List[str]] = Query(None),
+    lokasi: Optional[List[str]] = Query(None),
+    sektor: Optional[List[str]] = Query(None),
+    min_ar: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_ar: Optional[float] = Query(None, ge=0.0, le=1.0),
+    min_pelamar: Optional[int] = None,
+    max_pelamar: Optional[int] = None,
+    min_kuota: Optional[int] = None,
+    max_kuota: Optional[int] = None,
     sort: str = "recent"
 ):
-    items, total = list_lowongan(page, page_size, query, perusahaan, lokasi, sektor,
-                                 min_ar, max_ar, min_pelamar, max_pelamar,
-                                 min_kuota, max_kuota, sort)
-    return {"data": items, "total": total, "page": page, "page_size": page_size, "snapshot": True}
+    """
+    Semua lowongan hasil filter (parameter sama dengan /api/lowongan, tanpa paginasi) sebagai file
+    csv | ndjson | parquet, di-stream dari cursor DB; csv/ndjson di-gzip kalau klien menerima gzip.
+    """
+    fmt = (format or "").strip().lower()
+    if fmt not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format harus salah satu dari: {', '.join(export.FORMATS)}")
+    if fmt == "parquet" and export.pa is None:
+        raise HTTPException(status_code=501, detail="format parquet butuh paket pyarrow di server")
+    batches = iter_lowongan_export(query, perusahaan, lokasi, sektor, min_ar, max_ar,
+                                   min_pelamar, max_pelamar, min_kuota, max_kuota, sort)
+    gz = fmt != "parquet" and "gzip" in request.headers.get("accept-encoding", "").lower()
+    media_type, ext = export.FORMATS[fmt]
+    headers = {"Content-Disposition": f'attachment; filename="magangpulse_lowongan.{ext}"',
+               "Vary": "Accept-Encoding"}
+    if gz:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(export.stream(fmt, batches, LOWONGAN_API_COLS, gzip=gz),
+                             media_type=media_type, headers=headers)
 
 @app.get("/api/perusahaan")
-def api_perusahaan(sort: str = "ar_desc", page: int = 1, page_size: int = 50):
-    items, total = list_perusahaan(sort, page, page_size)
-    return {"data": items, "total": total, "page": page, "page_size": page_size, "snapshot": True}
+def api_perusahaan(request: Request, sort: str = "ar_desc", page: int = 1, page_size: int = 50,
+                   cursor: Optional[str] = None, with_total: Optional[bool] = None):
+    def build():
+        try:
+            items, total, next_cursor = list_perusahaan(sort, page, page_size, cursor, with_total)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"data": items, "total": total, "page": page, "page_size": page_size,
+                "next_cursor": next_cursor, "snapshot": True}
+    return response_cache.respond(request, build)
 
 
 # ===== DEBUG: lihat DB yang dipakai API =====
@@ -66,11 +129,5 @@ def api_debug_db():
         except Exception:
             db_url = "postgresql://***:***@…"
 
-    return {"use_postgres": use_pg, "db_url": db_url}
-
-@app.get("/api/options")
-def api_options():
-    """
-    Daftar unik opsi untuk dropdown (perusahaan, lokasi, sektor/program studi).
-    """
-    return list_distinct_options()
\ No newline at end of file
+    from .db import pool_stats
+    return {"use_postgres": use_pg, "db_url": db_url, "pool": pool_stats(), "cache": response_cache.stats()}
@@ -0,0 +1,323 @@
+# backend/cache.py
+"""
+Cache respons endpoint baca (/api/home, /api/options, /api/perusahaan, /api/lowongan).
+
+Data hanya berubah saat scraper selesai (upsert_site_stats menaikkan site_stats.snapshot_id), jadi
+respons di-key dengan versi snapshot. Versi dicek ke DB paling sering sekali per SNAPSHOT_CHECK_SECONDS
+(hanya saat ada request); selama versinya sama, body JSON diambil dari:
+1. LRU in-process per worker (batas TTL, jumlah entri, total byte)
+2. file SQLite bersama antar worker di host yang sama (opsional, RESPONSE_CACHE_FILE) — versi hasil
+   cek juga dibagi lewat file ini, jadi N worker tetap satu query versi per interval
+baru ke DB (Neon) kalau keduanya miss. Tiap respons membawa ETag (hash body) + Last-Modified
+(site_stats.snapshot_at, waktu versi terakhir naik); If-None-Match / If-Modified-Since yang cocok → 304.
+"""
+import hashlib, json, os, sqlite3, threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from time import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from .models import load_snapshot
+from .settings import settings
+
+
+class _Entry:
+    __slots__ = ("snapshot", "body", "etag", "expires")
+
+    def __init__(self, snapshot: str, body: bytes, etag: str, expires: float):
+        self.snapshot = snapshot
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+
+
+def _encode(content) -> bytes:
+    # sama dengan JSONResponse.render → body identik dengan respons tanpa cache
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _cache_key(request: Request) -> str:
+    # urutan query param dinormalisasi: ?a=1&b=2 dan ?b=2&a=1 berbagi entri
+    return request.url.path + "?" + urlencode(sorted(request.query_params.multi_items()))
+
+
+def _as_utc(v) -> Optional[datetime]:
+    """snapshot_at (ISO string di SQLite, datetime di PG) → datetime UTC untuk Last-Modified."""
+    if isinstance(v, str) and v:
+        try:
+            v = datetime.fromisoformat(v.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(v, datetime):
+        return None
+    v = v.replace(tzinfo=timezone.utc) if v.tzinfo is None else v.astimezone(timezone.utc)
+    return v.replace(microsecond=0)
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm is not None:  # If-None-Match menang atas If-Modified-Since (RFC 9110)
+        tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+        return "*" in tags or etag in tags
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+
+class _FileCache:
+    """Cache bersama antar proses di file SQLite (WAL); best-effort: error dicetak [WARN] lalu diabaikan."""
+    PRUNE_EVERY = 64
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._puts = 0
+        self._warned = False
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS response_cache (
+                  key TEXT PRIMARY KEY, snapshot TEXT NOT NULL, etag TEXT NOT NULL,
+                  body BLOB NOT NULL, stored_at REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS idx_response_cache_stored ON response_cache(stored_at);
+                CREATE TABLE IF NOT EXISTS snapshot_meta (
+                  id INTEGER PRIMARY KEY CHECK (id = 1), version TEXT, last_modified TEXT, checked_at REAL);
+            """)
+            self._local.conn = conn
+        return conn
+
+    def _fail(self, e: Exception):
+        if not self._warned:
+            self._warned = True
+            print(f"[WARN] RESPONSE_CACHE_FILE {self.path} gagal dipakai: {e} (berikutnya diabaikan diam-diam)",
+                  flush=True)
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def get_version(self, max_age: float) -> Optional[Tuple[str, Optional[datetime]]]:
+        try:
+            row = self._conn().execute(
+                "SELECT version, last_modified FROM snapshot_meta WHERE id = 1 AND checked_at > ?",
+                (time() - max_age,)).fetchone()
+        except sqlite3.Error as e:
+            self._fail(e)
+            return None
+        return (row[0], _as_utc(row[1])) if row else None
+
+    def put_version(self, version: str, last_modified: Optional[datetime]):
+        try:
+            conn = self._conn()
+            old = conn.execute("SELECT version FROM snapshot_meta WHERE id = 1").fetchone()
+            conn.execute("INSERT OR REPLACE INTO snapshot_meta(id, version, last_modified, checked_at) "
+                         "VALUES (1, ?, ?, ?)",
+                         (version, last_modified.isoformat() if last_modified else None, time()))
+            if old is None or old[0] != version:
+                conn.execute("DELETE FROM response_cache WHERE snapshot <> ?", (version,))
+        except sqlite3.Error as e:
+            self._fail(e)
+
+    def get(self, key: str, snapshot: str, min_stored_at: float) -> Optional[Tuple[bytes, str, float]]:
+        try:
+            row = self._conn().execute(
+                "SELECT body, etag, stored_at FROM response_cache WHERE key = ? AND snapshot = ? AND stored_at > ?",
+                (key, snapshot, min_stored_at)).fetchone()
+        except sqlite3.Error as e:
+            self._fail(e)
+            return None
+        return (bytes(row[0]), row[1], row[2]) if row else None
+
+    def put(self, key: str, snapshot: str, body: bytes, etag: str, stored_at: float):
+        try:
+            conn = self._conn()
+            conn.execute("INSERT OR REPLACE INTO response_cache(key, snapshot, etag, body, stored_at) "
+                         "VALUES (?, ?, ?, ?, ?)", (key, snapshot, etag, body, stored_at))
+            self._puts += 1
+            if self._puts % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM response_cache WHERE stored_at <= ?",
+                             (stored_at - settings.RESPONSE_CACHE_TTL,))
+                conn.execute("DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache "
+                             "ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                             (max(1, settings.RESPONSE_CACHE_MAX_ENTRIES),))
+        except sqlite3.Error as e:
+            self._fail(e)
+
+
+class ResponseCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version_lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._flights: Dict[str, Tuple[threading.Lock, int]] = {}
+        self._snapshot: Optional[str] = None
+        self._last_modified: Optional[datetime] = None
+        self._checked_at = 0.0
+        self._file = _FileCache(settings.RESPONSE_CACHE_FILE) if settings.RESPONSE_CACHE_FILE else None
+        self._stats = {"hit": 0, "file_hit": 0, "miss": 0, "not_modified": 0, "evicted": 0,
+                       "snapshot_checks": 0, "snapshot_changes": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    # ---- versi snapshot ----
+    def snapshot(self) -> Tuple[str, Optional[datetime]]:
+        interval = max(0.0, settings.SNAPSHOT_CHECK_SECONDS)
+        if self._snapshot is not None and time() - self._checked_at < interval:
+            return self._snapshot, self._last_modified
+        with self._version_lock:
+            if self._snapshot is not None and time() - self._checked_at < interval:
+                return self._snapshot, self._last_modified  # thread lain baru saja mengecek
+            shared = self._file.get_version(interval) if self._file is not None else None
+            if shared is not None:
+                version, last_modified = shared
+            else:
+                try:
+                    version, snapshot_at = load_snapshot()
+                except Exception as e:
+                    if self._snapshot is None:
+                        raise
+                    # DB tidak terjangkau: tetap sajikan snapshot terakhir, coba lagi setelah interval
+                    print(f"[WARN] Cek versi snapshot gagal, pakai versi lama: {e}", flush=True)
+                    self._checked_at = time()
+                    return self._snapshot, self._last_modified
+                last_modified = _as_utc(snapshot_at)
+                self._count("snapshot_checks")
+                if self._file is not None:
+                    self._file.put_version(version, last_modified)
+            with self._lock:
+                if version != self._snapshot:
+                    if self._snapshot is not None:
+                        self._stats["snapshot_changes"] += 1
+                    self._entries.clear()  # entri versi lama tidak akan pernah cocok lagi
+                    self._bytes = 0
+                self._snapshot, self._last_modified = version, last_modified
+            self._checked_at = time()
+            return version, last_modified
+
+    # ---- penyimpanan ----
+    def _get(self, key: str, snapshot: str) -> Tuple[Optional[_Entry], str]:
+        now = time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.snapshot == snapshot and entry.expires > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hit"] += 1
+                    return entry, "HIT"
+                del self._entries[key]
+                self._bytes -= len(entry.body)
+        if self._file is not None:
+            found = self._file.get(key, snapshot, now - settings.RESPONSE_CACHE_TTL)
+            if found is not None:
+                body, etag, stored_at = found
+                self._count("file_hit")
+                return self._put(key, snapshot, body, etag, stored_at), "FILE"
+        return None, "MISS"
+
+    def _put(self, key: str, snapshot: str, body: bytes, etag: str, stored_at: float) -> _Entry:
+        entry = _Entry(snapshot, body, etag, stored_at + settings.RESPONSE_CACHE_TTL)
+        max_bytes = int(settings.RESPONSE_CACHE_MAX_MB * 1024 * 1024)
+        if len(body) > max_bytes:
+            return entry  # terlalu besar untuk LRU: tetap dikirim, tidak disimpan
+        with self._lock:
+            if snapshot != self._snapshot:
+                return entry  # versi berganti saat query berjalan
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            max_entries = max(1, settings.RESPONSE_CACHE_MAX_ENTRIES)
+            while len(self._entries) > max_entries or self._bytes > max_bytes:
+                _, ev = self._entries.popitem(last=False)
+                self._bytes -= len(ev.body)
+                self._stats["evicted"] += 1
+        return entry
+
+    @contextmanager
+    def _single_flight(self, key: str):
+        """Request bersamaan untuk key yang sama (mis. tepat setelah versi berganti) → satu query DB."""
+        with self._lock:
+            lk, n = self._flights.get(key, (None, 0))
+            lk = lk or threading.Lock()
+            self._flights[key] = (lk, n + 1)
+        try:
+            with lk:
+                yield
+        finally:
+            with self._lock:
+                lk, n = self._flights[key]
+                if n == 1:
+                    del self._flights[key]
+                else:
+                    self._flights[key] = (lk, n - 1)
+
+    # ---- API ----
+    def respond(self, request: Request, compute: Callable[[], object]):
+        """Respons cache untuk `request`; compute() (query DB → dict) hanya dipanggil saat miss."""
+        if not settings.RESPONSE_CACHE:
+            return compute()
+        snapshot, last_modified = self.snapshot()
+        key = _cache_key(request)
+        entry, source = self._get(key, snapshot)
+        if entry is None:
+            with self._single_flight(key):
+                entry, source = self._get(key, snapshot)
+                if entry is None:
+                    self._count("miss")
+                    body = _encode(compute())
+                    now = time()
+                    entry = self._put(key, snapshot, body, _etag(body), now)
+                    if self._file is not None:
+                        self._file.put(key, snapshot, body, entry.etag, now)
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": f"public, max-age={max(0, settings.RESPONSE_CACHE_MAX_AGE)}, must-revalidate",
+            "X-Cache": source,
+        }
+        if last_modified is not None:
+            headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+        if _not_modified(request, entry.etag, last_modified):
+            self._count("not_modified")
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out.update(enabled=settings.RESPONSE_CACHE, entries=len(self._entries), bytes=self._bytes,
+                       snapshot=self._snapshot, file=settings.RESPONSE_CACHE_FILE)
+        return out
+
+
+response_cache = ResponseCache()
@@ -1,18 +1,51 @@
 # backend/db.py
-import os, re
+import atexit, os, re, threading
 from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 from .settings import settings
 
 USE_PG = bool(settings.DATABASE_URL)
 
+# counter koneksi (dibaca pool_stats(); dipakai /api/_debug/db)
+_stats = {"opened": 0, "reused": 0, "discarded": 0}
+_stats_lock = threading.Lock()
+
+def _count(key: str, n: int = 1):
+    with _stats_lock:
+        _stats[key] += n
+
 # --- helper: konversi placeholder :name -> %(name)s (untuk psycopg) ---
 # sebelumnya: _named_re = re.compile(r":([a-zA-Z_][a-zA-Z0-9_]*)")
 _named_re = re.compile(r"(?<!:):([a-zA-Z_][a-zA-Z0-9_]*)")  # jangan match '::type'
 
+# di-cache per teks SQL (LRU terbatas): query yang sama tiap request tidak di-regex ulang
+@lru_cache(maxsize=max(1, settings.SQL_CACHE_SIZE))
 def _convert_named(sql: str) -> str:
     return _named_re.sub(r"%(\1)s", sql)
 
+def execute_prepared(cur, sql, params=None):
+    """
+    execute() untuk query panas berteks tetap (list_home, COUNT perusahaan). Jangan untuk SQL yang dirakit
+    dari filter/sort/cursor: tiap variasi teks jadi prepared statement baru di setiap koneksi pool.
+    PG: prepared statement server-side (`prepare=True`) → parse/plan sekali per koneksi pool;
+    SQLite: sqlite3 sudah meng-cache statement terkompilasi per koneksi (cached_statements).
+    """
+    if USE_PG:
+        return cur.execute(sql, params, prepare=settings.PG_PREPARE)
+    return cur.execute(sql, params if params is not None else ())
+
+def execute_unprepared(cur, sql, params=None):
+    """
+    execute() yang tidak pernah di-prepare (juga tidak oleh prepare_threshold otomatis psycopg): untuk
+    `SELECT *` pada tabel yang kolomnya bisa ditambah migrasi saat koneksi pool masih hidup — plan PG
+    yang sudah di-prepare gagal dengan "cached plan must not change result type" — dan untuk SQL dinamis
+    (count/page list_lowongan, page list_perusahaan).
+    """
+    if USE_PG:
+        return cur.execute(sql, params, prepare=False)
+    return cur.execute(sql, params if params is not None else ())
+
 if USE_PG:
     import psycopg
     from psycopg.rows import dict_row
@@ -20,24 +53,33 @@ if USE_PG:
     class _PgCursor:
         def __init__(self, cur):
             self._cur = cur
-        def execute(self, sql, params=None):
+        def execute(self, sql, params=None, prepare=None):
+            # prepare: None = otomatis (psycopg prepare_threshold), True = langsung prepare, False = jangan
             if isinstance(params, dict):
                 sql = _convert_named(sql)
-            return self._cur.execute(sql, params)
+            if prepare is None:  # ServerCursor (named) tidak menerima argumen prepare
+                return self._cur.execute(sql, params)
+            return self._cur.execute(sql, params, prepare=prepare)
         def executemany(self, sql, seq_of_params):
             # seq_of_params bisa list[dict] atau list[tuple]
             # kalau dict, konversi placeholder
             if seq_of_params and isinstance(seq_of_params[0], dict):
                 sql = _convert_named(sql)
             return self._cur.executemany(sql, seq_of_params)
+        def copy(self, sql):
+            # COPY ... FROM STDIN (psycopg3): `with cur.copy(sql) as cp: cp.write_row(...)`
+            return self._cur.copy(sql)
         def fetchone(self): return self._cur.fetchone()
+        def fetchmany(self, size): return self._cur.fetchmany(size)
         def fetchall(self): return self._cur.fetchall()
         @property
         def rowcount(self): return self._cur.rowcount
 
     class _PgConn:
         def __init__(self, conn): self._conn = conn
-        def cursor(self): return _PgCursor(self._conn.cursor())
+        def cursor(self, name=None):
+            # name → server-side cursor (DECLARE ... CURSOR): hasil diambil bertahap lewat fetchmany
+            return _PgCursor(self._conn.cursor(name=name) if name else self._conn.cursor())
         def commit(self): self._conn.commit()
         def close(self): self._conn.close()
         # sqlite kompat: executescript
@@ -59,26 +101,189 @@ if USE_PG:
                 for s in stmts:
                     c.execute(s)
 
+    try:
+        from psycopg_pool import ConnectionPool
+    except ImportError:  # psycopg_pool tidak terpasang → koneksi baru per get_conn (perilaku lama)
+        ConnectionPool = None
+
+    _pool = None
+    _pool_lock = threading.Lock()
+
+    def _connect_kwargs() -> dict:
+        kw = {"row_factory": dict_row, "autocommit": False}
+        if not settings.PG_PREPARE:
+            # pooler transaction-mode lama (pgbouncer < 1.21) tidak mendukung prepared statement
+            kw["prepare_threshold"] = None
+        return kw
+
+    def _get_pool():
+        """ConnectionPool dibuat malas (per proses: aman untuk worker gunicorn hasil fork)."""
+        global _pool
+        if _pool is None:
+            with _pool_lock:
+                if _pool is None:
+                    _pool = ConnectionPool(
+                        settings.DATABASE_URL,
+                        min_size=max(0, settings.DB_POOL_MIN_SIZE),
+                        max_size=max(1, settings.DB_POOL_MIN_SIZE, settings.DB_POOL_MAX_SIZE),
+                        timeout=settings.DB_POOL_TIMEOUT,
+                        max_idle=settings.DB_POOL_MAX_IDLE,
+                        # Neon memutus koneksi idle saat compute suspend → cek sebelum dipinjamkan
+                        check=ConnectionPool.check_connection if settings.DB_POOL_CHECK else None,
+                        kwargs=_connect_kwargs(),
+                        name="magangpulse",
+                        open=True,
+                    )
+                    atexit.register(close_pool)
+        return _pool
+
+    def close_pool():
+        global _pool
+        with _pool_lock:
+            if _pool is not None:
+                _pool.close()
+                _pool = None
+
+    def pool_stats() -> dict:
+        out = {"mode": "psycopg_pool" if settings.DB_POOL and ConnectionPool is not None else "direct"}
+        with _stats_lock:
+            out.update(_stats)
+        out["sql_cache"] = _convert_named.cache_info()._asdict()
+        if _pool is not None:
+            # pool_min/max, pool_size, pool_available, requests_num, requests_waiting, connections_num, …
+            out.update(_pool.get_stats())
+        return out
+
     @contextmanager
     def get_conn(_db_path=None):
-        conn = psycopg.connect(settings.DATABASE_URL, row_factory=dict_row, autocommit=False)
+        if settings.DB_POOL and ConnectionPool is not None:
+            # `with pool.connection()` commit kalau sukses, rollback kalau exception, lalu kembali ke pool
+            with _get_pool().connection() as conn:
+                yield _PgConn(conn)
+            return
+        conn = psycopg.connect(settings.DATABASE_URL, **_connect_kwargs())
+        _count("opened")
         try:
             yield _PgConn(conn)
             conn.commit()
         finally:
             conn.close()
 
+    # psycopg Connection thread-safe → koneksi pool biasa boleh dipakai generator StreamingResponse
+    get_stream_conn = get_conn
+
 else:
     import sqlite3
     DB_PATH = Path(__file__).with_name("data.sqlite")
 
+    # satu koneksi per (thread, path), dipakai ulang antar get_conn; WAL → pembaca tidak diblok penulis
+    _local = threading.local()
+
+    def _open_sqlite(path: Path):
+        conn = sqlite3.connect(path, timeout=max(1.0, settings.DB_POOL_TIMEOUT),
+                               cached_statements=max(1, settings.SQL_CACHE_SIZE))
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # aman dengan WAL, fsync hanya saat checkpoint
+        _count("opened")
+        return conn
+
+    def _file_id(path: Path):
+        try:
+            st = os.stat(path)
+            return (st.st_dev, st.st_ino)
+        except OSError:
+            return None
+
+    def _checkout(path: Path):
+        cache = _local.__dict__.setdefault("conns", {})
+        key = str(path)
+        entry = cache.get(key)
+        if entry is not None and entry[2]:
+            # get_conn bersarang di thread yang sama: koneksi terpisah (semantik lama), tidak di-cache
+            return _open_sqlite(path), False
+        # health check: file DB dihapus/diganti (mis. bench/replay) → koneksi lama menunjuk inode basi
+        if entry is not None and settings.DB_POOL_CHECK and entry[1] != _file_id(path):
+            _drop(key)
+            entry = None
+        if entry is None:
+            conn = _open_sqlite(path)
+            fid = _file_id(path)
+        else:
+            conn, fid = entry[0], entry[1]
+            _count("reused")
+        cache[key] = (conn, fid, True)
+        return conn, True
+
+    def _drop(key: str):
+        conn = _local.conns.pop(key)[0]
+        try:
+            conn.close()
+        finally:
+            _count("discarded")
+
+    def close_pool():
+        """Tutup koneksi cache milik thread pemanggil (thread lain menutup saat thread-nya selesai)."""
+        cache = getattr(_local, "conns", None) or {}
+        for conn, _fid, _busy in cache.values():
+            conn.close()
+        cache.clear()
+
+    def pool_stats() -> dict:
+        out = {"mode": "sqlite-thread" if settings.DB_POOL else "direct"}
+        with _stats_lock:
+            out.update(_stats)
+        return out
+
     @contextmanager
     def get_conn(db_path=None):
+        # commit hanya kalau blok sukses; exception → rollback (sama dengan jalur pool PG), jadi
+        # operasi "satu transaksi" seperti recompute_perusahaan tidak meninggalkan perubahan setengah jadi
         path = Path(db_path) if db_path else DB_PATH
-        conn = sqlite3.connect(path)
+        if not settings.DB_POOL:
+            conn = _open_sqlite(path)
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            return
+        conn, cached = _checkout(path)
+        ok = False
+        try:
+            yield conn
+            conn.commit()
+            ok = True
+        except BaseException:
+            try:
+                conn.rollback()
+                ok = True
+            except Exception:
+                pass  # koneksi bermasalah → dibuang di bawah
+            raise
+        finally:
+            if not cached:
+                conn.close()
+            elif ok:
+                key = str(path)
+                _local.conns[key] = _local.conns[key][:2] + (False,)
+            else:
+                _drop(str(path))  # commit/rollback gagal: koneksi tidak dikembalikan ke cache
+
+    @contextmanager
+    def get_stream_conn(db_path=None):
+        """
+        Koneksi untuk hasil yang di-stream (StreamingResponse memanggil generator dari thread pool yang
+        berganti-ganti): di luar cache per thread, check_same_thread=False; dipakai berurutan, tidak bersamaan.
+        """
+        path = Path(db_path) if db_path else DB_PATH
+        conn = sqlite3.connect(path, timeout=max(1.0, settings.DB_POOL_TIMEOUT), check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        _count("opened")
         try:
             yield conn
         finally:
-            conn.commit()
             conn.close()
@@ -0,0 +1,121 @@
+# backend/export.py
+"""
+Serializer streaming untuk /api/lowongan/export: batch baris (models.iter_lowongan_export) → potongan
+bytes CSV / NDJSON / Parquet, plus gzip on the fly untuk format teks. Tiap batch langsung dikirim lalu
+dibuang, jadi memori tetap konstan berapa pun jumlah barisnya.
+"""
+import csv, io, json, zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+try:  # hanya untuk format=parquet (ada di requirements.txt; tanpa pyarrow → 501)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# format → (media type, ekstensi file)
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+# kolom numerik lowongan (sisanya string; tanggal dikirim ISO-8601 supaya skema sama di SQLite & PG)
+_INT_COLS = {"id", "pelamar", "kuota"}
+_FLOAT_COLS = {"acceptance_rate", "demand_ratio", "velocity_pelamar_per_day"}
+
+
+def _plain(v):
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return float(v)
+    return v
+
+
+def csv_chunks(batches: Iterable[List[Dict]], columns: Sequence[str]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    buf.write("\ufeff")  # BOM → Excel membaca UTF-8 dengan benar
+    w.writerow(columns)
+    for rows in batches:
+        for r in rows:
+            w.writerow([_plain(r.get(c)) for c in columns])
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    tail = buf.getvalue()  # header saja kalau hasilnya kosong
+    if tail:
+        yield tail.encode("utf-8")
+
+
+def ndjson_chunks(batches: Iterable[List[Dict]], columns: Sequence[str]) -> Iterator[bytes]:
+    for rows in batches:
+        yield "".join(json.dumps({c: _plain(r.get(c)) for c in columns}, ensure_ascii=False) + "\n"
+                      for r in rows).encode("utf-8")
+
+
+class _Sink:
+    """File-like tujuan ParquetWriter; bytes yang sudah ditulis diambil (drain) setelah tiap row group."""
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._buf += data
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+
+def arrow_schema(columns: Sequence[str]):
+    return pa.schema([(c, pa.int64() if c in _INT_COLS else pa.float64() if c in _FLOAT_COLS else pa.string())
+                      for c in columns])
+
+
+def parquet_chunks(batches: Iterable[List[Dict]], columns: Sequence[str]) -> Iterator[bytes]:
+    """Satu row group Parquet per batch (Arrow RecordBatch); footer ditulis di akhir stream."""
+    schema = arrow_schema(columns)
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for rows in batches:
+            data = {c: [_plain(r.get(c)) for r in rows] for c in columns}
+            writer.write_batch(pa.RecordBatch.from_pydict(data, schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = container gzip
+    for c in chunks:
+        out = z.compress(c)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def stream(fmt: str, batches: Iterable[List[Dict]], columns: Sequence[str], gzip: bool = False) -> Iterator[bytes]:
+    if fmt == "parquet":
+        return parquet_chunks(batches, columns)  # sudah terkompresi (snappy) → tanpa gzip
+    chunks = csv_chunks(batches, columns) if fmt == "csv" else ndjson_chunks(batches, columns)
+    return gzip_chunks(chunks) if gzip else chunks
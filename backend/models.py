@@ -1,10 +1,22 @@
-from typing import List, Optional, Tuple, Sequence
-from .db import get_conn
+import base64, json, re
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Sequence
+from .db import get_conn, get_stream_conn, execute_prepared, execute_unprepared
 from .settings import settings
 
+LOWONGAN_COLS = (
+    "external_id", "source_url", "judul", "perusahaan", "lokasi", "sektor",
+    "tanggal_posting", "pelamar", "kuota", "acceptance_rate", "demand_ratio",
+    "velocity_pelamar_per_day", "status", "deskripsi_short", "fetched_at", "content_hash",
+)
+# kolom yang dibandingkan untuk menentukan "berubah" (fetched_at sengaja tidak ikut)
+_LOWONGAN_CMP = tuple(c for c in LOWONGAN_COLS if c not in ("source_url", "fetched_at"))
+
 def upsert_lowongan(rows: List[dict]):
     if not rows:
         return 0
+    if settings.DATABASE_URL and settings.PG_COPY_UPSERT:
+        return _upsert_lowongan_copy(rows)
     with get_conn(settings.DB_PATH) as conn:
         cur = conn.cursor()
         q = """
@@ -31,14 +43,217 @@ def upsert_lowongan(rows: List[dict]):
             fetched_at=excluded.fetched_at,
             content_hash=excluded.content_hash;
         """
+        # executemany: psycopg sudah prepare statement-nya (sekali per koneksi pool), sqlite3 compile sekali
         cur.executemany(q, rows)
+        n = cur.rowcount
+        _sync_program_studi(cur, rows)
+        return n
+
+def _upsert_lowongan_copy(rows: List[dict]) -> int:
+    """
+    Jalur bulk Postgres: COPY batch ke tabel staging sementara, lalu satu INSERT ... SELECT ... ON CONFLICT.
+    Satu round-trip data + satu statement per batch (bukan satu INSERT per baris), dan baris yang isinya
+    sama persis dengan di DB tidak ditulis ulang (fetched_at-nya tetap waktu perubahan terakhir).
+    Return: jumlah baris yang di-insert atau di-update.
+    """
+    # satu source_url maks sekali per statement (ON CONFLICT tidak boleh menyentuh baris yang sama 2×)
+    latest, no_url = {}, []
+    for r in rows:
+        if r.get("source_url"):
+            latest[r["source_url"]] = r
+        else:
+            no_url.append(r)
+    cols = ", ".join(LOWONGAN_COLS)
+    updates = ",\n            ".join(f"{c} = excluded.{c}" for c in LOWONGAN_COLS if c != "source_url")
+    # row comparison: NULL dianggap sama dengan NULL (IS DISTINCT FROM, bukan <>)
+    changed = "({}) IS DISTINCT FROM ({})".format(", ".join(f"lowongan.{c}" for c in _LOWONGAN_CMP),
+                                                   ", ".join(f"excluded.{c}" for c in _LOWONGAN_CMP))
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        cur.execute(f"CREATE TEMP TABLE lowongan_stage ON COMMIT DROP AS SELECT {cols} FROM lowongan WITH NO DATA")
+        with cur.copy(f"COPY lowongan_stage ({cols}) FROM STDIN") as cp:
+            for r in list(latest.values()) + no_url:
+                cp.write_row([r.get(c) for c in LOWONGAN_COLS])
+        cur.execute(f"""
+        INSERT INTO lowongan ({cols})
+        SELECT {cols} FROM lowongan_stage
+        ON CONFLICT(source_url) DO UPDATE SET
+            {updates}
+        WHERE {changed};
+        """)
+        n = cur.rowcount
+        _sync_program_studi(cur, list(latest.values()))
+        return n
+
+def split_program_studi(sektor: Optional[str]) -> List[str]:
+    """"A; B; C" (kolom lowongan.sektor) → ["A", "B", "C"] tanpa duplikat, urutan dipertahankan."""
+    out: List[str] = []
+    for part in str(sektor or "").split(";"):
+        t = part.strip()
+        if t and t not in out:
+            out.append(t)
+    return out
+
+def _sync_program_studi(cur, rows: List[dict]):
+    """
+    Samakan tabel join lowongan_program_studi dengan kolom sektor baris yang baru di-upsert
+    (transaksi yang sama dengan upsert). Nama baru masuk ke dimensi program_studi lebih dulu.
+    """
+    rows = [r for r in rows if r.get("source_url")]
+    if not rows:
+        return
+    prodi = {r["source_url"]: split_program_studi(r.get("sektor")) for r in rows}
+    names = sorted({n for v in prodi.values() for n in v})
+    if names:
+        cur.executemany("INSERT INTO program_studi(nama) VALUES (:nama) ON CONFLICT(nama) DO NOTHING",
+                        [{"nama": n} for n in names])
+    name_id: Dict[str, int] = {}
+    for i in range(0, len(names), _IN_CHUNK):
+        params = {f"n{k}": v for k, v in enumerate(names[i:i + _IN_CHUNK])}
+        ph = ", ".join(f":{k}" for k in params)
+        cur.execute(f"SELECT id, nama FROM program_studi WHERE nama IN ({ph})", params)
+        name_id.update((d["nama"], d["id"]) for d in map(dict, cur.fetchall()))
+    urls = list(prodi)
+    url_id: Dict[str, int] = {}
+    for i in range(0, len(urls), _IN_CHUNK):
+        params = {f"u{k}": v for k, v in enumerate(urls[i:i + _IN_CHUNK])}
+        ph = ", ".join(f":{k}" for k in params)
+        cur.execute(f"SELECT id, source_url FROM lowongan WHERE source_url IN ({ph})", params)
+        url_id.update((d["source_url"], d["id"]) for d in map(dict, cur.fetchall()))
+    ids = sorted(url_id.values())
+    for i in range(0, len(ids), _IN_CHUNK):
+        params = {f"l{k}": v for k, v in enumerate(ids[i:i + _IN_CHUNK])}
+        ph = ", ".join(f":{k}" for k in params)
+        cur.execute(f"DELETE FROM lowongan_program_studi WHERE lowongan_id IN ({ph})", params)
+    links = [{"lowongan_id": url_id[u], "program_studi_id": name_id[n]}
+             for u, v in prodi.items() if u in url_id for n in v]
+    if links:
+        cur.executemany("INSERT INTO lowongan_program_studi(lowongan_id, program_studi_id) "
+                        "VALUES (:lowongan_id, :program_studi_id) ON CONFLICT DO NOTHING", links)
+
+def backfill_program_studi() -> int:
+    """
+    Isi tabel join dari kolom sektor kalau masih kosong (DB lama sebelum tabel program_studi ada).
+    Return: jumlah lowongan yang diproses (0 kalau sudah terisi / tidak ada sektor).
+    """
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 AS x FROM lowongan_program_studi LIMIT 1")
+        if cur.fetchone() is not None:
+            return 0
+        cur.execute("SELECT source_url, sektor FROM lowongan "
+                    "WHERE source_url IS NOT NULL AND sektor IS NOT NULL AND sektor <> ''")
+        rows = [dict(r) for r in cur.fetchall()]
+        for i in range(0, len(rows), _IN_CHUNK):
+            _sync_program_studi(cur, rows[i:i + _IN_CHUNK])
+        return len(rows)
+
+def load_lowongan_index() -> Dict[str, dict]:
+    """
+    Index in-memory untuk mode incremental:
+    source_url → {content_hash, sektor, deskripsi_short} dari tabel lowongan.
+    """
+    index: Dict[str, dict] = {}
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT source_url, content_hash, sektor, deskripsi_short FROM lowongan WHERE source_url IS NOT NULL")
+        for r in cur.fetchall():
+            r = dict(r)
+            index[r["source_url"]] = {
+                "content_hash": r.get("content_hash"),
+                "sektor": r.get("sektor"),
+                "deskripsi_short": r.get("deskripsi_short"),
+            }
+    return index
+
+# === Checkpoint crawl (resume) ===
+def load_crawl_state(run_id: Optional[str] = None) -> Optional[dict]:
+    """State run `run_id`; tanpa run_id → run terakhir yang belum selesai (status 'running')."""
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        if run_id:
+            cur.execute("SELECT * FROM crawl_state WHERE run_id = :run_id", {"run_id": run_id})
+        else:
+            cur.execute("SELECT * FROM crawl_state WHERE status = 'running' ORDER BY updated_at DESC LIMIT 1")
+        row = cur.fetchone()
+        return dict(row) if row else None
+
+def save_crawl_state(run_id: str, last_page: int, status: str, now: str):
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO crawl_state(run_id, last_page, status, started_at, updated_at)
+            VALUES(:run_id, :last_page, :status, :now, :now)
+            ON CONFLICT(run_id) DO UPDATE SET
+              last_page = excluded.last_page,
+              status = excluded.status,
+              updated_at = excluded.updated_at
+            """,
+            {"run_id": run_id, "last_page": last_page, "status": status, "now": now},
+        )
         return cur.rowcount
 
-def recompute_perusahaan():
+def load_crawl_enriched(run_id: str) -> set:
     with get_conn(settings.DB_PATH) as conn:
         cur = conn.cursor()
-        cur.execute("DELETE FROM perusahaan;")
-        q = """
+        cur.execute("SELECT source_url FROM crawl_enriched WHERE run_id = :run_id", {"run_id": run_id})
+        return {dict(r)["source_url"] for r in cur.fetchall()}
+
+def add_crawl_enriched(run_id: str, urls: Sequence[str]):
+    if not urls:
+        return 0
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT INTO crawl_enriched(run_id, source_url) VALUES(:run_id, :source_url) ON CONFLICT DO NOTHING",
+            [{"run_id": run_id, "source_url": u} for u in urls],
+        )
+        return cur.rowcount
+
+def delete_crawl_enriched(run_id: str):
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM crawl_enriched WHERE run_id = :run_id", {"run_id": run_id})
+        return cur.rowcount
+
+def delete_lowongan(urls: Sequence[str]):
+    """Hapus lowongan per source_url (dipakai `reparse --prune` untuk baris yang tidak ada di arsip)."""
+    if not urls:
+        return 0
+    params = [{"source_url": u} for u in urls]
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        # SQLite tidak menegakkan ON DELETE CASCADE (foreign_keys off) → link program studi dihapus eksplisit
+        cur.executemany("DELETE FROM lowongan_program_studi WHERE lowongan_id IN "
+                        "(SELECT id FROM lowongan WHERE source_url = :source_url)", params)
+        cur.executemany("DELETE FROM lowongan WHERE source_url = :source_url", params)
+        return cur.rowcount
+
+# === Metrics per run (scraper/metrics.py) ===
+def save_scrape_run(run_id: str, status: str, started_at: Optional[str], finished_at: Optional[str],
+                    spans: str, counters: str, histograms: str, errors: str):
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO scrape_runs(run_id, status, started_at, finished_at, spans, counters, histograms, errors)
+            VALUES(:run_id, :status, :started_at, :finished_at, :spans, :counters, :histograms, :errors)
+            ON CONFLICT(run_id) DO UPDATE SET
+              status = excluded.status,
+              started_at = excluded.started_at,
+              finished_at = excluded.finished_at,
+              spans = excluded.spans,
+              counters = excluded.counters,
+              histograms = excluded.histograms,
+              errors = excluded.errors
+            """,
+            {"run_id": run_id, "status": status, "started_at": started_at, "finished_at": finished_at,
+             "spans": spans, "counters": counters, "histograms": histograms, "errors": errors},
+        )
+        return cur.rowcount
+
+_PERUSAHAAN_AGG = """
         INSERT INTO perusahaan(nama, lokasi, sektor, n_lowongan_aktif, kuota_total, pelamar_total,
                                ar_rata2, dr_rata2, source_url, fetched_at)
         SELECT perusahaan as nama,
@@ -52,10 +267,73 @@ def recompute_perusahaan():
                MIN(source_url) as source_url,
                MAX(fetched_at) as fetched_at
         FROM lowongan
-        GROUP BY perusahaan;
-        """
-        cur.execute(q)
-        return cur.rowcount
+        WHERE {where}
+        GROUP BY perusahaan
+        {conflict};
+"""
+_PERUSAHAAN_UPSERT = """ON CONFLICT(nama) DO UPDATE SET
+            lokasi=excluded.lokasi,
+            sektor=excluded.sektor,
+            n_lowongan_aktif=excluded.n_lowongan_aktif,
+            kuota_total=excluded.kuota_total,
+            pelamar_total=excluded.pelamar_total,
+            ar_rata2=excluded.ar_rata2,
+            dr_rata2=excluded.dr_rata2,
+            source_url=excluded.source_url,
+            fetched_at=excluded.fetched_at"""
+_IN_CHUNK = 500  # batas aman jumlah parameter per statement (SQLite lama: 999)
+
+def recompute_perusahaan(names: Optional[Iterable[str]] = None):
+    """
+    Agregat perusahaan dari lowongan, di-upsert per nama dalam SATU transaksi (tidak ada DELETE semua
+    → pembaca /api/perusahaan tidak pernah melihat tabel kosong/setengah jadi).
+    - names=None → semua perusahaan; nama yang tidak punya lowongan lagi dihapus
+    - names      → hanya perusahaan itu (mis. yang tersentuh upsert run ini, termasuk nama lamanya)
+    Return: jumlah nama yang dihitung ulang.
+    """
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        if names is None:
+            cur.execute(_PERUSAHAAN_AGG.format(where="perusahaan IS NOT NULL", conflict=_PERUSAHAAN_UPSERT))
+            n = cur.rowcount
+            cur.execute("""
+                DELETE FROM perusahaan
+                WHERE nama IS NOT NULL
+                  AND nama NOT IN (SELECT perusahaan FROM lowongan WHERE perusahaan IS NOT NULL)
+            """)
+            # grup perusahaan NULL tidak bisa di-upsert (NULL tidak pernah konflik di UNIQUE) → ganti utuh
+            cur.execute("DELETE FROM perusahaan WHERE nama IS NULL")
+            cur.execute(_PERUSAHAAN_AGG.format(where="perusahaan IS NULL", conflict=""))
+            return n
+        names = set(names)
+        if None in names:
+            cur.execute("DELETE FROM perusahaan WHERE nama IS NULL")
+            cur.execute(_PERUSAHAAN_AGG.format(where="perusahaan IS NULL", conflict=""))
+        names = sorted(x for x in names if x)
+        for i in range(0, len(names), _IN_CHUNK):
+            chunk = names[i:i + _IN_CHUNK]
+            params = {f"n{k}": v for k, v in enumerate(chunk)}
+            ph = ", ".join(f":{k}" for k in params)
+            cur.execute(_PERUSAHAAN_AGG.format(where=f"perusahaan IN ({ph})", conflict=_PERUSAHAAN_UPSERT), params)
+            cur.execute(f"""
+                DELETE FROM perusahaan
+                WHERE nama IN ({ph})
+                  AND NOT EXISTS (SELECT 1 FROM lowongan l WHERE l.perusahaan = perusahaan.nama)
+            """, params)
+        return len(names)
+
+def lowongan_companies(urls: Sequence[str]) -> set:
+    """Nama perusahaan yang saat ini tersimpan untuk source_url tsb (nama lama sebelum upsert)."""
+    out = set()
+    urls = [u for u in urls if u]
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        for i in range(0, len(urls), _IN_CHUNK):
+            params = {f"u{k}": v for k, v in enumerate(urls[i:i + _IN_CHUNK])}
+            ph = ", ".join(f":{k}" for k in params)
+            cur.execute(f"SELECT DISTINCT perusahaan FROM lowongan WHERE source_url IN ({ph})", params)
+            out.update(dict(r)["perusahaan"] for r in cur.fetchall())
+    return out
 
 # NEW: site stats & timeline
 def upsert_site_stats(
@@ -82,7 +360,11 @@ def upsert_site_stats(
               jumlah_perusahaan = COALESCE(:jumlah_perusahaan, jumlah_perusahaan),
               jumlah_lamaran    = COALESCE(:jumlah_lamaran,    jumlah_lamaran),
               total_lowongan    = COALESCE(:total_lowongan,    total_lowongan),
-              fetched_at        = COALESCE(:fetched_at,        fetched_at)
+              fetched_at        = COALESCE(:fetched_at,        fetched_at),
+              -- versi snapshot naik tiap panggilan (juga tanpa argumen) → cache respons API (backend/cache.py) basi;
+              -- snapshot_at = kapan versi itu naik (Last-Modified), fetched_at tidak berubah saat run gagal/reparse
+              snapshot_id       = COALESCE(snapshot_id, 0) + 1,
+              snapshot_at       = :snapshot_at
             WHERE id = 1
             """,
             {
@@ -90,6 +372,7 @@ def upsert_site_stats(
                 "jumlah_lamaran": jumlah_lamaran,
                 "total_lowongan": total_lowongan,
                 "fetched_at": fetched_at,
+                "snapshot_at": datetime.now(timezone.utc).isoformat(),
             },
         )
         return cur.rowcount
@@ -107,12 +390,25 @@ def replace_timeline(items: List[dict]):
         )
         return cur.rowcount
 
+def load_snapshot() -> Tuple[str, Optional[object]]:
+    """
+    Versi snapshot data → (versi, snapshot_at) untuk cache respons API. fetched_at ikut di versi supaya
+    DB lama yang belum punya kolom snapshot_id (sebelum init_db run berikutnya) tetap ter-invalidasi.
+    snapshot_at (waktu snapshot_id terakhir naik) jadi Last-Modified; None (DB lama) → hanya ETag.
+    """
+    with get_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor()
+        execute_unprepared(cur, "SELECT * FROM site_stats WHERE id=1")
+        row = dict(cur.fetchone() or {})
+    return f"{row.get('snapshot_id') or 0}:{row.get('fetched_at') or ''}", row.get("snapshot_at")
+
 def list_home():
     with get_conn(settings.DB_PATH) as conn:
         cur = conn.cursor()
-        cur.execute("SELECT * FROM site_stats WHERE id=1")
+        # SELECT * tanpa prepare: kolom site_stats bisa bertambah (migrasi) saat koneksi pool masih hidup
+        execute_unprepared(cur, "SELECT * FROM site_stats WHERE id=1")
         stats = dict(cur.fetchone() or {})
-        cur.execute("SELECT * FROM program_timeline ORDER BY order_index ASC, id ASC")
+        execute_prepared(cur, "SELECT * FROM program_timeline ORDER BY order_index ASC, id ASC")
         timeline = [dict(r) for r in cur.fetchall()]
         return stats, timeline
 
@@ -130,24 +426,111 @@ def _read_count_row(row):
     # fallback sangat jarang
     return int(list(row)[0])
 
-def list_lowongan(
-    page: int = 1,
-    page_size: int = 20,
-    query: Optional[str] = None,
-    perusahaan: Optional[Sequence[str]] = None,
-    lokasi: Optional[Sequence[str]] = None,
-    sektor: Optional[Sequence[str]] = None,
-    min_ar: Optional[float] = None,
-    max_ar: Optional[float] = None,
-    min_pelamar: Optional[int] = None,
-    max_pelamar: Optional[int] = None,
-    min_kuota: Optional[int] = None,
-    max_kuota: Optional[int] = None,
-    sort: str = "recent"
-):
+# kolom yang dikembalikan API/export (bukan SELECT *: PG punya kolom search_tsv)
+LOWONGAN_API_COLS = ("id",) + LOWONGAN_COLS
+_LOWONGAN_SELECT = ", ".join(f"lowongan.{c}" for c in LOWONGAN_API_COLS)
+_SEARCH_TERM_RX = re.compile(r"[^\W_]+")  # pemisah token sama dengan unicode61 / parser 'simple'
+_SEARCH_MAX_TERMS = 8
+
+def _search_clause(query: str, use_pg: bool):
+    """
+    Full-text search (semua kata wajib, tiap kata prefix match) atas judul, perusahaan,
+    lokasi, sektor, deskripsi_short → (where, rank_join, (rank_expr, arah), params); None kalau query tanpa kata.
+    SQLite: FTS5 lowongan_fts + bm25; Postgres: search_tsv (GIN) + ts_rank.
+    rank_join/rank hanya dipakai query halaman dengan sort=relevance (skor tiap match itu mahal).
+    """
+    terms = _SEARCH_TERM_RX.findall(query.lower())[:_SEARCH_MAX_TERMS]
+    if not terms:
+        return None
+    if use_pg:
+        tsq = "to_tsquery('simple', :fts)"
+        return (f"lowongan.search_tsv @@ {tsq}", "", (f"ts_rank(lowongan.search_tsv, {tsq})", "DESC", "real"),
+                {"fts": " & ".join(f"{t}:*" for t in terms)})
+    # bobot bm25 per kolom: judul, perusahaan, lokasi, sektor, deskripsi_short (lebih kecil = lebih relevan)
+    rank_join = ("JOIN (SELECT rowid AS fts_id, bm25(lowongan_fts, 10.0, 8.0, 3.0, 3.0, 1.0) AS fts_rank "
+                 "FROM lowongan_fts WHERE lowongan_fts MATCH :fts) fts ON fts.fts_id = lowongan.id")
+    return ("lowongan.id IN (SELECT rowid FROM lowongan_fts WHERE lowongan_fts MATCH :fts)", rank_join,
+            ("fts.fts_rank", "ASC", ""), {"fts": " ".join(f'"{t}"*' for t in terms)})
+
+# === Keyset (cursor) pagination ===
+# sort → (ekspresi kunci, arah, cast PG untuk nilai cursor); id jadi pemutus seri dengan arah yang sama.
+# Ekspresi kunci HARUS identik dengan indeks komposit (ekspresi, id) di schema*.sql supaya terpakai;
+# COALESCE ke sentinel → urutan NULL sama di SQLite & PG dan kunci cursor tidak pernah NULL.
+def _lowongan_sorts(use_pg: bool) -> Dict[str, Tuple[str, str, str]]:
+    recent = (("COALESCE(fetched_at, '1970-01-01 00:00:00+00'::timestamptz)", "DESC", "timestamptz") if use_pg
+              else ("COALESCE(datetime(fetched_at), '')", "DESC", ""))
+    return {
+        "recent": recent,
+        "ar_desc": ("COALESCE(acceptance_rate, -1)", "DESC", ""),
+        "ar_asc": ("COALESCE(acceptance_rate, -1)", "ASC", ""),
+        "pelamar_desc": ("COALESCE(pelamar, -1)", "DESC", ""),
+        "pelamar_asc": ("COALESCE(pelamar, -1)", "ASC", ""),
+        "kuota_desc": ("COALESCE(kuota, -1)", "DESC", ""),
+        "kuota_asc": ("COALESCE(kuota, -1)", "ASC", ""),
+    }
+
+_PERUSAHAAN_SORTS = {
+    "ar_desc": ("COALESCE(ar_rata2, -1)", "DESC", ""),
+    "ar_asc": ("COALESCE(ar_rata2, -1)", "ASC", ""),
+    "pelamar_desc": ("COALESCE(pelamar_total, -1)", "DESC", ""),
+    "pelamar_asc": ("COALESCE(pelamar_total, -1)", "ASC", ""),
+    "kuota_desc": ("COALESCE(kuota_total, -1)", "DESC", ""),
+    "kuota_asc": ("COALESCE(kuota_total, -1)", "ASC", ""),
+    "aktif_desc": ("COALESCE(n_lowongan_aktif, -1)", "DESC", ""),
+    "aktif_asc": ("COALESCE(n_lowongan_aktif, -1)", "ASC", ""),
+}
+
+def encode_cursor(sort: str, key, row_id: int) -> str:
+    """Cursor opak: base64url dari [sort, kunci baris terakhir, id baris terakhir]."""
+    raw = json.dumps([sort, key, row_id], separators=(",", ":"),
+                     default=lambda o: o.isoformat() if hasattr(o, "isoformat") else str(o))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: str):
+    """→ (kunci, id). ValueError kalau cursor rusak atau dibuat untuk sort lain."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        c_sort, key, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError("cursor tidak valid")
+    if c_sort != sort or not isinstance(row_id, int) or isinstance(key, (list, dict)):
+        raise ValueError("cursor tidak cocok dengan sort")
+    return key, row_id
+
+def _keyset_page(where: List[str], params: Dict, sort: str, spec: Tuple[str, str, str],
+                 id_col: str, cursor: Optional[str]) -> str:
+    """Tambah kondisi "setelah cursor" ke where/params; return klausa ORDER BY (kunci, id)."""
+    key, direction, cast = spec
+    if cursor:
+        params["cursor_key"], params["cursor_id"] = decode_cursor(cursor, sort)
+        op = "<" if direction == "DESC" else ">"
+        ck = f"CAST(:cursor_key AS {cast})" if cast and settings.DATABASE_URL else ":cursor_key"
+        # bukan row-value (k, id) < (:k, :id): SQLite tidak memakai indeks ekspresi untuk bentuk itu
+        where.append(f"{key} {op}= {ck} AND ({key} {op} {ck} OR {id_col} {op} :cursor_id)")
+    return f"{key} {direction}, {id_col} {direction}"
+
+def _next_cursor(rows: List[dict], page_size: int, sort: str) -> Optional[str]:
+    """rows diambil page_size+1: baris ekstra = tanda masih ada halaman berikutnya (lalu dibuang)."""
+    more = len(rows) > page_size
+    del rows[page_size:]
+    keys = [r.pop("sort_key", None) for r in rows]
+    if not more or not rows:
+        return None
+    return encode_cursor(sort, keys[-1], rows[-1]["id"])
+
+def _lowongan_filter(query, perusahaan, lokasi, sektor, min_ar, max_ar, min_pelamar, max_pelamar,
+                     min_kuota, max_kuota, sort):
+    """Filter & urutan bersama list_lowongan dan iter_lowongan_export → (where, params, search, join, sort, spec)."""
+    USE_PG = bool(settings.DATABASE_URL)
     where = ["1=1"]
     params = {}
-    if query:
+    rank_join, rank = "", None
+    search = _search_clause(query, USE_PG) if query and settings.SEARCH_FTS else None
+    if search is not None:
+        fts_where, rank_join, rank, fts_params = search
+        where.append(fts_where)
+        params.update(fts_params)
+    elif query:
         where.append("(LOWER(judul) LIKE :q OR LOWER(perusahaan) LIKE :q)")
         params["q"] = f"%{query.lower()}%"
 
@@ -166,13 +549,17 @@ def list_lowongan(
     add_in("lokasi", lokasi, "lokasi_")
 
     if sektor:
-        like_parts = []
-        for i, v in enumerate([s for s in sektor if s and str(s).strip() != ""]):
-            k = f"sektor_like_{i}"
-            like_parts.append(f"LOWER(sektor) LIKE :{k}")
-            params[k] = f"%{str(v).lower()}%"
-        if like_parts:
-            where.append("(" + " OR ".join(like_parts) + ")")
+        # semi-join ke dimensi program studi (indeks nama + (program_studi_id, lowongan_id))
+        names = [str(v).strip() for v in sektor if v is not None and str(v).strip() != ""]
+        if names:
+            ph = []
+            for i, v in enumerate(names):
+                params[f"sektor_{i}"] = v
+                ph.append(f":sektor_{i}")
+            where.append(
+                "lowongan.id IN (SELECT lps.lowongan_id FROM lowongan_program_studi lps "
+                "JOIN program_studi ps ON ps.id = lps.program_studi_id "
+                f"WHERE ps.nama IN ({', '.join(ph)}))")
 
     if min_ar is not None:
         where.append("acceptance_rate >= :min_ar"); params["min_ar"] = min_ar
@@ -187,56 +574,126 @@ def list_lowongan(
     if max_kuota is not None:
         where.append("kuota <= :max_kuota"); params["max_kuota"] = max_kuota
 
+    sorts = _lowongan_sorts(USE_PG)
+    if rank:
+        sorts["relevance"] = rank
+    elif sort == "relevance":
+        sort = "recent"  # tanpa query teks, "relevance" = recent
+    if sort not in sorts:
+        sort = "recent"
+    join = rank_join if sort == "relevance" else ""
+    return where, params, search, join, sort, sorts[sort]
+
+def list_lowongan(
+    page: int = 1,
+    page_size: int = 20,
+    query: Optional[str] = None,
+    perusahaan: Optional[Sequence[str]] = None,
+    lokasi: Optional[Sequence[str]] = None,
+    sektor: Optional[Sequence[str]] = None,
+    min_ar: Optional[float] = None,
+    max_ar: Optional[float] = None,
+    min_pelamar: Optional[int] = None,
+    max_pelamar: Optional[int] = None,
+    min_kuota: Optional[int] = None,
+    max_kuota: Optional[int] = None,
+    sort: str = "recent",
+    cursor: Optional[str] = None,
+    with_total: Optional[bool] = None,
+):
+    """
+    → (rows, total, next_cursor). `cursor` (dari next_cursor respons sebelumnya) menggantikan `page`:
+    halaman ke-N sama murahnya dengan halaman 1. `with_total` default: hitung COUNT(*) hanya tanpa cursor
+    (halaman pertama); total=None kalau dilewati.
+    """
     USE_PG = bool(settings.DATABASE_URL)
-    sort_recent = "fetched_at DESC" if USE_PG else "datetime(fetched_at) DESC"
-    sort_map = {
-        "recent": sort_recent,
-        "ar_desc": "acceptance_rate DESC",
-        "ar_asc": "acceptance_rate ASC",
-        "pelamar_desc": "pelamar DESC",
-        "pelamar_asc": "pelamar ASC",
-        "kuota_desc": "kuota DESC",
-        "kuota_asc": "kuota ASC",
-    }
-    order = sort_map.get(sort, sort_map["recent"])
-    offset = (page - 1) * page_size
+    where, params, search, join, sort, spec = _lowongan_filter(
+        query, perusahaan, lokasi, sektor, min_ar, max_ar, min_pelamar, max_pelamar, min_kuota, max_kuota, sort)
+    if with_total is None:
+        with_total = cursor is None
+    count_where = list(where)
+    order = _keyset_page(where, params, sort, spec, "lowongan.id", cursor)
+    offset = 0 if cursor else (page - 1) * page_size
 
     with get_conn(settings.DB_PATH) as conn:
         cur = conn.cursor()
-        # ⚠️ pakai alias agar key di dict_row konsisten
-        total_q = f"SELECT COUNT(*) AS cnt FROM lowongan WHERE {' AND '.join(where)}"
-        cur.execute(total_q, params)
-        total = _read_count_row(cur.fetchone())
-
-        q = f"SELECT * FROM lowongan WHERE {' AND '.join(where)} ORDER BY {order} LIMIT :limit OFFSET :offset"
-        cur.execute(q, {**params, "limit": page_size, "offset": offset})
+        total = None
+        if with_total:
+            # ⚠️ pakai alias agar key di dict_row konsisten
+            if search is not None and not USE_PG and len(count_where) == 2:
+                # hanya filter teks: hitung langsung di index FTS (tanpa lookup ke lowongan)
+                total_q = "SELECT COUNT(*) AS cnt FROM lowongan_fts WHERE lowongan_fts MATCH :fts"
+            else:
+                total_q = f"SELECT COUNT(*) AS cnt FROM lowongan WHERE {' AND '.join(count_where)}"
+            # teks SQL dibangun dari kombinasi filter/sort/cursor → jangan di-prepare (statement server-side tak terbatas)
+            execute_unprepared(cur, total_q, {k: v for k, v in params.items() if not k.startswith("cursor_")})
+            total = _read_count_row(cur.fetchone())
+
+        q = (f"SELECT {_LOWONGAN_SELECT}, {spec[0]} AS sort_key FROM lowongan {join} "
+             f"WHERE {' AND '.join(where)} ORDER BY {order} LIMIT :limit OFFSET :offset")
+        execute_unprepared(cur, q, {**params, "limit": page_size + 1, "offset": offset})
         rows = [dict(r) for r in cur.fetchall()]
-        return rows, total
-
-
-def list_perusahaan(sort: str = "ar_desc", page: int = 1, page_size: int = 50):
-    sort_map = {
-        "ar_desc": "ar_rata2 DESC",
-        "ar_asc": "ar_rata2 ASC",
-        "pelamar_desc": "pelamar_total DESC",
-        "pelamar_asc": "pelamar_total ASC",
-        "kuota_desc": "kuota_total DESC",
-        "kuota_asc": "kuota_total ASC",
-        "aktif_desc": "n_lowongan_aktif DESC",
-        "aktif_asc": "n_lowongan_aktif ASC",
-    }
-    order = sort_map.get(sort, sort_map["ar_desc"])
-    offset = (page - 1) * page_size
+        return rows, total, _next_cursor(rows, page_size, sort)
+
+
+def iter_lowongan_export(
+    query: Optional[str] = None,
+    perusahaan: Optional[Sequence[str]] = None,
+    lokasi: Optional[Sequence[str]] = None,
+    sektor: Optional[Sequence[str]] = None,
+    min_ar: Optional[float] = None,
+    max_ar: Optional[float] = None,
+    min_pelamar: Optional[int] = None,
+    max_pelamar: Optional[int] = None,
+    min_kuota: Optional[int] = None,
+    max_kuota: Optional[int] = None,
+    sort: str = "recent",
+    batch: Optional[int] = None,
+) -> Iterator[List[dict]]:
+    """
+    Semua lowongan yang cocok filter (sama dengan list_lowongan), per batch EXPORT_BATCH baris, dari SATU
+    query yang di-stream: PG named cursor (server-side), SQLite cursor biasa (sqlite3 men-step hasil sesuai
+    fetchmany) → memori konstan berapa pun jumlah barisnya.
+    """
+    where, params, _search, join, sort, spec = _lowongan_filter(
+        query, perusahaan, lokasi, sektor, min_ar, max_ar, min_pelamar, max_pelamar, min_kuota, max_kuota, sort)
+    order = _keyset_page(where, params, sort, spec, "lowongan.id", None)
+    q = f"SELECT {_LOWONGAN_SELECT} FROM lowongan {join} WHERE {' AND '.join(where)} ORDER BY {order}"
+    batch = max(1, batch or settings.EXPORT_BATCH)
+    with get_stream_conn(settings.DB_PATH) as conn:
+        cur = conn.cursor(name="lowongan_export") if settings.DATABASE_URL else conn.cursor()
+        cur.execute(q, params)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            yield [dict(r) for r in rows]
+
+
+def list_perusahaan(sort: str = "ar_desc", page: int = 1, page_size: int = 50,
+                    cursor: Optional[str] = None, with_total: Optional[bool] = None):
+    """→ (rows, total, next_cursor); cursor/with_total sama seperti list_lowongan."""
+    if sort not in _PERUSAHAAN_SORTS:
+        sort = "ar_desc"
+    if with_total is None:
+        with_total = cursor is None
+    where: List[str] = ["1=1"]
+    params: Dict = {}
+    order = _keyset_page(where, params, sort, _PERUSAHAAN_SORTS[sort], "id", cursor)
+    offset = 0 if cursor else (page - 1) * page_size
 
     with get_conn(settings.DB_PATH) as conn:
         cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) AS cnt FROM perusahaan")
-        total = _read_count_row(cur.fetchone())
-
-        q = f"SELECT * FROM perusahaan ORDER BY {order} LIMIT :limit OFFSET :offset"
-        cur.execute(q, {"limit": page_size, "offset": offset})
+        total = None
+        if with_total:
+            execute_prepared(cur, "SELECT COUNT(*) AS cnt FROM perusahaan")
+            total = _read_count_row(cur.fetchone())
+
+        q = (f"SELECT *, {_PERUSAHAAN_SORTS[sort][0]} AS sort_key FROM perusahaan WHERE {' AND '.join(where)} "
+             f"ORDER BY {order} LIMIT :limit OFFSET :offset")
+        execute_unprepared(cur, q, {**params, "limit": page_size + 1, "offset": offset})
         rows = [dict(r) for r in cur.fetchall()]
-        return rows, total
+        return rows, total, _next_cursor(rows, page_size, sort)
     
     
 # === Distinct options for dropdowns (lokasi, sektor, perusahaan) ===
@@ -263,44 +720,13 @@ def _read_scalar(row, key_or_idx=0):
             return None
 
 
-def list_distinct_options():
-    """
-    Kembalikan daftar unik untuk dropdown:
-    - perusahaan: DISTINCT perusahaan
-    - lokasi    : DISTINCT lokasi
-    - sektor    : split ';' dari semua baris yang punya sektor
-    """
-    with get_conn(settings.DB_PATH) as conn:
-        cur = conn.cursor()
-
-        # Perusahaan
-        cur.execute("SELECT DISTINCT perusahaan FROM lowongan WHERE perusahaan IS NOT NULL AND perusahaan <> ''")
-        perusahaan = sorted({str(_read_scalar(r, "perusahaan") or _read_scalar(r, 0)).strip()
-                             for r in cur.fetchall() if _read_scalar(r, "perusahaan") or _read_scalar(r, 0)})
-
-        # Lokasi
-        cur.execute("SELECT DISTINCT lokasi FROM lowongan WHERE lokasi IS NOT NULL AND lokasi <> ''")
-        lokasi = sorted({str(_read_scalar(r, "lokasi") or _read_scalar(r, 0)).strip()
-                         for r in cur.fetchall() if _read_scalar(r, "lokasi") or _read_scalar(r, 0)})
-
-        # Sektor / Program Studi (split ';')
-        cur.execute("SELECT sektor FROM lowongan WHERE sektor IS NOT NULL AND sektor <> ''")
-        sektor_tokens = set()
-        for r in cur.fetchall():
-            val = _read_scalar(r, "sektor") or _read_scalar(r, 0)
-            if not val:
-                continue
-            for tok in str(val).split(";"):
-                t = tok.strip()
-                if t:
-                    sektor_tokens.add(t)
-        sektor = sorted(sektor_tokens)
-
-    return {
-        "perusahaan": perusahaan,
-        "lokasi": lokasi,
-        "sektor": sektor,
-    }
+def _list_program_studi(cur) -> List[str]:
+    # nama yang tidak dipakai lowongan mana pun lagi (sektor berubah / lowongan dihapus) tidak ditampilkan
+    cur.execute("""
+        SELECT nama FROM program_studi ps
+        WHERE EXISTS (SELECT 1 FROM lowongan_program_studi lps WHERE lps.program_studi_id = ps.id)
+    """)
+    return sorted(str(_read_scalar(r, "nama")) for r in cur.fetchall())
 
 # === OPTIONS untuk dropdown (lokasi, sektor/prodi, perusahaan) ===
 def list_options():
@@ -327,14 +753,8 @@ def list_options():
             if v:
                 perusahaan_set.add(v)
 
-        # Sektor / Program Studi: simpan “A; B; C” → pecah jadi item
-        cur.execute("SELECT sektor FROM lowongan WHERE sektor IS NOT NULL AND TRIM(sektor) <> ''")
-        for r in cur.fetchall():
-            s = (r["sektor"] if isinstance(r, dict) else r[0]) or ""
-            for part in str(s).split(";"):
-                p = part.strip()
-                if p:
-                    sektor_set.add(p)
+        # Sektor / Program Studi: dari tabel dimensi (bukan split “A; B; C” per baris)
+        sektor_set.update(_list_program_studi(cur))
 
     # urutkan biar rapi/terprediksi
     lokasi = sorted(lokasi_set)
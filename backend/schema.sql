@@ -40,7 +40,9 @@ CREATE TABLE IF NOT EXISTS site_stats (
   jumlah_perusahaan INTEGER,
   jumlah_lamaran INTEGER,
   total_lowongan INTEGER,
-  fetched_at TEXT
+  fetched_at TEXT,
+  snapshot_id INTEGER DEFAULT 0,  -- naik tiap upsert_site_stats (versi cache respons API)
+  snapshot_at TEXT                -- kapan snapshot_id terakhir naik (Last-Modified cache respons)
 );
 INSERT OR IGNORE INTO site_stats(id) VALUES(1);
 
@@ -55,6 +57,87 @@ CREATE TABLE IF NOT EXISTS program_timeline (
   order_index INTEGER DEFAULT 0
 );
 
+-- NEW: checkpoint crawl (resume run yang gagal di tengah)
+CREATE TABLE IF NOT EXISTS crawl_state (
+  run_id TEXT PRIMARY KEY,
+  last_page INTEGER DEFAULT 0,
+  status TEXT,
+  started_at TEXT,
+  updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS crawl_enriched (
+  run_id TEXT,
+  source_url TEXT,
+  PRIMARY KEY (run_id, source_url)
+);
+
+-- NEW: metrics per run scraper (span, counter, histogram latency fetch, error) — JSON
+CREATE TABLE IF NOT EXISTS scrape_runs (
+  run_id TEXT PRIMARY KEY,
+  status TEXT,
+  started_at TEXT,
+  finished_at TEXT,
+  spans TEXT,
+  counters TEXT,
+  histograms TEXT,
+  errors TEXT
+);
+
+-- NEW: dimensi Program Studi (dulu hanya string "A; B; C" di lowongan.sektor) + tabel join,
+-- diisi models.upsert_lowongan → filter sektor = semi-join berindeks, opsi dropdown = SELECT dari dimensi
+CREATE TABLE IF NOT EXISTS program_studi (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  nama TEXT UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS lowongan_program_studi (
+  lowongan_id INTEGER NOT NULL REFERENCES lowongan(id),
+  program_studi_id INTEGER NOT NULL REFERENCES program_studi(id),
+  PRIMARY KEY (lowongan_id, program_studi_id)
+);
+
+-- NEW: full-text search /api/lowongan?query= (external content → teks tidak disimpan dua kali;
+-- prefix index 2/3 huruf untuk typeahead). Sinkron lewat trigger, termasuk upsert ON CONFLICT DO UPDATE.
+CREATE VIRTUAL TABLE IF NOT EXISTS lowongan_fts USING fts5(
+  judul, perusahaan, lokasi, sektor, deskripsi_short,
+  content='lowongan', content_rowid='id',
+  tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS lowongan_fts_ai AFTER INSERT ON lowongan BEGIN
+  INSERT INTO lowongan_fts(rowid, judul, perusahaan, lokasi, sektor, deskripsi_short)
+  VALUES (new.id, new.judul, new.perusahaan, new.lokasi, new.sektor, new.deskripsi_short);
+END;
+
+CREATE TRIGGER IF NOT EXISTS lowongan_fts_ad AFTER DELETE ON lowongan BEGIN
+  INSERT INTO lowongan_fts(lowongan_fts, rowid, judul, perusahaan, lokasi, sektor, deskripsi_short)
+  VALUES ('delete', old.id, old.judul, old.perusahaan, old.lokasi, old.sektor, old.deskripsi_short);
+END;
+
+-- upsert menulis ulang semua kolom tiap run → index hanya disentuh kalau teks yang diindex berubah
+CREATE TRIGGER IF NOT EXISTS lowongan_fts_au AFTER UPDATE ON lowongan
+WHEN old.judul IS NOT new.judul OR old.perusahaan IS NOT new.perusahaan OR old.lokasi IS NOT new.lokasi
+  OR old.sektor IS NOT new.sektor OR old.deskripsi_short IS NOT new.deskripsi_short
+BEGIN
+  INSERT INTO lowongan_fts(lowongan_fts, rowid, judul, perusahaan, lokasi, sektor, deskripsi_short)
+  VALUES ('delete', old.id, old.judul, old.perusahaan, old.lokasi, old.sektor, old.deskripsi_short);
+  INSERT INTO lowongan_fts(rowid, judul, perusahaan, lokasi, sektor, deskripsi_short)
+  VALUES (new.id, new.judul, new.perusahaan, new.lokasi, new.sektor, new.deskripsi_short);
+END;
+
 CREATE INDEX IF NOT EXISTS idx_lowongan_company ON lowongan(perusahaan);
 CREATE INDEX IF NOT EXISTS idx_lowongan_ar ON lowongan(acceptance_rate);
-CREATE INDEX IF NOT EXISTS idx_lowongan_loc ON lowongan(lokasi);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_lowongan_loc ON lowongan(lokasi);
+CREATE INDEX IF NOT EXISTS idx_lowongan_program_studi_ps ON lowongan_program_studi(program_studi_id, lowongan_id);
+
+-- NEW: keyset pagination (models._lowongan_sorts / _PERUSAHAAN_SORTS): indeks (kunci sort, id);
+-- ekspresi harus sama persis dengan di models.py. Satu indeks melayani arah ASC & DESC.
+CREATE INDEX IF NOT EXISTS idx_lowongan_recent_key ON lowongan(COALESCE(datetime(fetched_at), ''), id);
+CREATE INDEX IF NOT EXISTS idx_lowongan_ar_key ON lowongan(COALESCE(acceptance_rate, -1), id);
+CREATE INDEX IF NOT EXISTS idx_lowongan_pelamar_key ON lowongan(COALESCE(pelamar, -1), id);
+CREATE INDEX IF NOT EXISTS idx_lowongan_kuota_key ON lowongan(COALESCE(kuota, -1), id);
+CREATE INDEX IF NOT EXISTS idx_perusahaan_ar_key ON perusahaan(COALESCE(ar_rata2, -1), id);
+CREATE INDEX IF NOT EXISTS idx_perusahaan_pelamar_key ON perusahaan(COALESCE(pelamar_total, -1), id);
+CREATE INDEX IF NOT EXISTS idx_perusahaan_kuota_key ON perusahaan(COALESCE(kuota_total, -1), id);
+CREATE INDEX IF NOT EXISTS idx_perusahaan_aktif_key ON perusahaan(COALESCE(n_lowongan_aktif, -1), id);
\ No newline at end of file
@@ -40,8 +40,13 @@ CREATE TABLE IF NOT EXISTS site_stats (
   jumlah_perusahaan INTEGER,
   jumlah_lamaran INTEGER,
   total_lowongan INTEGER,
-  fetched_at TIMESTAMPTZ
+  fetched_at TIMESTAMPTZ,
+  snapshot_id BIGINT DEFAULT 0,  -- naik tiap upsert_site_stats (versi cache respons API)
+  snapshot_at TIMESTAMPTZ        -- kapan snapshot_id terakhir naik (Last-Modified cache respons)
 );
+-- DB lama: kolom versi snapshot ditambahkan belakangan
+ALTER TABLE site_stats ADD COLUMN IF NOT EXISTS snapshot_id BIGINT DEFAULT 0;
+ALTER TABLE site_stats ADD COLUMN IF NOT EXISTS snapshot_at TIMESTAMPTZ;
 INSERT INTO site_stats(id) VALUES(1)
 ON CONFLICT (id) DO NOTHING;
 
@@ -55,6 +60,67 @@ CREATE TABLE IF NOT EXISTS program_timeline (
   order_index INTEGER DEFAULT 0
 );
 
+CREATE TABLE IF NOT EXISTS crawl_state (
+  run_id TEXT PRIMARY KEY,
+  last_page INTEGER DEFAULT 0,
+  status TEXT,
+  started_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS crawl_enriched (
+  run_id TEXT,
+  source_url TEXT,
+  PRIMARY KEY (run_id, source_url)
+);
+
+-- NEW: metrics per run scraper (span, counter, histogram latency fetch, error) — JSON
+CREATE TABLE IF NOT EXISTS scrape_runs (
+  run_id TEXT PRIMARY KEY,
+  status TEXT,
+  started_at TIMESTAMPTZ,
+  finished_at TIMESTAMPTZ,
+  spans TEXT,
+  counters TEXT,
+  histograms TEXT,
+  errors TEXT
+);
+
+-- NEW: dimensi Program Studi (dulu hanya string "A; B; C" di lowongan.sektor) + tabel join,
+-- diisi models.upsert_lowongan → filter sektor = semi-join berindeks, opsi dropdown = SELECT dari dimensi
+CREATE TABLE IF NOT EXISTS program_studi (
+  id SERIAL PRIMARY KEY,
+  nama TEXT UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS lowongan_program_studi (
+  lowongan_id INTEGER NOT NULL REFERENCES lowongan(id) ON DELETE CASCADE,
+  program_studi_id INTEGER NOT NULL REFERENCES program_studi(id),
+  PRIMARY KEY (lowongan_id, program_studi_id)
+);
+
+-- NEW: full-text search /api/lowongan?query= — tsvector tergenerate (config 'simple': tanpa stemming,
+-- teks campuran Indonesia/Inggris) + GIN; prefix match lewat to_tsquery('simple', 'kata:*')
+ALTER TABLE lowongan ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+  setweight(to_tsvector('simple', coalesce(judul, '')), 'A') ||
+  setweight(to_tsvector('simple', coalesce(perusahaan, '')), 'A') ||
+  setweight(to_tsvector('simple', coalesce(lokasi, '') || ' ' || coalesce(sektor, '')), 'B') ||
+  setweight(to_tsvector('simple', coalesce(deskripsi_short, '')), 'C')
+) STORED;
+CREATE INDEX IF NOT EXISTS idx_lowongan_search ON lowongan USING GIN (search_tsv);
+
 CREATE INDEX IF NOT EXISTS idx_lowongan_company ON lowongan(perusahaan);
 CREATE INDEX IF NOT EXISTS idx_lowongan_ar ON lowongan(acceptance_rate);
-CREATE INDEX IF NOT EXISTS idx_lowongan_loc ON lowongan(lokasi);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_lowongan_loc ON lowongan(lokasi);
+CREATE INDEX IF NOT EXISTS idx_lowongan_program_studi_ps ON lowongan_program_studi(program_studi_id, lowongan_id);
+
+-- NEW: keyset pagination (models._lowongan_sorts / _PERUSAHAAN_SORTS): indeks (kunci sort, id);
+-- ekspresi harus sama persis dengan di models.py. Satu indeks melayani arah ASC & DESC.
+CREATE INDEX IF NOT EXISTS idx_lowongan_recent_key ON lowongan((COALESCE(fetched_at, '1970-01-01 00:00:00+00'::timestamptz)), id);
+CREATE INDEX IF NOT EXISTS idx_lowongan_ar_key ON lowongan((COALESCE(acceptance_rate, -1)), id);
+CREATE INDEX IF NOT EXISTS idx_lowongan_pelamar_key ON lowongan((COALESCE(pelamar, -1)), id);
+CREATE INDEX IF NOT EXISTS idx_lowongan_kuota_key ON lowongan((COALESCE(kuota, -1)), id);
+CREATE INDEX IF NOT EXISTS idx_perusahaan_ar_key ON perusahaan((COALESCE(ar_rata2, -1)), id);
+CREATE INDEX IF NOT EXISTS idx_perusahaan_pelamar_key ON perusahaan((COALESCE(pelamar_total, -1)), id);
+CREATE INDEX IF NOT EXISTS idx_perusahaan_kuota_key ON perusahaan((COALESCE(kuota_total, -1)), id);
+CREATE INDEX IF NOT EXISTS idx_perusahaan_aktif_key ON perusahaan((COALESCE(n_lowongan_aktif, -1)), id);
\ No newline at end of file
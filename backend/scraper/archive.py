@@ -0,0 +1,160 @@
+# backend/scraper/archive.py
+"""
+Arsip snapshot mentah (HTML / JSON API) per run, content-addressed:
+- blob   : <root>/blobs/<2 hex>/<sha256>.html.zst (zstandard kalau terpasang) atau .html.gz (gzip)
+           key = sha256 isi = FetchResult.hash → halaman identik cuma disimpan sekali
+- manifest: <root>/manifest.jsonl, satu baris per fetch {url, hash, kind, fetched_at, run_id}
+
+Dipakai `python -m backend.scraper.reparse` untuk membangun ulang tabel lowongan tanpa menyentuh situs,
+dan `python -m backend.scraper.replay` untuk menyajikan ulang halaman yang terekam lewat HTTP lokal.
+"""
+import gzip, hashlib, json, os, threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..settings import settings
+
+try:  # opsional: kompresi lebih baik & lebih cepat dari gzip
+    import zstandard as _zstd
+except Exception:
+    _zstd = None
+
+LISTING_KINDS = ("listing", "listing_json")
+DETAIL_KINDS = ("detail", "detail_json")
+KINDS = LISTING_KINDS + DETAIL_KINDS + ("home",)
+
+
+class HtmlArchive:
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.blobs = self.root / "blobs"
+        self.manifest_path = self.root / "manifest.jsonl"
+        self.run_id: Optional[str] = None
+        self._lock = threading.Lock()
+        self._fh = None
+        self.stats = {"puts": 0, "stored": 0, "deduped": 0, "bytes_raw": 0, "bytes_written": 0}
+
+    # ---- blob ----
+    def _blob(self, digest: str, ext: str) -> Path:
+        return self.blobs / digest[:2] / f"{digest}.html.{ext}"
+
+    def _existing(self, digest: str) -> Optional[Path]:
+        for ext in ("zst", "gz"):
+            p = self._blob(digest, ext)
+            if p.exists():
+                return p
+        return None
+
+    @staticmethod
+    def _compress(data: bytes):
+        if _zstd is not None:
+            return "zst", _zstd.ZstdCompressor(level=10).compress(data)
+        return "gz", gzip.compress(data, compresslevel=6)
+
+    def put(self, url: str, content: str, kind: str, digest: Optional[str] = None,
+            fetched_at: Optional[str] = None) -> str:
+        """Simpan `content` (kalau belum ada) + catat di manifest. Return hash (sha256 hex)."""
+        data = content.encode("utf-8")
+        digest = digest or hashlib.sha256(data).hexdigest()
+        stored = False
+        if self._existing(digest) is None:
+            ext, blob = self._compress(data)
+            path = self._blob(digest, ext)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(path.suffix + f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(blob)
+            os.replace(tmp, path)  # atomic: pembaca tidak pernah melihat blob setengah jadi
+            stored = True
+        entry = {"url": url, "hash": digest, "kind": kind,
+                 "fetched_at": fetched_at or datetime.utcnow().isoformat(), "run_id": self.run_id}
+        with self._lock:
+            if self._fh is None:
+                self.root.mkdir(parents=True, exist_ok=True)
+                self._fh = open(self.manifest_path, "a", encoding="utf-8")
+            self._fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._fh.flush()
+            self.stats["puts"] += 1
+            self.stats["stored" if stored else "deduped"] += 1
+            self.stats["bytes_raw"] += len(data)
+            if stored:
+                self.stats["bytes_written"] += len(blob)
+        return digest
+
+    def get(self, digest: str) -> str:
+        path = self._existing(digest)
+        if path is None:
+            raise KeyError(digest)
+        raw = path.read_bytes()
+        if path.suffix == ".zst":
+            if _zstd is None:
+                raise RuntimeError("blob .zst butuh paket zstandard")
+            data = _zstd.ZstdDecompressor().decompress(raw)
+        else:
+            data = gzip.decompress(raw)
+        return data.decode("utf-8")
+
+    # ---- manifest ----
+    def manifest(self) -> Iterator[Dict]:
+        if not self.manifest_path.exists():
+            return
+        with open(self.manifest_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # baris terakhir terpotong (run crash di tengah tulis)
+
+    def select(self, run_id: Optional[str] = None) -> Tuple[Optional[str], List[Dict], Dict[str, Dict]]:
+        """
+        (run_id, entri listing run itu, {url: entri non-listing terbaru}).
+        Listing diambil dari run terakhir (atau `run_id`); detail/home terbaru per URL dari run mana pun.
+        """
+        runs: Dict[Optional[str], List[Dict]] = {}
+        last_run = None
+        latest: Dict[str, Dict] = {}
+        for e in self.manifest():
+            if e.get("kind") in LISTING_KINDS:
+                runs.setdefault(e.get("run_id"), []).append(e)
+                last_run = e.get("run_id")
+            elif e.get("url"):
+                prev = latest.get(e["url"])
+                if prev is None or (e.get("fetched_at") or "") >= (prev.get("fetched_at") or ""):
+                    latest[e["url"]] = e
+        run_id = run_id if run_id is not None else last_run
+        # halaman yang sama bisa terarsip dua kali (resume / retry) → pakai snapshot terakhirnya
+        pages: Dict[str, Dict] = {}
+        for e in runs.get(run_id, []):
+            pages[e["url"]] = e
+        return run_id, list(pages.values()), latest
+
+    def report(self):
+        s = self.stats
+        if not s["puts"]:
+            return
+        print(f"[INFO] HTML archive {self.root}: puts={s['puts']} stored={s['stored']} deduped={s['deduped']} "
+              f"• {s['bytes_raw']/1e6:0.1f} MB raw → {s['bytes_written']/1e6:0.1f} MB written", flush=True)
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+_archive: Optional[HtmlArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> Optional[HtmlArchive]:
+    """Arsip bersama per proses (None kalau HTML_ARCHIVE=0)."""
+    global _archive
+    if not settings.HTML_ARCHIVE:
+        return None
+    with _archive_lock:
+        if _archive is None:
+            _archive = HtmlArchive(settings.HTML_ARCHIVE_DIR)
+        return _archive
@@ -0,0 +1,158 @@
+# backend/scraper/async_enrich.py
+import asyncio
+from time import perf_counter
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+from ..settings import settings
+from .fetch import fetch_html_requests
+from .parse import apply_detail_fields
+from .readiness import wait_ready_async
+from .intercept import install_blocking_async
+from .metrics import run_metrics
+
+
+class HostRateLimiter:
+    """
+    Rate limit per host tanpa memblokir thread: tiap request "memesan" slot waktu
+    berjarak `min_interval` detik dari slot sebelumnya di host yang sama, lalu await sampai slotnya tiba.
+    Pengganti time.sleep(THROTTLE_SECONDS) untuk engine async.
+    """
+    def __init__(self, min_interval: float):
+        self.min_interval = max(0.0, float(min_interval or 0.0))
+        self._next_slot: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str):
+        if self.min_interval <= 0:
+            return
+        host = urlparse(url).netloc
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def render_detail_page_async(page, url: str) -> str:
+    """Versi async dari fetch.render_detail_page (readiness detail + nudge scroll)."""
+    await page.goto(url, timeout=120_000, wait_until="domcontentloaded")
+    await wait_ready_async(page, "detail", budget=2.0, timeout=30_000, nudge=True)
+    return await page.content()
+
+
+class _AsyncBrowser:
+    """Satu browser + context bersama untuk semua page; di-launch ulang kalau putus."""
+    def __init__(self, pw):
+        self._pw = pw
+        self.browser = None
+        self.ctx = None
+        self.launches = 0
+        self._lock = asyncio.Lock()
+
+    async def context(self):
+        async with self._lock:
+            if self.browser is None or not self.browser.is_connected():
+                self.browser = await self._pw.chromium.launch(headless=True)
+                self.ctx = await self.browser.new_context(user_agent=settings.USER_AGENT,
+                                                          viewport={"width": 1366, "height": 900})
+                await install_blocking_async(self.ctx)
+                self.launches += 1
+            return self.ctx
+
+    async def close(self):
+        try:
+            if self.browser is not None:
+                await self.browser.close()
+        except Exception:
+            pass
+
+
+async def enrich_stream_async(get_row: Callable[[], Optional[Dict]],
+                              put_row: Callable[[Dict], object],
+                              concurrency: int = None, parser=None, archive=None):
+    """
+    Inti engine async: ambil baris lewat `get_row()` (blocking, None = habis) dan serahkan hasil
+    ke `put_row(row)` begitu selesai. Slot Semaphore diambil SEBELUM baris berikutnya ditarik,
+    jadi paling banyak `concurrency` baris in-flight (memori tetap datar).
+    Rate per host diatur HostRateLimiter (DETAIL_HOST_INTERVAL), bukan time.sleep.
+    `parser` (ParsePool) → parsing HTML detail di worker proses; `archive` → simpan HTML detail mentah.
+    """
+    from playwright.async_api import async_playwright
+
+    concurrency = max(1, concurrency or settings.DETAIL_CONCURRENCY)
+    sem = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(settings.DETAIL_HOST_INTERVAL)
+
+    async with async_playwright() as pw:
+        handle = _AsyncBrowser(pw)
+
+        async def one(r: Dict):
+            t0 = perf_counter()
+            try:
+                url = r.get("source_url")
+                html = None
+                if url:
+                    await limiter.wait(url)
+                    t_fetch = perf_counter()
+                    try:
+                        ctx = await handle.context()
+                        page = await ctx.new_page()
+                        try:
+                            html = await render_detail_page_async(page, url)
+                        finally:
+                            await page.close()
+                        run_metrics.observe("detail_async", perf_counter() - t_fetch)
+                        run_metrics.inc("bytes_fetched", len(html.encode("utf-8")))
+                    except Exception as e:
+                        run_metrics.error("detail_render", e, url)
+                        run_metrics.inc("detail_fallback")
+                        # fallback: static HTML (rate sudah diatur limiter → tanpa sleep)
+                        try:
+                            html = (await asyncio.to_thread(fetch_html_requests, url, False, "detail_requests")).html
+                        except Exception as e2:
+                            run_metrics.error("detail_requests", e2, url)
+                            html = None
+                if html:
+                    if archive is not None:
+                        await asyncio.to_thread(archive.put, url, html, "detail")
+                    try:
+                        # parsing CPU-bound → worker proses / thread supaya event loop tetap melayani page lain
+                        if parser is not None:
+                            await parser.apply_detail_async(r, html)
+                        else:
+                            await asyncio.to_thread(apply_detail_fields, r, html)
+                    except Exception as e:
+                        run_metrics.error("detail_parse", e, url)
+                ok = bool(r.get("sektor") or r.get("deskripsi_short"))
+                run_metrics.inc("detail_ok" if ok else ("detail_empty" if html else "detail_fail"))
+                run_metrics.add_span("enrich", perf_counter() - t0)
+                await asyncio.to_thread(put_row, r)
+            finally:
+                sem.release()
+
+        tasks = set()
+        try:
+            while True:
+                await sem.acquire()
+                r = await asyncio.to_thread(get_row)
+                if r is None:
+                    sem.release()
+                    break
+                t = asyncio.create_task(one(r))
+                tasks.add(t)
+                t.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*list(tasks))
+        finally:
+            await handle.close()
+        print(f"[INFO] Async enrich: browser launches={handle.launches}", flush=True)
+
+
+def enrich_stream(get_row, put_row, concurrency: int = None, parser=None, archive=None):
+    """Entry point sync (dijalankan di thread stage enrich pipeline)."""
+    asyncio.run(enrich_stream_async(get_row, put_row, concurrency=concurrency, parser=parser, archive=archive))
+
@@ -0,0 +1,336 @@
+# backend/scraper/bench.py
+"""
+Benchmark end-to-end scraper di atas fixture rekaman (arsip HTML, lihat archive.py / replay.py).
+
+    python -m backend.scraper.bench [--stages listing_parse,detail_parse,...] [--limit 500]
+                                    [--out bench.json] [--baseline bench_baseline.json] [--save-baseline]
+                                    [--pg-url postgresql://localhost/scratch] [--tolerance 0.2]
+
+Stage (masing-masing di subprocess sendiri → peak RSS per stage akurat):
+- pagination   : iter_listing_pages_playwright terhadap server replay (butuh USE_PLAYWRIGHT=1)
+- listing_parse: parse_listing_with_total (LISTING_PARSER) atas halaman listing terarsip
+- detail_parse : parse_detail_fields atas halaman detail terarsip
+- enrich       : _make_enrich_one (DetailBrowserPool/requests) terhadap server replay, DETAIL_WORKERS thread
+- upsert_sqlite / upsert_postgres: upsert_lowongan per UPSERT_BATCH ke DB kosong, lalu pass update
+  (source_url diberi prefix bench:// dan dihapus lagi; Postgres hanya kalau --pg-url diberikan)
+
+Output JSON: items, detik, item/s, p50/p95 latency per item (ms), peak RSS (MB) per stage.
+Dengan --baseline: throughput turun / p95 / RSS naik lebih dari --tolerance → [FAIL] dan exit 1.
+"""
+import argparse, json, os, platform, subprocess, sys, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import perf_counter
+from typing import Dict, List, Optional
+
+STAGES = ("pagination", "listing_parse", "detail_parse", "enrich", "upsert_sqlite", "upsert_postgres")
+RESULT_PREFIX = "BENCH_RESULT "
+# metrik yang dibandingkan dengan baseline: (key, True kalau makin besar makin baik)
+COMPARED = (("per_s", True), ("p95_ms", False), ("peak_rss_mb", False))
+
+
+def _percentile(sorted_vals: List[float], q: float) -> Optional[float]:
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[k]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    kb_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss  # worker ParsePool
+    peak = max(kb, kb_children)
+    # Linux: KB, macOS: byte
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Meter:
+    """Latency per item + jumlah item; `result()` → dict metrik satu stage."""
+    def __init__(self, unit: str):
+        self.unit = unit
+        self.lat: List[float] = []
+        self.items = 0
+        self.extra: Dict = {}
+        self.t0 = perf_counter()
+
+    def add(self, seconds: float, n: int = 1):
+        self.lat.append(seconds)
+        self.items += n
+
+    def result(self) -> Dict:
+        wall = perf_counter() - self.t0
+        lat = sorted(self.lat)
+        p50, p95 = _percentile(lat, 0.5), _percentile(lat, 0.95)
+        out = {
+            "unit": self.unit,
+            "items": self.items,
+            "seconds": round(wall, 4),
+            "per_s": round(self.items / wall, 2) if wall > 0 else None,
+            "p50_ms": round(p50 * 1000, 3) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 3) if p95 is not None else None,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+        out.update(self.extra)
+        return out
+
+
+# ================= stage (dijalankan di subprocess) =================
+def _store(args):
+    from backend.scraper.replay import open_store
+    return open_store(args.archive_dir, args.run_id)
+
+
+def _listing_html(store, limit: int) -> List[str]:
+    _, listing, _ = store.archive.select(store.run_id)
+    return [store.archive.get(e["hash"]) for e in listing if e.get("kind") == "listing"][:limit]
+
+
+def _listing_rows(store, limit: int) -> List[Dict]:
+    from backend.scraper.parse import parse_listing_with_total
+    from backend.scraper.run_full_scrape import _base_root, _finalize_row
+    rows, seen = [], set()
+    for html in _listing_html(store, limit):
+        for r in parse_listing_with_total(html)[0]:
+            _finalize_row(r, _base_root())
+            if r.get("source_url") and r["source_url"] not in seen:
+                seen.add(r["source_url"])
+                rows.append(r)
+    return rows[:limit]
+
+
+def stage_pagination(args) -> Dict:
+    from backend.settings import settings
+    from backend.scraper.replay import ReplayServer
+    from backend.scraper.fetch import iter_listing_pages_playwright
+    if not settings.USE_PLAYWRIGHT:
+        return {"skipped": "USE_PLAYWRIGHT=0"}
+    store = _store(args)
+    with ReplayServer(store, latency_ms=args.latency_ms) as server:
+        settings.BASE_URL = f"{server.url}/lowongan"
+        m = Meter("pages")
+        t = perf_counter()
+        for _ in iter_listing_pages_playwright(server.url, min(store.pages, args.limit)):
+            now = perf_counter()
+            m.add(now - t)
+            t = now
+    return m.result()
+
+
+def stage_listing_parse(args) -> Dict:
+    from backend.settings import settings
+    from backend.scraper.parse import parse_listing_with_total
+    pages = _listing_html(_store(args), args.limit)
+    m = Meter("pages")
+    rows = 0
+    for html in pages:
+        t = perf_counter()
+        rows += len(parse_listing_with_total(html)[0])
+        m.add(perf_counter() - t)
+    res = m.result()
+    res.update(rows=rows, rows_per_s=round(rows / res["seconds"], 2) if res["seconds"] else None,
+               parser=settings.LISTING_PARSER)
+    return res
+
+
+def stage_detail_parse(args) -> Dict:
+    from backend.scraper.parse import parse_detail_fields
+    store = _store(args)
+    _, _, latest = store.archive.select(store.run_id)
+    entries = [e for e in latest.values() if e.get("kind") == "detail"][:args.limit]
+    pages = [store.archive.get(e["hash"]) for e in entries]
+    m = Meter("pages")
+    for html in pages:
+        t = perf_counter()
+        parse_detail_fields(html)
+        m.add(perf_counter() - t)
+    return m.result()
+
+
+def stage_enrich(args) -> Dict:
+    from backend.settings import settings
+    from backend.scraper.replay import ReplayServer
+    from backend.scraper.pool import DetailBrowserPool
+    from backend.scraper.run_full_scrape import _make_enrich_one
+    store = _store(args)
+    workers = max(1, settings.DETAIL_WORKERS)
+    with ReplayServer(store, latency_ms=args.latency_ms) as server:
+        settings.BASE_URL = f"{server.url}/lowongan"  # source_url hasil parse → server replay
+        rows = _listing_rows(store, args.limit)
+        pool = DetailBrowserPool(size=workers) if settings.DETAIL_POOL else None
+        enrich_one = _make_enrich_one(pool=pool)
+        m = Meter("rows")
+
+        def timed(r):
+            t = perf_counter()
+            enrich_one(r)
+            return perf_counter() - t, bool(r.get("sektor"))
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                results = list(ex.map(timed, rows))
+        finally:
+            if pool is not None:
+                pool.close()
+        for dt, _ in results:
+            m.add(dt)
+        m.extra.update(workers=workers, with_prodi=sum(1 for _, ok in results if ok),
+                       replay_misses=server.counts["miss"])
+    return m.result()
+
+
+def stage_upsert(args) -> Dict:
+    from backend.settings import settings
+    from backend.models import upsert_lowongan, delete_lowongan
+    from backend.scraper.run_full_scrape import init_db
+    rows = _listing_rows(_store(args), args.limit)
+    for r in rows:
+        r["source_url"] = r["external_id"] = "bench://" + (r.get("source_url") or "")
+    init_db()
+    batch = max(1, settings.UPSERT_BATCH)
+    m = Meter("rows")
+    for _pass in ("insert", "update"):
+        for i in range(0, len(rows), batch):
+            chunk = rows[i:i + batch]
+            t = perf_counter()
+            upsert_lowongan(chunk)
+            m.add(perf_counter() - t, len(chunk))
+    res = m.result()
+    delete_lowongan([r["source_url"] for r in rows])
+    res.update(unit="rows", latency_per="batch", batch=batch)
+    return res
+
+
+_STAGE_FN = {
+    "pagination": stage_pagination,
+    "listing_parse": stage_listing_parse,
+    "detail_parse": stage_detail_parse,
+    "enrich": stage_enrich,
+    "upsert_sqlite": stage_upsert,
+    "upsert_postgres": stage_upsert,
+}
+
+
+# ================= orkestrasi =================
+def _run_stage(name: str, args, tmpdir: str) -> Dict:
+    env = dict(os.environ, HTML_ARCHIVE="0")
+    if name == "upsert_sqlite":
+        env.update(DATABASE_URL="", DB_PATH=os.path.join(tmpdir, "bench.sqlite"))
+    elif name == "upsert_postgres":
+        if not args.pg_url:
+            return {"skipped": "--pg-url tidak diberikan"}
+        env["DATABASE_URL"] = args.pg_url
+    cmd = [sys.executable, "-m", "backend.scraper.bench", "--stage", name,
+           "--limit", str(args.limit), "--latency-ms", str(args.latency_ms)]
+    if args.archive_dir:
+        cmd += ["--archive-dir", args.archive_dir]
+    if args.run_id:
+        cmd += ["--run", args.run_id]
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    tail = (proc.stderr or proc.stdout).strip().splitlines()[-3:]
+    return {"error": f"exit {proc.returncode}: {' | '.join(tail)}"}
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Daftar regresi (string) stage-per-stage terhadap baseline."""
+    out = []
+    for name, base in (baseline.get("stages") or {}).items():
+        cur = (current.get("stages") or {}).get(name)
+        if not cur or "skipped" in cur or "skipped" in base or "error" in base:
+            continue
+        if "error" in cur:
+            out.append(f"{name}: error ({cur['error']})")
+            continue
+        for key, higher_better in COMPARED:
+            b, c = base.get(key), cur.get(key)
+            if not b or c is None:
+                continue
+            worse = c < b * (1 - tolerance) if higher_better else c > b * (1 + tolerance)
+            if worse:
+                out.append(f"{name}.{key}: {c} vs baseline {b} ({(c - b) / b * 100:+0.1f}%)")
+    return out
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark scraper atas fixture arsip HTML")
+    ap.add_argument("--stages", default=",".join(STAGES), help="daftar stage dipisah koma")
+    ap.add_argument("--stage", default=None, help=argparse.SUPPRESS)  # mode subprocess
+    ap.add_argument("--limit", type=int, default=500, help="maks item per stage")
+    ap.add_argument("--run", dest="run_id", default=None, help="run_id arsip (default: run terakhir)")
+    ap.add_argument("--archive-dir", default=None, help="override HTML_ARCHIVE_DIR")
+    ap.add_argument("--latency-ms", type=int, default=0, help="jeda buatan server replay")
+    ap.add_argument("--pg-url", default=os.getenv("BENCH_DATABASE_URL"),
+                    help="Postgres lokal untuk upsert_postgres (default: env BENCH_DATABASE_URL)")
+    ap.add_argument("--out", default=None, help="tulis hasil JSON ke file")
+    ap.add_argument("--baseline", default=None, help="file JSON baseline untuk dibandingkan")
+    ap.add_argument("--save-baseline", action="store_true", help="simpan hasil sebagai --baseline")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="regresi relatif yang masih diterima")
+    args = ap.parse_args(argv)
+
+    if args.stage:
+        print(RESULT_PREFIX + json.dumps(_STAGE_FN[args.stage](args)), flush=True)
+        return 0
+
+    names = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in names if s not in STAGES]
+    if unknown:
+        ap.error(f"stage tidak dikenal: {', '.join(unknown)}")
+
+    from backend.settings import settings
+    result = {
+        "meta": {"timestamp": datetime.utcnow().isoformat(), "git": _git_rev(), "python": platform.python_version(),
+                 "machine": platform.machine(), "cpus": os.cpu_count(), "limit": args.limit,
+                 "latency_ms": args.latency_ms, "archive": args.archive_dir or settings.HTML_ARCHIVE_DIR,
+                 "run_id": args.run_id},
+        "stages": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmpdir:
+        for name in names:
+            res = _run_stage(name, args, tmpdir)
+            result["stages"][name] = res
+            if "skipped" in res or "error" in res:
+                print(f"[WARN] {name}: {res.get('skipped') or res.get('error')}", flush=True)
+                continue
+            print(f"[time] {name}: {res['items']} {res['unit']} in {res['seconds']:0.2f}s • {res['per_s']}/s "
+                  f"• p50 {res['p50_ms']} ms • p95 {res['p95_ms']} ms • peak RSS {res['peak_rss_mb']} MB", flush=True)
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text, flush=True)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[INFO] Baseline disimpan → {args.baseline}", flush=True)
+        return 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"[FAIL] {r}", flush=True)
+        if regressions:
+            return 1
+        print(f"[INFO] Tidak ada regresi vs {args.baseline} (toleransi {args.tolerance:.0%})", flush=True)
+    errors = [n for n, r in result["stages"].items() if "error" in r]
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
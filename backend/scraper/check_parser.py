@@ -0,0 +1,107 @@
+# backend/scraper/check_parser.py
+"""
+Cek parity + kecepatan parser atas HTML yang tersimpan.
+
+    python -m backend.scraper.check_parser [halaman1.html dir_fixture/] [--repeat 5]
+        listing: backend lxml vs bs4 (tanpa path → fixtures/listing, halaman listing anonim yang di-commit)
+    python -m backend.scraper.check_parser --detail [detail_dir/] [--repeat 5]
+        detail : parse_detail_page (1× parse) vs parse_detail_program_studi + parse_detail_deskripsi
+                 (tanpa path → fixtures/detail)
+
+Exit code 1 kalau ada hasil yang berbeda (kolom fetched_at diabaikan).
+"""
+import argparse, sys
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List
+
+from backend.scraper.parse import (
+    parse_listing_page_bs4, parse_listing_page_lxml,
+    parse_detail_program_studi, parse_detail_deskripsi, parse_detail_page
+)
+
+IGNORE = {"fetched_at"}
+# contoh HTML anonim (struktur Vuetify situs, data fiktif) → parity bisa dicek di CI tanpa scrape live
+FIXTURES_DIR = Path(__file__).with_name("fixtures")
+
+
+def _files(paths: List[str]) -> List[Path]:
+    out = []
+    for p in map(Path, paths):
+        out.extend(sorted(p.glob("*.html")) if p.is_dir() else [p])
+    return out
+
+
+def _strip(rows: List[Dict]) -> List[Dict]:
+    return [{k: v for k, v in r.items() if k not in IGNORE} for r in rows]
+
+
+def diff_rows(a: List[Dict], b: List[Dict]) -> List[str]:
+    a, b = _strip(a), _strip(b)
+    out = []
+    if len(a) != len(b):
+        out.append(f"jumlah kartu: bs4={len(a)} lxml={len(b)}")
+    for i, (ra, rb) in enumerate(zip(a, b)):
+        for k in sorted(set(ra) | set(rb)):
+            if ra.get(k) != rb.get(k):
+                out.append(f"kartu {i} [{k}]: bs4={ra.get(k)!r} lxml={rb.get(k)!r}")
+    return out
+
+
+def check_detail(files: List[Path], repeat: int) -> int:
+    mismatches, t_old, t_new = 0, 0.0, 0.0
+    for f in files:
+        html = f.read_text(encoding="utf-8", errors="replace")
+        for _ in range(max(1, repeat)):
+            t0 = perf_counter()
+            old = (parse_detail_program_studi(html), parse_detail_deskripsi(html))
+            t_old += perf_counter() - t0
+            t0 = perf_counter()
+            d = parse_detail_page(html)
+            t_new += perf_counter() - t0
+        new = (d["program_studi"], d["deskripsi"])
+        if old != new:
+            mismatches += 1
+            print(f"[WARN] {f}: lama={old!r} baru={new!r}", flush=True)
+    n = max(1, len(files) * max(1, repeat))
+    print(f"[INFO] {len(files)} file detail • mismatch={mismatches} • "
+          f"2 fungsi {t_old/n*1000:0.2f} ms/page • parse_detail_page {t_new/n*1000:0.2f} ms/page "
+          f"({(t_old/t_new if t_new else 0):0.1f}× lebih cepat)", flush=True)
+    return 1 if mismatches else 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Parity & timing parser (listing lxml vs bs4, atau detail)")
+    ap.add_argument("paths", nargs="*", help="file .html atau direktori berisi *.html (default: fixtures/)")
+    ap.add_argument("--repeat", type=int, default=3, help="ulangi parse untuk timing")
+    ap.add_argument("--detail", action="store_true", help="bandingkan parser halaman detail")
+    args = ap.parse_args(argv)
+
+    files = _files(args.paths or [str(FIXTURES_DIR / ("detail" if args.detail else "listing"))])
+    if not files:
+        print("[WARN] Tidak ada file HTML untuk dicek.", flush=True)
+        return 1
+    if args.detail:
+        return check_detail(files, args.repeat)
+    mismatches, t_bs4, t_lxml, cards = 0, 0.0, 0.0, 0
+    for f in files:
+        html = f.read_text(encoding="utf-8", errors="replace")
+        for _ in range(max(1, args.repeat)):
+            t0 = perf_counter(); a = parse_listing_page_bs4(html); t_bs4 += perf_counter() - t0
+            t0 = perf_counter(); b = parse_listing_page_lxml(html); t_lxml += perf_counter() - t0
+        cards += len(a)
+        diffs = diff_rows(a, b)
+        if diffs:
+            mismatches += 1
+            print(f"[WARN] {f}: {len(diffs)} perbedaan", flush=True)
+            for d in diffs[:20]:
+                print(f"       {d}", flush=True)
+    n = max(1, len(files) * max(1, args.repeat))
+    print(f"[INFO] {len(files)} file • {cards} kartu • mismatch={mismatches} • "
+          f"bs4 {t_bs4/n*1000:0.2f} ms/page • lxml {t_lxml/n*1000:0.2f} ms/page "
+          f"({(t_bs4/t_lxml if t_lxml else 0):0.1f}× lebih cepat)", flush=True)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# backend/scraper/checkpoint.py
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from ..models import (
+    load_crawl_state, save_crawl_state, load_crawl_enriched,
+    add_crawl_enriched, delete_crawl_enriched
+)
+
+
+class CrawlCheckpoint:
+    """
+    Checkpoint per run_id di tabel crawl_state + crawl_enriched (DB utama, jadi ikut bertahan
+    di Neon saat job CI di-retry):
+    - last_page: watermark halaman yang SEMUA barisnya sudah tersimpan (berurutan dari halaman 1)
+    - done     : source_url yang sudah tersimpan di run ini → dilewati saat resume
+
+    Dipakai pipeline crawl_listing: stage parse memanggil `track`/`page_parsed`,
+    writer memanggil `flushed` setelah batch berhasil di-upsert.
+    """
+    def __init__(self, run_id: str, last_page: int = 0, done: Optional[set] = None):
+        self.run_id = run_id
+        self.last_page = last_page
+        self.done = done or set()
+        self._pending: Dict[int, int] = {}   # halaman → jumlah baris belum tersimpan
+        self._parsed = set()                  # halaman yang semua barisnya sudah keluar dari parser
+        self._page_of: Dict[int, int] = {}    # id(row) → halaman
+        self._lock = threading.Lock()
+
+    @property
+    def start_page(self) -> int:
+        return self.last_page + 1
+
+    @classmethod
+    def open(cls, run_id: Optional[str] = None, resume: bool = False) -> "CrawlCheckpoint":
+        """
+        resume=True → lanjutkan run `run_id` (atau run 'running' terakhir kalau run_id kosong).
+        Selain itu mulai run baru (run_id default: timestamp UTC).
+        """
+        if resume:
+            state = load_crawl_state(run_id)
+            if state and state.get("status") != "done":
+                ck = cls(state["run_id"], int(state.get("last_page") or 0), load_crawl_enriched(state["run_id"]))
+                print(f"[INFO] Resume run {ck.run_id}: mulai halaman {ck.start_page}, "
+                      f"{len(ck.done)} baris sudah tersimpan.", flush=True)
+                return ck
+            print("[INFO] Tidak ada run yang bisa di-resume; mulai run baru.", flush=True)
+        ck = cls(run_id or datetime.utcnow().strftime("%Y%m%dT%H%M%S"))
+        delete_crawl_enriched(ck.run_id)
+        save_crawl_state(ck.run_id, 0, "running", datetime.utcnow().isoformat())
+        return ck
+
+    # ---- dipanggil stage parse ----
+    def track(self, page_no: int, row: dict):
+        with self._lock:
+            self._pending[page_no] = self._pending.get(page_no, 0) + 1
+            self._page_of[id(row)] = page_no
+
+    def page_parsed(self, page_no: int):
+        with self._lock:
+            self._pending.setdefault(page_no, 0)
+            self._parsed.add(page_no)
+        self._advance()
+
+    # ---- dipanggil writer setelah sink sukses ----
+    def flushed(self, rows: Iterable[dict]):
+        urls = []
+        with self._lock:
+            for r in rows:
+                page_no = self._page_of.pop(id(r), None)
+                if page_no is not None:
+                    self._pending[page_no] -= 1
+                if r.get("source_url"):
+                    urls.append(r["source_url"])
+        add_crawl_enriched(self.run_id, urls)
+        self._advance()
+
+    def _advance(self):
+        moved = False
+        with self._lock:
+            while (self.last_page + 1) in self._parsed and self._pending.get(self.last_page + 1, 0) == 0:
+                self.last_page += 1
+                self._parsed.discard(self.last_page)
+                self._pending.pop(self.last_page, None)
+                moved = True
+            last_page = self.last_page
+        if moved:
+            save_crawl_state(self.run_id, last_page, "running", datetime.utcnow().isoformat())
+
+    def finish(self):
+        save_crawl_state(self.run_id, self.last_page, "done", datetime.utcnow().isoformat())
+        delete_crawl_enriched(self.run_id)
@@ -1,9 +1,13 @@
 # backend/scraper/fetch.py
-import time, math, re
+import time, math, re, queue, threading
 import hashlib, requests
+from typing import List, Optional
 from ..settings import settings
 from playwright.sync_api import sync_playwright
-from .parse import parse_total_lowongan, parse_listing_page
+from .parse import parse_total_lowongan
+from .readiness import LISTING_CARD_SELECTOR, wait_ready
+from .intercept import install_blocking
+from .metrics import run_metrics
 
 HEADERS = {"User-Agent": settings.USER_AGENT}
 
@@ -11,12 +15,19 @@ class FetchResult:
     def __init__(self, url: str, html: str):
         self.url = url
         self.html = html
-        self.hash = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        data = html.encode("utf-8")
+        self.size = len(data)
+        self.hash = hashlib.sha256(data).hexdigest()
 
-def fetch_html_requests(url: str) -> FetchResult:
+def fetch_html_requests(url: str, throttle: bool = True, kind: str = "requests") -> FetchResult:
+    """throttle=False kalau pemanggil sudah mengatur rate sendiri (mis. HostRateLimiter async)."""
+    t0 = time.perf_counter()
     r = requests.get(url, headers=HEADERS, timeout=settings.REQUEST_TIMEOUT)
     r.raise_for_status()
-    time.sleep(settings.THROTTLE_SECONDS)
+    run_metrics.observe(kind, time.perf_counter() - t0)
+    run_metrics.inc("bytes_fetched", len(r.content))
+    if throttle:
+        time.sleep(settings.THROTTLE_SECONDS)
     return FetchResult(url, r.text)
 
 def fetch_html_playwright(url: str) -> FetchResult:
@@ -24,7 +35,7 @@ def fetch_html_playwright(url: str) -> FetchResult:
     Render satu halaman dengan Playwright (untuk halaman yang benar-benar punya URL).
     """
     try:
-        from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
+        from playwright.sync_api import sync_playwright
     except Exception:
         return fetch_html_requests(url)
 
@@ -33,40 +44,126 @@ def fetch_html_playwright(url: str) -> FetchResult:
         browser = p.chromium.launch(headless=True)
         ctx = browser.new_context(user_agent=ua,
                                   viewport={"width": 1366, "height": 900})
+        install_blocking(ctx)
         page = ctx.new_page()
-        page.goto(url, timeout=90_000, wait_until="networkidle")
-
-        # Toleran menunggu listing siap
-        for sel in [
-            "a.v-card.v-card--flat.v-card--link[href*='/lowongan/view/']",
-            "text=Daftar Lowongan Magang",
-        ]:
-            try:
-                page.wait_for_selector(sel, timeout=10_000)
-                break
-            except PWTimeout:
-                pass
-
-        # Nudge lazy-load
-        for _ in range(3):
-            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            time.sleep(0.6)
+        page.goto(url, timeout=90_000, wait_until="domcontentloaded")
+        # kartu listing (atau isi halaman lain, mis. beranda) ada + stabil, sekali scroll untuk lazy-load
+        # — pengganti networkidle + 3× sleep(0.6)
+        kind = "listing" if "/lowongan" in url else "page"
+        wait_ready(page, kind, budget=1.8, timeout=20_000, nudge=True, label=f"{kind}_goto")
 
         html = page.content()
         browser.close()
         return FetchResult(url, html)
 
-def fetch_listing_pages_playwright(base_root: str, max_pages: int):
-    pages_html = []
+def _first_card_text(page) -> str:
+    first_card = page.locator(LISTING_CARD_SELECTOR).first
+    return (first_card.inner_text() or "") if first_card.count() else ""
+
+def _wait_cards_changed(page, before_txt: str, timeout: int = 12_000) -> bool:
+    """
+    Tunggu teks kartu pertama berubah lalu daftar kartu stabil (tanda halaman baru selesai ter-render).
+    Menggantikan sleep(0.8) setelah klik halaman.
+    """
+    return wait_ready(page, "listing", budget=0.8, timeout=timeout, arg=before_txt or "", label="listing_next")
+
+def click_next_page(page, i: int) -> bool:
+    """Klik ke halaman berikutnya dari halaman index-0 `i` (tombol Next, angka, atau aria-label)."""
+    next_num = i + 2
+    nb = page.get_by_role("button", name=re.compile("Next", re.I))
+    if nb.count() > 0:
+        aria = (nb.first.get_attribute("aria-disabled") or "").lower().strip()
+        disabled = aria == "true" or (nb.first.get_attribute("disabled") is not None)
+        if not disabled:
+            nb.first.scroll_into_view_if_needed()
+            nb.first.click()
+            return True
+    btn = page.locator("li.v-pagination__item button", has_text=str(next_num))
+    if btn.count() > 0:
+        btn.first.scroll_into_view_if_needed()
+        btn.first.click()
+        return True
+    btn = page.locator(f"button[aria-label*='Page {next_num}']")
+    if btn.count() > 0:
+        btn.first.scroll_into_view_if_needed()
+        btn.first.click()
+        return True
+    return False
+
+def active_page_number(page) -> Optional[int]:
+    """Nomor halaman aktif menurut komponen v-pagination (None kalau tidak terbaca)."""
+    el = page.locator("li.v-pagination__item--is-active button, li.v-pagination__item--is-active")
+    try:
+        txt = (el.first.inner_text() or "").strip() if el.count() else ""
+    except Exception:
+        txt = ""
+    return int(txt) if txt.isdigit() else None
+
+def _visible_page_numbers(page) -> List[int]:
+    nums = []
+    for t in page.locator("li.v-pagination__item button").all_inner_texts():
+        t = (t or "").strip()
+        if t.isdigit():
+            nums.append(int(t))
+    return nums
+
+def goto_listing_page(page, list_url: str, target: int) -> bool:
+    """
+    Lompat ke halaman listing `target` (1-based) tanpa meng-capture halaman di antaranya:
+    1) coba URL query (?page=N) — berhasil kalau v-pagination menandai N aktif
+    2) klik tombol angka v-pagination__item terbesar yang terlihat ≤ target, berulang
+       (jendela angka Vuetify bergeser tiap klik, jadi jauh lebih sedikit klik daripada Next)
+    """
+    if target <= 1:
+        return True
+    try:
+        before = _first_card_text(page)
+        page.goto(f"{list_url}?page={target}", timeout=90_000, wait_until="domcontentloaded")
+        wait_ready(page, "listing", timeout=15_000, label="listing_jump")
+        if active_page_number(page) == target:
+            return True
+        # query diabaikan → pastikan kembali di halaman 1
+        if _first_card_text(page) != before:
+            page.goto(list_url, timeout=90_000, wait_until="domcontentloaded")
+            wait_ready(page, "listing", timeout=15_000, label="listing_jump")
+    except Exception:
+        pass
+
+    cur = active_page_number(page) or 1
+    while cur < target:
+        cand = [n for n in _visible_page_numbers(page) if cur < n <= target]
+        if not cand:
+            return False
+        n = max(cand)
+        before = _first_card_text(page)
+        btn = page.locator("li.v-pagination__item button", has_text=re.compile(rf"^\s*{n}\s*$"))
+        if btn.count() == 0:
+            return False
+        btn.first.scroll_into_view_if_needed()
+        btn.first.click()
+        if not _wait_cards_changed(page, before):
+            return False
+        cur = active_page_number(page) or n
+    return cur == target
+
+def iter_listing_pages_playwright(base_root: str, max_pages: int, start_page: int = 1):
+    """
+    Generator: yield HTML tiap halaman listing begitu ter-capture (tidak ditumpuk di memori),
+    supaya parser/enrich di hilir bisa langsung jalan.
+    `start_page` > 1 (resume) → lompat langsung ke halaman itu via goto_listing_page.
+    """
+    n_pages = 0
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
         page = browser.new_page()
+        install_blocking(page)
         page.set_default_timeout(20_000)  # ⬅️ biar gak nunggu lama
 
         url = f"{base_root}/lowongan"
         print(f"[INFO] Navigating to {url}")
-        page.goto(url, timeout=90_000, wait_until="networkidle")
-        time.sleep(2)
+        page.goto(url, timeout=90_000, wait_until="domcontentloaded")
+        # kartu ada + stabil (pengganti sleep(2) setelah goto)
+        wait_ready(page, "listing", budget=2.0, timeout=30_000, label="listing_goto")
 
         # Estimasi jumlah halaman dari teks "Ditemukan XXXX lowongan"
         total_text = page.content()
@@ -76,64 +173,178 @@ def fetch_listing_pages_playwright(base_root: str, max_pages: int):
         pages_to_grab = min(est_pages, max_pages)
         print(f"[INFO] Estimasi halaman: total_low={total_low}, per_page={per_page}, pages≈{est_pages}, cap={pages_to_grab}")
 
-        def click_next(i):
-            next_num = i + 2
-            nb = page.get_by_role("button", name=re.compile("Next", re.I))
-            if nb.count() > 0:
-                aria = (nb.first.get_attribute("aria-disabled") or "").lower().strip()
-                disabled = aria == "true" or (nb.first.get_attribute("disabled") is not None)
-                if not disabled:
-                    nb.first.scroll_into_view_if_needed()
-                    nb.first.click()
-                    return True
-            btn = page.locator("li.v-pagination__item button", has_text=str(next_num))
-            if btn.count() > 0:
-                btn.first.scroll_into_view_if_needed()
-                btn.first.click()
-                return True
-            btn = page.locator(f"button[aria-label*='Page {next_num}']")
-            if btn.count() > 0:
-                btn.first.scroll_into_view_if_needed()
-                btn.first.click()
-                return True
-            return False
+        start = max(1, start_page)
+        if start > 1:
+            t0 = time.perf_counter()
+            if goto_listing_page(page, url, start):
+                print(f"[INFO] Resume: lompat ke halaman {start} ({time.perf_counter()-t0:0.1f}s)", flush=True)
+            else:
+                # fallback: klik Next tanpa capture sampai halaman start
+                print(f"[WARN] Lompat langsung ke halaman {start} gagal; klik Next tanpa capture.", flush=True)
+                cur = active_page_number(page) or 1
+                while cur < start:
+                    before = _first_card_text(page)
+                    if not click_next_page(page, cur - 1) or not _wait_cards_changed(page, before):
+                        print("[WARN] Tidak bisa mencapai halaman resume. Stop.", flush=True)
+                        browser.close()
+                        return
+                    cur += 1
 
-        for i in range(pages_to_grab):
+        for i in range(start - 1, pages_to_grab):
             print(f"[INFO] Capturing page {i+1}")
-            pages_html.append(page.content())
+            n_pages += 1
+            yield page.content()
 
             # kalau ini halaman terakhir yg direncanakan → stop (jangan klik apa pun)
             if i == pages_to_grab - 1:
                 break
 
             # simpan teks item pertama untuk deteksi perubahan
-            first_card = page.locator("a.v-card.v-card--flat.v-card--link[href*='/lowongan/view/']").first
-            before_txt = (first_card.inner_text() or "") if first_card.count() else ""
+            before_txt = _first_card_text(page)
 
-            if not click_next(i):
+            if not click_next_page(page, i):
                 print("[INFO] Tidak menemukan tombol Next/angka. Selesai.")
                 break
 
             # tunggu konten berubah max 12s, kalau tidak berubah ya berhenti
-            try:
-                page.wait_for_function(
-                    """(prev) => {
-                        const el = document.querySelector("a.v-card.v-card--flat.v-card--link[href*='/lowongan/view/']");
-                        return el && el.innerText.trim() !== (prev || "").trim();
-                    }""",
-                    arg=before_txt,
-                    timeout=12_000,
-                )
-            except Exception:
+            if not _wait_cards_changed(page, before_txt):
                 print("[WARN] Halaman tidak berubah setelah klik. Asumsi sudah akhir. Stop.")
                 break
 
-            time.sleep(0.8)
         # ⬇️ tambahkan ini
-        print(f"[STEP] Pagination complete. Collected {len(pages_html)} pages. Handing off to parser...", flush=True)
-        
+        print(f"[STEP] Pagination complete. Captured {n_pages} pages.", flush=True)
+
         browser.close()
-    return pages_html
+
+# ================= Sharded pagination =================
+_SHARD_DONE = object()
+
+def split_page_range(first: int, last: int, shards: int) -> List[tuple]:
+    """Bagi halaman first..last (inklusif) jadi ≤ `shards` rentang berurutan yang kira-kira sama besar."""
+    n = last - first + 1
+    if n <= 0:
+        return []
+    k = max(1, min(shards, n))
+    size, extra = divmod(n, k)
+    out, lo = [], first
+    for j in range(k):
+        hi = lo + size - 1 + (1 if j < extra else 0)
+        out.append((lo, hi))
+        lo = hi + 1
+    return out
+
+def _put_until(out: "queue.Queue", item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _capture_shard(base_root: str, first: int, last: int, out: "queue.Queue", stop: threading.Event):
+    """
+    Satu shard = satu thread dengan browser + context sendiri (objek Playwright sync terikat thread):
+    lompat ke halaman `first` via goto_listing_page, lalu capture sampai `last` dengan klik Next.
+    """
+    url = f"{base_root}/lowongan"
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        try:
+            ctx = browser.new_context(user_agent=settings.USER_AGENT,
+                                      viewport={"width": 1366, "height": 900})
+            install_blocking(ctx)
+            page = ctx.new_page()
+            page.set_default_timeout(20_000)
+            page.goto(url, timeout=90_000, wait_until="domcontentloaded")
+            wait_ready(page, "listing", timeout=30_000, label="listing_goto")
+            if not goto_listing_page(page, url, first):
+                raise RuntimeError(f"tidak bisa lompat ke halaman {first}")
+            for n in range(first, last + 1):
+                print(f"[INFO] [shard {first}-{last}] Capturing page {n}", flush=True)
+                if not _put_until(out, (n, page.content()), stop) or n == last:
+                    return
+                before = _first_card_text(page)
+                if not click_next_page(page, n - 1) or not _wait_cards_changed(page, before):
+                    print(f"[WARN] [shard {first}-{last}] Halaman tidak berubah setelah {n}. Stop shard.", flush=True)
+                    return
+        finally:
+            browser.close()
+
+def iter_listing_pages_sharded(base_root: str, max_pages: int, shards: int, start_page: int = 1):
+    """
+    Pagination paralel: yield (nomor halaman, html) — urutan TIDAK dijamin.
+    1) probe halaman 1 → estimasi jumlah halaman dari parse_total_lowongan
+    2) rentang halaman dibagi ke `shards` browser context (masing-masing di thread sendiri),
+       tiap shard lompat ke halaman awalnya (?page=N / tombol angka v-pagination__item)
+    3) hasil semua shard dialirkan lewat satu queue berkapasitas tetap (backpressure)
+    Kartu yang muncul di dua halaman (listing bergeser selama crawl) di-dedup pemanggil per source_url.
+    Shard yang gagal tidak menghentikan shard lain; error di-raise setelah semua halaman lain keluar.
+    """
+    url = f"{base_root}/lowongan"
+    print(f"[INFO] Navigating to {url} (probe)", flush=True)
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        try:
+            page = browser.new_page()
+            install_blocking(page)
+            page.goto(url, timeout=90_000, wait_until="domcontentloaded")
+            wait_ready(page, "listing", timeout=30_000, label="listing_goto")
+            first_html = page.content()
+        finally:
+            browser.close()
+
+    total_low = parse_total_lowongan(first_html) or 0
+    if not total_low:
+        # tanpa total, rentang shard tidak bisa dihitung → serial
+        print("[WARN] Total lowongan tidak terbaca; pagination serial.", flush=True)
+        yield from enumerate(iter_listing_pages_playwright(base_root, max_pages, start_page), max(1, start_page))
+        return
+    per_page = 20
+    pages_to_grab = min(math.ceil(total_low / per_page), max_pages)
+
+    first = max(1, start_page)
+    if first == 1:
+        yield 1, first_html
+        first = 2
+    ranges = split_page_range(first, pages_to_grab, shards)
+    print(f"[INFO] Estimasi halaman: total_low={total_low}, pages={pages_to_grab}, shards={ranges}", flush=True)
+    if not ranges:
+        return
+
+    out: "queue.Queue" = queue.Queue(maxsize=max(2, len(ranges)))
+    stop = threading.Event()
+    errors = []
+
+    def run(lo, hi):
+        try:
+            _capture_shard(base_root, lo, hi, out, stop)
+        except Exception as e:
+            errors.append(f"shard {lo}-{hi}: {e}")
+            print(f"[WARN] Shard {lo}-{hi} gagal: {e}", flush=True)
+        finally:
+            _put_until(out, _SHARD_DONE, stop)
+
+    threads = [threading.Thread(target=run, args=rng, name=f"listing-shard-{rng[0]}", daemon=True)
+               for rng in ranges]
+    for t in threads:
+        t.start()
+    n_pages, remaining = 0, len(threads)
+    try:
+        while remaining:
+            item = out.get()
+            if item is _SHARD_DONE:
+                remaining -= 1
+                continue
+            n_pages += 1
+            yield item
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    print(f"[STEP] Pagination complete (sharded). Captured {n_pages + (start_page <= 1)} pages.", flush=True)
+    if errors:
+        raise RuntimeError("; ".join(errors))
 
 
 
@@ -142,11 +353,22 @@ def fetch_html(url: str) -> FetchResult:
         return fetch_html_playwright(url)
     return fetch_html_requests(url)
 
+def render_detail_page(page, url: str) -> str:
+    """
+    Navigasi `page` (Playwright sync Page) ke halaman DETAIL lalu kembalikan HTML-nya.
+    Dipakai bersama oleh fetch_detail_playwright (sekali pakai) dan DetailBrowserPool (page hangat).
+    """
+    page.goto(url, timeout=120_000, wait_until="domcontentloaded")
+    # label Program Studi/Deskripsi ada, lalu chip + teks stabil (pengganti 4× wait_for_timeout(500))
+    wait_ready(page, "detail", budget=2.0, timeout=30_000, nudge=True)
+    return page.content()
+
 def fetch_detail_playwright(url: str) -> FetchResult:
     """
-    Render halaman DETAIL lowongan dengan wait yang spesifik:
-    - label 'Program Studi' / chip '.v-chip__content'
-    - plus nudge lazy-load (scroll)
+    Render halaman DETAIL lowongan dengan wait yang spesifik (readiness.wait_ready):
+    - label 'Program Studi' / 'Deskripsi', lalu chip '.v-chip__content' stabil
+    - plus nudge lazy-load (scroll sekali)
+    Catatan: launch browser baru per URL. Untuk banyak URL pakai DetailBrowserPool (scraper/pool.py).
     """
     ua = settings.USER_AGENT
     with sync_playwright() as p:
@@ -154,37 +376,29 @@ def fetch_detail_playwright(url: str) -> FetchResult:
         browser = p.chromium.launch(headless=True)
         ctx = browser.new_context(user_agent=ua,
                                     viewport={"width": 1366, "height": 900})
+        install_blocking(ctx)
         page = ctx.new_page()
-        page.goto(url, timeout=120_000, wait_until="networkidle")
-        # tunggu salah satu tanda detail siap
-        targets = [
-            "text=Detail Lowongan",
-            "label:has-text('Program Studi')",
-            ".v-chip__content",
-            "label:has-text('Deskripsi')"
-        ]
-        for sel in targets:
-            try:
-                page.wait_for_selector(sel, timeout=30_000)
-                break
-            except Exception:
-                pass
-        # nudge render chip
-        for _ in range(4):
-            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            page.wait_for_timeout(500)
-        html = page.content()
+        html = render_detail_page(page, url)
         browser.close()
         return FetchResult(url, html)
 
-def fetch_detail_html(url: str) -> FetchResult:
+def fetch_detail_html(url: str, pool=None) -> FetchResult:
     """
     Render detail dengan Playwright lebih dahulu (karena chip Program Studi butuh render).
+    Kalau `pool` (DetailBrowserPool) diberikan, pakai page hangat dari pool alih-alih launch browser baru.
     Jatuh ke requests jika Playwright gagal/unavailable.
     """
+    t0 = time.perf_counter()
     try:
-        return fetch_detail_playwright(url)  # prefer Playwright
-    except Exception:
-        pass
+        if pool is not None:
+            res, kind = pool.fetch(url), "detail_pool"
+        else:
+            res, kind = fetch_detail_playwright(url), "detail_playwright"  # prefer Playwright
+        run_metrics.observe(kind, time.perf_counter() - t0)
+        run_metrics.inc("bytes_fetched", res.size)
+        return res
+    except Exception as e:
+        run_metrics.error("detail_render", e, url)
+        run_metrics.inc("detail_fallback")
     # fallback: static HTML
-    return fetch_html_requests(url)
\ No newline at end of file
+    return fetch_html_requests(url, kind="detail_requests")
@@ -0,0 +1,151 @@
+# backend/scraper/intercept.py
+"""
+Blokir resource yang tidak dibutuhkan parser (hanya butuh DOM) lewat `context.route` / `page.route`.
+Profil dipilih dari settings.BLOCK_RESOURCES:
+- "off"   : tidak ada yang diblokir
+- "lite"  : gambar, media, font + host analytics/iklan (default)
+- "strict": lite + stylesheet + semua request host pihak ketiga selain script/xhr/fetch
+XHR/fetch first-party tidak pernah diblokir (data listing/detail & network capture).
+
+Statistik per run (`block_stats`): jumlah request yang diblokir per tipe & estimasi byte yang dihemat
+(ukuran beberapa sampel pertama per tipe diukur dengan `route.fetch()` lalu dirata-rata).
+"""
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from ..settings import settings
+
+PROFILES = {
+    "off": set(),
+    "lite": {"image", "media", "font"},
+    "strict": {"image", "media", "font", "stylesheet"},
+}
+TRACKER_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "facebook.net", "facebook.com", "hotjar.com", "clarity.ms", "tiktok.com", "analytics.",
+)
+# tipe yang tetap boleh dari host pihak ketiga di profil strict (bundle CDN / API)
+_THIRD_PARTY_KEEP = {"document", "script", "xhr", "fetch"}
+# suffix dua level di bawah TLD negara (maganghub.kemnaker.go.id → kemnaker.go.id)
+_SECOND_LEVEL = {"go", "co", "ac", "or", "web", "my", "sch", "net", "com"}
+SAMPLES_PER_TYPE = 3
+
+
+def site_suffix(url: str) -> str:
+    host = (urlparse(url).hostname or "").lower()
+    parts = host.split(".")
+    n = 3 if len(parts) >= 3 and parts[-2] in _SECOND_LEVEL else 2
+    return ".".join(parts[-n:])
+
+
+class BlockStats:
+    """Akumulator thread-safe: request diblokir per tipe, request diteruskan, sampel ukuran body."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.blocked: Dict[str, int] = {}
+        self.allowed = 0
+        self._sample_bytes: Dict[str, int] = {}
+        self._sample_n: Dict[str, int] = {}
+
+    def count(self, rtype: Optional[str]):
+        with self._lock:
+            if rtype is None:
+                self.allowed += 1
+            else:
+                self.blocked[rtype] = self.blocked.get(rtype, 0) + 1
+
+    def want_sample(self, rtype: str) -> bool:
+        with self._lock:
+            return self._sample_n.get(rtype, 0) < SAMPLES_PER_TYPE
+
+    def add_sample(self, rtype: str, size: int):
+        with self._lock:
+            self._sample_n[rtype] = self._sample_n.get(rtype, 0) + 1
+            self._sample_bytes[rtype] = self._sample_bytes.get(rtype, 0) + size
+
+    def bytes_saved(self) -> int:
+        with self._lock:
+            total = 0
+            for rtype, n in self.blocked.items():
+                k = self._sample_n.get(rtype, 0)
+                if k:
+                    # sampel sendiri tetap terunduh → tidak dihitung hemat
+                    total += int(self._sample_bytes[rtype] / k * max(0, n - k))
+            return total
+
+    def report(self):
+        with self._lock:
+            blocked = dict(self.blocked)
+            allowed = self.allowed
+        if not blocked and not allowed:
+            return
+        n_blocked = sum(blocked.values())
+        detail = ", ".join(f"{k}={v}" for k, v in sorted(blocked.items()))
+        print(f"[INFO] Resource blocking ({settings.BLOCK_RESOURCES}): blocked={n_blocked} allowed={allowed} "
+              f"• est. saved ≈{self.bytes_saved()/1e6:0.1f} MB [{detail}]", flush=True)
+
+
+block_stats = BlockStats()
+
+
+def _blocked_type(request, profile: str, first_party: str) -> Optional[str]:
+    """Tipe resource kalau request harus diblokir, else None."""
+    rtype = request.resource_type
+    host = (urlparse(request.url).hostname or "").lower()
+    if any(t in host for t in TRACKER_HOSTS):
+        return "tracker"
+    if rtype in PROFILES.get(profile, ()):
+        return rtype
+    if profile == "strict" and first_party and not host.endswith(first_party) \
+            and rtype not in _THIRD_PARTY_KEEP:
+        return f"3p:{rtype}"
+    return None
+
+
+def install_blocking(target, profile: Optional[str] = None) -> bool:
+    """Pasang route handler di BrowserContext/Page (Playwright sync). Return False kalau profil 'off'."""
+    profile = (profile or settings.BLOCK_RESOURCES or "off").lower()
+    if profile == "off" or profile not in PROFILES:
+        return False
+    first_party = site_suffix(settings.BASE_URL)
+
+    def handler(route, request):
+        kind = _blocked_type(request, profile, first_party)
+        block_stats.count(kind)
+        if kind is None:
+            route.continue_()
+            return
+        if block_stats.want_sample(kind):
+            try:
+                block_stats.add_sample(kind, len(route.fetch().body()))
+            except Exception:
+                pass
+        route.abort("blockedbyclient")
+
+    target.route("**/*", handler)
+    return True
+
+
+async def install_blocking_async(target, profile: Optional[str] = None) -> bool:
+    """Versi playwright.async_api dari install_blocking."""
+    profile = (profile or settings.BLOCK_RESOURCES or "off").lower()
+    if profile == "off" or profile not in PROFILES:
+        return False
+    first_party = site_suffix(settings.BASE_URL)
+
+    async def handler(route, request):
+        kind = _blocked_type(request, profile, first_party)
+        block_stats.count(kind)
+        if kind is None:
+            await route.continue_()
+            return
+        if block_stats.want_sample(kind):
+            try:
+                block_stats.add_sample(kind, len(await (await route.fetch()).body()))
+            except Exception:
+                pass
+        await route.abort("blockedbyclient")
+
+    await target.route("**/*", handler)
+    return True
@@ -0,0 +1,212 @@
+# backend/scraper/metrics.py
+"""
+Instrumentasi per run scraper (pengganti print [time] ad hoc):
+- span     : durasi per stage (init, crawl, pagination, parse, enrich, upsert, recompute, home).
+             Stage pipeline jalan bersamaan → nilainya waktu sibuk kumulatif (enrich dijumlah lintas worker)
+- counter  : pages, cards, detail_ok/detail_fail, retries, bytes_fetched, …
+- histogram: latency per jenis fetch (listing_page, detail_pool, detail_playwright, detail_requests, …)
+- error    : jumlah exception per (tempat, tipe); beberapa pertama per pasangan dicetak [WARN]
+             supaya kegagalan yang bikin run lambat tidak hilang di `except Exception: pass`
+
+Disimpan ke tabel scrape_runs (models.save_scrape_run) dan, kalau METRICS_TEXTFILE diset, ke file
+teks format Prometheus (node_exporter textfile collector / OpenMetrics).
+"""
+import json, os, threading
+from contextlib import contextmanager
+from datetime import datetime
+from time import perf_counter, time
+from typing import Dict, List, Optional, Tuple
+
+from ..settings import settings
+
+# batas atas bucket histogram (detik), gaya Prometheus
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+WARN_PER_ERROR = 3
+PREFIX = "magangpulse_scrape"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "n")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # + bucket +Inf
+        self.sum = 0.0
+        self.n = 0
+
+    def observe(self, v: float):
+        i = 0
+        while i < len(BUCKETS) and v > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += v
+        self.n += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Perkiraan kuantil dari bucket (batas atas bucket yang memuat kuantil)."""
+        if not self.n:
+            return None
+        target, acc = q * self.n, 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= target:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> Dict:
+        return {"count": self.n, "sum": round(self.sum, 4), "buckets": list(self.counts),
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95)}
+
+
+class RunMetrics:
+    """Akumulator thread-safe untuk satu run; `reset(run_id)` di awal run."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, run_id: Optional[str] = None):
+        with self._lock:
+            self.run_id = run_id
+            self.started_at = time()
+            self.finished_at: Optional[float] = None
+            self.status = "running"
+            self.spans: Dict[str, float] = {}
+            self.counters: Dict[str, float] = {}
+            self.hist: Dict[str, _Histogram] = {}
+            self.errors: Dict[Tuple[str, str], int] = {}
+
+    # ---- rekam ----
+    def add_span(self, name: str, seconds: float):
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    @contextmanager
+    def span(self, name: str):
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, perf_counter() - t0)
+
+    def inc(self, name: str, n: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, kind: str, seconds: float):
+        with self._lock:
+            h = self.hist.get(kind)
+            if h is None:
+                h = self.hist[kind] = _Histogram()
+            h.observe(seconds)
+
+    def error(self, where: str, exc: BaseException, url: Optional[str] = None, log: bool = True):
+        """Catat exception yang ditelan pemanggil; cetak [WARN] untuk beberapa kejadian pertama."""
+        key = (where, type(exc).__name__)
+        with self._lock:
+            n = self.errors[key] = self.errors.get(key, 0) + 1
+        if log and n <= WARN_PER_ERROR:
+            msg = str(exc).strip().splitlines()[0][:200] if str(exc).strip() else ""
+            more = " (berikutnya hanya dihitung)" if n == WARN_PER_ERROR else ""
+            print(f"[WARN] {where} gagal: {key[1]}: {msg}{' • ' + url if url else ''}{more}", flush=True)
+
+    def finish(self, ok: bool):
+        with self._lock:
+            self.finished_at = time()
+            self.status = "ok" if ok else "failed"
+
+    # ---- ekspor ----
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "status": self.status,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "spans": {k: round(v, 4) for k, v in self.spans.items()},
+                "counters": dict(self.counters),
+                "histograms": {k: h.to_dict() for k, h in self.hist.items()},
+                "errors": {f"{w}:{t}": n for (w, t), n in self.errors.items()},
+            }
+
+    def report(self):
+        snap = self.snapshot()
+        spans = " ".join(f"{k}={v:0.2f}s" for k, v in snap["spans"].items())
+        counters = " ".join(f"{k}={int(v) if float(v).is_integer() else v}" for k, v in sorted(snap["counters"].items()))
+        print(f"[time] Spans: {spans}", flush=True)
+        print(f"[INFO] Counters: {counters}", flush=True)
+        for kind, h in sorted(snap["histograms"].items()):
+            avg = h["sum"] / h["count"] if h["count"] else 0.0
+            print(f"[time] Fetch {kind}: n={h['count']} avg={avg:0.2f}s p50≤{h['p50']}s p95≤{h['p95']}s", flush=True)
+        if snap["errors"]:
+            errs = ", ".join(f"{k}={v}" for k, v in sorted(snap["errors"].items(), key=lambda kv: -kv[1]))
+            print(f"[WARN] Errors: {errs}", flush=True)
+
+    def prometheus(self) -> str:
+        snap = self.snapshot()
+        out: List[str] = []
+
+        def metric(name, mtype, help_text):
+            out.append(f"# HELP {PREFIX}_{name} {help_text}")
+            out.append(f"# TYPE {PREFIX}_{name} {mtype}")
+
+        # run_id hanya di metric info (label per run di semua series = kardinalitas tak terbatas)
+        metric("run_info", "gauge", "Run terakhir")
+        out.append(f'{PREFIX}_run_info{{run_id="{snap["run_id"] or ""}"}} 1')
+        metric("run_success", "gauge", "1 kalau run terakhir selesai tanpa error")
+        out.append(f"{PREFIX}_run_success {1 if snap['status'] == 'ok' else 0}")
+        metric("run_timestamp_seconds", "gauge", "Waktu selesai run terakhir (unix)")
+        out.append(f"{PREFIX}_run_timestamp_seconds {snap['finished_at'] or time():.0f}")
+        metric("stage_seconds", "gauge", "Durasi per stage (stage pipeline: waktu sibuk kumulatif)")
+        for k, v in sorted(snap["spans"].items()):
+            out.append(f'{PREFIX}_stage_seconds{{stage="{k}"}} {v}')
+        metric("events_total", "counter", "Counter per run (pages, cards, detail_ok, ...)")
+        for k, v in sorted(snap["counters"].items()):
+            out.append(f'{PREFIX}_events_total{{name="{k}"}} {v}')
+        metric("errors_total", "counter", "Exception yang ditangani per tempat & tipe")
+        for k, v in sorted(snap["errors"].items()):
+            where, etype = k.split(":", 1)
+            out.append(f'{PREFIX}_errors_total{{where="{where}",type="{etype}"}} {v}')
+        metric("fetch_seconds", "histogram", "Latency per jenis fetch")
+        for kind, h in sorted(snap["histograms"].items()):
+            acc = 0
+            for i, c in enumerate(h["buckets"]):
+                acc += c
+                le = f"{BUCKETS[i]}" if i < len(BUCKETS) else "+Inf"
+                out.append(f'{PREFIX}_fetch_seconds_bucket{{kind="{kind}",le="{le}"}} {acc}')
+            out.append(f'{PREFIX}_fetch_seconds_sum{{kind="{kind}"}} {h["sum"]}')
+            out.append(f'{PREFIX}_fetch_seconds_count{{kind="{kind}"}} {h["count"]}')
+        return "\n".join(out) + "\n"
+
+    def write_textfile(self, path: Optional[str] = None) -> Optional[str]:
+        path = path or settings.METRICS_TEXTFILE
+        if not path:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)  # collector tidak pernah membaca file setengah jadi
+        return path
+
+    def save(self):
+        """Simpan snapshot ke tabel scrape_runs (+ textfile kalau diset). Gagal simpan tidak menggagalkan run."""
+        from ..models import save_scrape_run
+        snap = self.snapshot()
+        try:
+            save_scrape_run(snap["run_id"] or "", snap["status"], _iso(snap["started_at"]), _iso(snap["finished_at"]),
+                            json.dumps(snap["spans"]), json.dumps(snap["counters"]),
+                            json.dumps(snap["histograms"]), json.dumps(snap["errors"]))
+        except Exception as e:
+            print(f"[WARN] Simpan scrape_runs gagal: {e}", flush=True)
+        try:
+            path = self.write_textfile()
+            if path:
+                print(f"[INFO] Metrics → {path}", flush=True)
+        except Exception as e:
+            print(f"[WARN] Tulis METRICS_TEXTFILE gagal: {e}", flush=True)
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.utcfromtimestamp(ts).isoformat() if ts else None
+
+
+run_metrics = RunMetrics()
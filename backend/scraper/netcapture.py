@@ -0,0 +1,311 @@
+# backend/scraper/netcapture.py
+"""
+Mode "network capture": halaman listing/detail MagangHub adalah SPA Vue/Vuetify yang
+mengambil datanya lewat XHR JSON. Modul ini:
+1) merekam respons JSON yang dibuat halaman (Playwright `page.on("response")`),
+2) menebak endpoint listing (list-of-dict terbesar) & detail (URL berisi id lowongan), plus field id JSON
+   yang slug-nya sama dengan href kartu HTML (source_url = kunci upsert harus identik di kedua mode),
+3) menyimpannya ke API_ENDPOINTS_FILE lalu me-replay endpoint itu dengan requests.Session
+   (connection pooling) — browser hanya dipakai untuk discovery / fallback.
+"""
+import json, time, threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..settings import settings
+from .fetch import LISTING_CARD_SELECTOR
+from .intercept import install_blocking
+from .metrics import run_metrics
+from .parse import (
+    JSON_KEYS, find_json_list, json_get, json_pick, listing_json_url, parse_listing_json, parse_listing_page,
+    parse_total_json, apply_detail_json
+)
+
+PAGE_PARAMS = ("page", "halaman", "p", "page_number", "pageNumber", "current_page")
+
+
+# ================= Capture =================
+def capture_json_responses(url: str, wait_selector: Optional[str] = None) -> Tuple[List[Dict], str]:
+    """Render `url` sekali; return (semua respons XHR/fetch ber-content-type JSON, HTML hasil render)."""
+    from playwright.sync_api import sync_playwright
+
+    captured: List[Dict] = []
+
+    def on_response(resp):
+        try:
+            req = resp.request
+            if req.resource_type not in ("xhr", "fetch"):
+                return
+            if "json" not in (resp.headers.get("content-type") or "").lower():
+                return
+            captured.append({
+                "url": resp.url,
+                "method": req.method,
+                "post_data": req.post_data,
+                "status": resp.status,
+                "json": resp.json(),
+            })
+        except Exception:
+            pass
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        ctx = browser.new_context(user_agent=settings.USER_AGENT,
+                                  viewport={"width": 1366, "height": 900})
+        install_blocking(ctx)  # xhr/fetch first-party tidak pernah diblokir
+        page = ctx.new_page()
+        page.on("response", on_response)
+        page.goto(url, timeout=90_000, wait_until="networkidle")
+        if wait_selector:
+            try:
+                page.wait_for_selector(wait_selector, timeout=15_000)
+            except Exception:
+                pass
+        html = page.content()
+        browser.close()
+    print(f"[INFO] Network capture {url}: {len(captured)} JSON responses", flush=True)
+    return captured, html
+
+
+def _page_param(url: str, post_data: Optional[str]) -> Tuple[str, str, int]:
+    """Tebak nama parameter halaman. Return (lokasi 'query'|'body', nama, nilai awal)."""
+    q = dict(parse_qsl(urlparse(url).query))
+    for k in PAGE_PARAMS:
+        if k in q and str(q[k]).isdigit():
+            return "query", k, int(q[k])
+    try:
+        body = json.loads(post_data) if post_data else None
+    except Exception:
+        body = None
+    if isinstance(body, dict):
+        for k in PAGE_PARAMS:
+            if k in body and str(body[k]).isdigit():
+                return "body", k, int(body[k])
+    return "query", "page", 1
+
+
+def discover_listing_endpoint(captured: List[Dict]) -> Optional[Dict]:
+    """Pilih respons yang berisi list lowongan terbesar (punya field judul/perusahaan)."""
+    best, best_n = None, 0
+    for c in captured:
+        if c.get("status") != 200:
+            continue
+        path, items = find_json_list(c.get("json"), min_len=2)
+        if not items:
+            continue
+        first = items[0]
+        if json_pick(first, "judul") is None and json_pick(first, "perusahaan") is None:
+            continue
+        if len(items) > best_n:
+            where, name, start = _page_param(c["url"], c.get("post_data"))
+            best_n = len(items)
+            best = {
+                "url": c["url"], "method": c["method"], "post_data": c.get("post_data"),
+                "list_path": path, "page_in": where, "page_param": name, "page_start": start,
+            }
+    return best
+
+
+def match_listing_id_key(payload, list_path: Optional[str], html: str, base_root: str) -> Optional[str]:
+    """
+    Field id JSON (kandidat JSON_KEYS["id"]) yang menghasilkan source_url sama dengan href kartu di HTML
+    listing yang sama. None → slug tidak bisa dicocokkan; mode network akan membuat lowongan duplikat.
+    """
+    hrefs = {r["source_url"] for r in parse_listing_page(html) if r.get("source_url")}
+    items = payload if list_path == "" else (json_get(payload, list_path) if list_path else None) or []
+    best, best_n = None, 0
+    for key in JSON_KEYS["id"]:
+        n = len({listing_json_url(base_root, json_get(it, key)) for it in items if isinstance(it, dict)} & hrefs)
+        if n > best_n:
+            best, best_n = key, n
+    return best
+
+
+def discover_detail_endpoint(captured: List[Dict], detail_url: str) -> Optional[Dict]:
+    """Respons JSON detail = yang URL-nya memuat id lowongan dari URL halaman detail."""
+    ext_id = detail_url.rstrip("/").rsplit("/", 1)[-1]
+    if not ext_id:
+        return None
+    for c in captured:
+        if c.get("status") == 200 and c.get("method") == "GET" and ext_id in c["url"] \
+                and isinstance(c.get("json"), (dict, list)):
+            return {"url_template": c["url"].replace(ext_id, "{id}")}
+    return None
+
+
+# ================= Replay =================
+class SiteApi:
+    """Client JSON hasil discovery; satu requests.Session (pooled) dipakai lintas thread."""
+    def __init__(self, endpoints: Dict, base_root: str):
+        self.endpoints = endpoints
+        self.base_root = base_root
+        self.listing = endpoints.get("listing")
+        self.detail = endpoints.get("detail")
+        self.session = requests.Session()
+        size = max(4, settings.DETAIL_WORKERS * 2)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": settings.USER_AGENT,
+            "Accept": "application/json, text/plain, */*",
+            "Referer": f"{base_root}/lowongan",
+        })
+        self._throttle_lock = threading.Lock()
+        self._last_call = 0.0
+        self.archive = None  # HtmlArchive opsional: payload JSON mentah ikut diarsip
+
+    # ---- cache endpoint ----
+    @staticmethod
+    def _cache_path() -> Path:
+        return Path(settings.API_ENDPOINTS_FILE)
+
+    @classmethod
+    def load(cls, base_root: str) -> Optional["SiteApi"]:
+        eps: Dict = {}
+        path = cls._cache_path()
+        if path.exists():
+            try:
+                eps = json.loads(path.read_text(encoding="utf-8"))
+            except Exception:
+                eps = {}
+        if settings.API_LISTING_URL:
+            where, name, start = _page_param(settings.API_LISTING_URL, None)
+            id_key = (eps.get("listing") or {}).get("id_key")  # hasil verifikasi discovery sebelumnya
+            eps["listing"] = {"url": settings.API_LISTING_URL, "method": "GET", "post_data": None,
+                              "list_path": None, "page_in": where, "page_param": name, "page_start": start,
+                              "id_key": id_key}
+        if eps.get("listing") and not eps["listing"].get("id_key"):
+            # cache lama / override manual tanpa field id terverifikasi → source_url bisa beda dari mode html
+            print(f"[WARN] {path}: listing tanpa id_key terverifikasi; mode network tidak dipakai.", flush=True)
+            return None
+        return cls(eps, base_root) if eps.get("listing") else None
+
+    def save(self):
+        path = self._cache_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.endpoints, indent=2), encoding="utf-8")
+
+    @classmethod
+    def discover(cls, base_root: str, use_browser: bool = True) -> Optional["SiteApi"]:
+        """Pakai cache endpoint kalau ada; kalau tidak & browser boleh → capture lalu simpan."""
+        api = cls.load(base_root)
+        if api is not None or not use_browser:
+            return api
+        captured, html = capture_json_responses(f"{base_root}/lowongan", wait_selector=LISTING_CARD_SELECTOR)
+        listing = discover_listing_endpoint(captured)
+        if not listing:
+            print("[WARN] Network capture: endpoint listing tidak ditemukan.", flush=True)
+            return None
+        payload = next(c["json"] for c in captured if c["url"] == listing["url"])
+        listing["id_key"] = match_listing_id_key(payload, listing["list_path"], html, base_root)
+        if not listing["id_key"]:
+            print("[WARN] Network capture: tidak ada field id JSON yang cocok dengan href kartu listing; "
+                  "mode network tidak dipakai (source_url akan beda dari mode html).", flush=True)
+            return None
+        eps = {"listing": listing}
+        # detail: render satu halaman detail dari hasil listing pertama
+        sample = parse_listing_json(payload, base_root, listing["list_path"], listing["id_key"])
+        detail_url = next((r["source_url"] for r in sample if r.get("source_url")), None)
+        if detail_url:
+            try:
+                det = discover_detail_endpoint(capture_json_responses(detail_url)[0], detail_url)
+                if det:
+                    eps["detail"] = det
+            except Exception as e:
+                print(f"[WARN] Network capture detail gagal: {e}", flush=True)
+        api = cls(eps, base_root)
+        api.save()
+        print(f"[INFO] Endpoint tersimpan → {cls._cache_path()}: {json.dumps(eps)[:300]}", flush=True)
+        return api
+
+    # ---- HTTP ----
+    def _throttle(self):
+        gap = settings.API_THROTTLE_SECONDS
+        if gap <= 0:
+            return
+        with self._throttle_lock:
+            wait = self._last_call + gap - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_call = time.monotonic()
+
+    def _request(self, method: str, url: str, body: Optional[str] = None):
+        self._throttle()
+        t0 = time.perf_counter()
+        if method == "GET":
+            r = self.session.get(url, timeout=settings.REQUEST_TIMEOUT)
+        else:
+            r = self.session.request(method, url, data=body, timeout=settings.REQUEST_TIMEOUT,
+                                     headers={"Content-Type": "application/json"})
+        r.raise_for_status()
+        run_metrics.observe("api", time.perf_counter() - t0)
+        run_metrics.inc("bytes_fetched", len(r.content))
+        return r.json()
+
+    def listing_payload(self, page_no: int):
+        ep = self.listing
+        url, body = ep["url"], ep.get("post_data")
+        if ep["page_in"] == "body" and body:
+            data = json.loads(body)
+            data[ep["page_param"]] = page_no
+            body = json.dumps(data)
+        else:
+            u = urlparse(url)
+            q = dict(parse_qsl(u.query))
+            q[ep["page_param"]] = str(page_no)
+            url = urlunparse(u._replace(query=urlencode(q)))
+        payload = self._request(ep.get("method") or "GET", url, body)
+        self._archive(f"{url}#{body}" if body else url, payload, "listing_json")
+        return payload
+
+    def iter_listing_pages(self, max_pages: int, start_page: int = 1) -> Iterator[Tuple[int, List[Dict], Optional[int]]]:
+        """
+        Yield (nomor halaman 1-based, rows, total dari payload) sampai kosong/berulang/cap.
+        `start_page` > 1 (resume) langsung meminta halaman itu.
+        """
+        base = int(self.listing.get("page_start") or 1)
+        prev_first = None
+        for i in range(max(1, start_page) - 1, max_pages):
+            payload = self.listing_payload(base + i)
+            rows = parse_listing_json(payload, self.base_root, self.listing.get("list_path"),
+                                      self.listing.get("id_key"))
+            if not rows:
+                break
+            first = rows[0].get("source_url")
+            # parameter halaman diabaikan server → halaman sama terus
+            if first is not None and first == prev_first:
+                print("[WARN] Endpoint listing mengembalikan halaman yang sama. Stop.", flush=True)
+                break
+            prev_first = first
+            yield i + 1, rows, parse_total_json(payload)
+
+    def detail_payload(self, source_url: str):
+        if not self.detail:
+            return None
+        ext_id = source_url.rstrip("/").rsplit("/", 1)[-1]
+        payload = self._request("GET", self.detail["url_template"].replace("{id}", ext_id))
+        self._archive(source_url, payload, "detail_json")
+        return payload
+
+    def _archive(self, url: str, payload, kind: str):
+        if self.archive is not None:
+            self.archive.put(url, json.dumps(payload, ensure_ascii=False), kind)
+
+    def enrich(self, row: Dict) -> bool:
+        """Isi sektor/deskripsi dari endpoint detail. False → pemanggil fallback ke render HTML."""
+        url = row.get("source_url")
+        if not url or not self.detail:
+            return False
+        try:
+            payload = self.detail_payload(url)
+        except Exception as e:
+            run_metrics.error("api_detail", e, url)
+            return False
+        before = (row.get("sektor"), row.get("deskripsi_short"))
+        apply_detail_json(row, payload)
+        return (row.get("sektor"), row.get("deskripsi_short")) != before
@@ -1,15 +1,19 @@
 # backend/scraper/parse.py
-import re
+import re, json
 from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
 
+from ..settings import settings
+
 # --- Regex & helpers umum ---
 NUM_ID_RX = re.compile(r"(\d{1,3}(?:\.\d{3})+|\d+)")
 P_RX = re.compile(r"(\d[\d\.]*)\s*pelamar", re.I)
 K_RX = re.compile(r"(\d[\d\.]*)\s*(kebutuhan|kuota)", re.I)
 FOUND_RX = re.compile(r"Ditemukan\s+(\d[\d\.]*)\s+lowongan", re.I)
 LOC_HINT_RX = re.compile(r"\b(KOTA|KAB\.?|KABUPATEN|PROV\.?|PROVINSI)\b", re.I)
+ISO_DATE_RX = re.compile(r"^\d{4}-\d{2}-\d{2}")
 
 MONTH_MAP = {
   "Januari":"01","Februari":"02","Maret":"03","April":"04","Mei":"05","Juni":"06",
@@ -28,9 +32,11 @@ def to_int_id(num_text: Optional[str]) -> Optional[int]:
     return int(m.group(1).replace('.', ''))
 
 def id_date_to_iso(text: Optional[str]) -> Optional[str]:
-    # contoh: "3 Oktober 2025"
+    # contoh: "3 Oktober 2025" (atau sudah ISO "2025-10-03…" dari endpoint JSON)
     if not text:
         return None
+    if ISO_DATE_RX.match(text.strip()):
+        return text.strip()[:10]
     parts = text.strip().split()
     if len(parts) == 3 and parts[1] in MONTH_MAP:
         d, m, y = parts
@@ -123,17 +129,56 @@ def compute_metrics(pelamar: Optional[int], kuota: Optional[int]):
         dr = (pelamar / kuota)
     return ar, dr
 
-def parse_listing_page(html: str) -> List[Dict]:
+def site_root() -> str:
+    """Root situs dari settings.BASE_URL (https://maganghub.kemnaker.go.id; server lokal saat replay)."""
+    base = settings.BASE_URL.strip().rstrip("/")
+    return base.split("/lowongan")[0] if "/lowongan" in base else base
+
+def _listing_row(source_url, judul, perusahaan, lokasi, tanggal, pelamar, kuota) -> Dict:
+    """Bentuk baris listing yang sama untuk semua backend parser."""
+    ar, dr = compute_metrics(pelamar, kuota)
+    return {
+        "external_id": source_url,
+        "source_url": source_url,
+        "judul": judul,
+        "perusahaan": perusahaan,
+        "lokasi": lokasi,
+        "sektor": None,
+        "tanggal_posting": id_date_to_iso(tanggal) if tanggal else None,
+        "pelamar": pelamar,
+        "kuota": kuota,
+        "acceptance_rate": ar,
+        "demand_ratio": dr,
+        "velocity_pelamar_per_day": None,
+        "status": "open",
+        "deskripsi_short": None,
+        "fetched_at": datetime.utcnow().isoformat(),
+        "content_hash": None
+    }
+
+def _normalize_lokasi(lokasi: Optional[str]) -> Optional[str]:
+    # Normalisasi ringan (hapus spasi ganda di sekitar koma)
+    return re.sub(r"\s*,\s*", " , ", lokasi).strip() if lokasi else lokasi
+
+def _pelamar_kuota(info: str) -> Tuple[Optional[int], Optional[int]]:
+    mp = P_RX.search(info); mk = K_RX.search(info)
+    return (to_int_id(mp.group(1)) if mp else None), (to_int_id(mk.group(1)) if mk else None)
+
+def parse_listing_page(html: str, backend: Optional[str] = None) -> List[Dict]:
+    """Parse kartu listing dengan backend dari settings.LISTING_PARSER ("lxml" | "bs4")."""
+    if (backend or settings.LISTING_PARSER) == "bs4":
+        return parse_listing_page_bs4(html)
+    return parse_listing_page_lxml(html)
+
+def parse_listing_page_bs4(html: str) -> List[Dict]:
     soup = BeautifulSoup(html, "lxml")
     items: List[Dict] = []
-
-    # (opsional) total lowongan — kalau mau dipakai di tempat lain
-    _ = parse_total_lowongan(html)
+    root = site_root()
 
     # Kartu: <a class="v-card v-card--flat v-card--link" href="/lowongan/view/...">
     for a in soup.select("a.v-card.v-card--flat.v-card--link[href*='/lowongan/view/']"):
         href = a.get("href", "")
-        source_url = ("https://maganghub.kemnaker.go.id" + href) if href.startswith("/") else (href or None)
+        source_url = (root + href) if href.startswith("/") else (href or None)
 
         # Perusahaan & Judul (pakai fallback kecil)
         company_el = a.select_one("h6.text-h6") or a.select_one("h6")
@@ -157,11 +202,7 @@ def parse_listing_page(html: str) -> List[Dict]:
                 txt = sib.get_text(strip=True) or ""
                 if ("," in txt or LOC_HINT_RX.search(txt)):
                     lokasi = txt
-        # 3) Normalisasi ringan (hapus spasi ganda di sekitar koma)
-        if lokasi:
-            lokasi = re.sub(r"\s*,\s*", " , ", lokasi).strip()
-
-
+        lokasi = _normalize_lokasi(lokasi)
 
         # Tanggal: <i class="tabler-calendar"> ... <span>3 Oktober 2025</span>
         cal_icon = a.select_one(".tabler-calendar")
@@ -170,7 +211,6 @@ def parse_listing_page(html: str) -> List[Dict]:
             span = cal_icon.find_next("span")
             if span:
                 tanggal = span.get_text(strip=True)
-        tanggal_iso = id_date_to_iso(tanggal) if tanggal else None
 
         # Pelamar | Kebutuhan: <i class="tabler-users"> ... <span>905 pelamar | 1 kebutuhan</span>
         users_icon = a.select_one(".tabler-users")
@@ -178,75 +218,165 @@ def parse_listing_page(html: str) -> List[Dict]:
         if users_icon:
             span = users_icon.find_next("span")
             if span:
-                info = span.get_text(" ", strip=True)
-                mp = P_RX.search(info); mk = K_RX.search(info)
-                if mp: pelamar = to_int_id(mp.group(1))
-                if mk: kuota   = to_int_id(mk.group(1))
-
-        ar, dr = compute_metrics(pelamar, kuota)
+                pelamar, kuota = _pelamar_kuota(span.get_text(" ", strip=True))
 
-        items.append({
-            "external_id": source_url,
-            "source_url": source_url,
-            "judul": title_el.get_text(strip=True) if title_el else None,
-            "perusahaan": company_el.get_text(strip=True) if company_el else None,
-            "lokasi": lokasi,
-            "sektor": None,
-            "tanggal_posting": tanggal_iso,
-            "pelamar": pelamar,
-            "kuota": kuota,
-            "acceptance_rate": ar,
-            "demand_ratio": dr,
-            "velocity_pelamar_per_day": None,
-            "status": "open",
-            "deskripsi_short": None,
-            "fetched_at": datetime.utcnow().isoformat(),
-            "content_hash": None
-        })
+        items.append(_listing_row(
+            source_url,
+            title_el.get_text(strip=True) if title_el else None,
+            company_el.get_text(strip=True) if company_el else None,
+            lokasi, tanggal, pelamar, kuota,
+        ))
 
     return items
 
-# -------- DETAIL: DESKRIPSI (robust, berbasis label) --------
-def parse_detail_deskripsi(html: str) -> Optional[str]:
-    """
-    Ambil blok 'Deskripsi' dari halaman detail lowongan.
+# -------- LISTING: backend lxml (satu pass, XPath terkompilasi) --------
+def _xp_class(cls: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+_XP_CARDS = etree.XPath(
+    "//a[%s and %s and %s and contains(@href, '/lowongan/view/')]"
+    % (_xp_class("v-card"), _xp_class("v-card--flat"), _xp_class("v-card--link")))
+_XP_COMPANY = etree.XPath("(.//h6[%s] | (.//h6)[1])" % _xp_class("text-h6"))
+_XP_TITLE = etree.XPath("(.//h5[%s] | (.//h5)[1])" % _xp_class("text-h5"))
+_XP_DIVS = etree.XPath(".//div")
+_XP_CAL = etree.XPath("(.//*[%s])[1]" % _xp_class("tabler-calendar"))
+_XP_USERS = etree.XPath("(.//*[%s])[1]" % _xp_class("tabler-users"))
+# padanan BeautifulSoup.find_next: elemen berikutnya dalam urutan dokumen (termasuk turunan)
+_XP_NEXT_DIV = etree.XPath("(descendant::div | following::div)[1]")
+_XP_NEXT_SPAN = etree.XPath("(descendant::span | following::span)[1]")
+# padanan get_text(): node teks turunan, tanpa isi <script>/<style> (komentar memang tidak ikut)
+_XP_TEXT = etree.XPath(".//text()[not(parent::script or parent::style)]", smart_strings=False)
+
+def _lx_text(el, sep: str = "") -> str:
+    """Sama dengan bs4 `get_text(sep, strip=True)`."""
+    return sep.join(t for t in (x.strip() for x in _XP_TEXT(el)) if t)
+
+def _lx_first(nodes, prefer_cls: str):
+    """(.//h6.text-h6 | (.//h6)[1]) → utamakan yang ber-class, sama seperti select_one(...) or select_one(h6)."""
+    for n in nodes:
+        if prefer_cls in (n.get("class") or "").split():
+            return n
+    return nodes[0] if nodes else None
+
+def _lx_document(html: str):
+    if not html or not html.strip():
+        return None
+    try:
+        return lxml_html.document_fromstring(html)
+    except ValueError:
+        # string dengan deklarasi encoding XML → parse sebagai bytes
+        return lxml_html.document_fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        return None
 
-    Strategi (sesuai prompt):
-    - Cari label 'Deskripsi' (normalize-space).
-    - Ambil ancestor barisnya (v-row / row container).
-    - Dari baris itu, ambil kolom kanan yang mengandung .text-body-1 lalu <p>.
-    - Normalisasi whitespace dan bullet.
+def parse_listing_page_lxml(html: str) -> List[Dict]:
+    """
+    Output identik dengan parse_listing_page_bs4 (kecuali fetched_at), tapi satu kali parse lxml
+    dan semua lookup per kartu lewat XPath yang sudah dikompilasi.
+    """
+    doc = _lx_document(html)
+    return _lx_listing_rows(doc) if doc is not None else []
 
-    Fallback:
-    - Jika struktur tidak persis sama, cari div.text-body-1 terdekat setelah label.
+def parse_listing_with_total(html: str, backend: Optional[str] = None) -> Tuple[List[Dict], Optional[int]]:
     """
-    soup = BeautifulSoup(html, "lxml")
+    (rows, total lowongan) dari satu halaman listing. Backend lxml memakai satu tree untuk keduanya.
+    Fungsi murni (backend dikirim eksplisit) → aman dijalankan di worker proses.
+    """
+    if (backend or settings.LISTING_PARSER) == "bs4":
+        return parse_listing_page_bs4(html), parse_total_lowongan(html)
+    doc = _lx_document(html)
+    if doc is None:
+        return [], None
+    m = FOUND_RX.search(_lx_text(doc, " "))
+    return _lx_listing_rows(doc), (to_int_id(m.group(1)) if m else None)
+
+def _lx_listing_rows(doc) -> List[Dict]:
+    items: List[Dict] = []
+    root = site_root()
+    for a in _XP_CARDS(doc):
+        href = a.get("href", "")
+        source_url = (root + href) if href.startswith("/") else (href or None)
 
-    # 1) Temukan elemen label "Deskripsi" (tahan variasi tag & spasi)
-    def _is_deskripsi_label(el) -> bool:
-        if not el or not hasattr(el, "get_text"):
-            return False
-        txt = el.get_text(" ", strip=True)
-        return bool(re.match(r"^Deskripsi$", txt, flags=re.I))
+        company_el = _lx_first(_XP_COMPANY(a), "text-h6")
+        title_el = _lx_first(_XP_TITLE(a), "text-h5")
 
-    label = None
+        lokasi = None
+        for div in _XP_DIVS(a):
+            txt = _lx_text(div)
+            if not txt:
+                continue
+            style = (div.get("style") or "").lower()
+            if ("font-size" in style and ("," in txt or LOC_HINT_RX.search(txt))):
+                lokasi = txt
+                break
+        if not lokasi and company_el is not None:
+            sib = _XP_NEXT_DIV(company_el)
+            if sib:
+                txt = _lx_text(sib[0])
+                if ("," in txt or LOC_HINT_RX.search(txt)):
+                    lokasi = txt
+        lokasi = _normalize_lokasi(lokasi)
+
+        tanggal = None
+        cal = _XP_CAL(a)
+        if cal:
+            span = _XP_NEXT_SPAN(cal[0])
+            if span:
+                tanggal = _lx_text(span[0])
+
+        pelamar = kuota = None
+        users = _XP_USERS(a)
+        if users:
+            span = _XP_NEXT_SPAN(users[0])
+            if span:
+                pelamar, kuota = _pelamar_kuota(_lx_text(span[0], " "))
+
+        items.append(_listing_row(
+            source_url,
+            _lx_text(title_el) if title_el is not None else None,
+            _lx_text(company_el) if company_el is not None else None,
+            lokasi, tanggal, pelamar, kuota,
+        ))
+    return items
+
+# -------- DETAIL: DESKRIPSI (robust, berbasis label) --------
+DESKRIPSI_RX = re.compile(r"^Deskripsi$", re.I)
+PRODI_LABEL_RX = re.compile(r"^\s*Program Studi\s*$", re.I)
+V_ROW_RX = re.compile(r"\bv-row\b", re.I)
+TEXT_BODY_RX = re.compile(r"\btext-body-1\b", re.I)
+RIGHT_COL_RX = re.compile(r"\bv-col-md-8\b|\bv-col-12\b", re.I)
+CHIP_WRAP_RX = re.compile(r"(flex-wrap|gap-2)", re.I)
+CHIP_RX = re.compile(r"v-chip__content")
+
+def _is_deskripsi_label(el) -> bool:
+    """
+    Sama dengan `DESKRIPSI_RX.match(el.get_text(" ", strip=True))`, tapi berhenti setelah 2 string:
+    teks gabungan >1 string pasti mengandung spasi sehingga tidak mungkin == "Deskripsi".
+    """
+    it = el.stripped_strings
+    first = next(it, None)
+    if first is None or next(it, None) is not None:
+        return False
+    return bool(DESKRIPSI_RX.match(first))
+
+def _find_deskripsi_label(soup):
     for el in soup.find_all(["label", "div", "span"]):
         if _is_deskripsi_label(el):
-            label = el
-            break
-    if not label:
-        # fallback: cari string "Deskripsi" lalu ambil parent sebagai 'label'
-        cand = soup.find(string=re.compile(r"^\s*Deskripsi\s*$", re.I))
-        if cand and getattr(cand, "parent", None):
-            label = cand.parent
+            return el
+    # fallback: cari string "Deskripsi" lalu ambil parent sebagai 'label'
+    cand = soup.find(string=re.compile(r"^\s*Deskripsi\s*$", re.I))
+    if cand and getattr(cand, "parent", None):
+        return cand.parent
+    return None
 
+def _deskripsi_from_label(label) -> Optional[str]:
     if not label:
         return None
 
     # 2) Ambil "baris" terdekat (v-row / row container)
     row = None
     # cari parent yang class-nya mengandung v-row
-    row = label.find_parent(class_=re.compile(r"\bv-row\b", re.I))
+    row = label.find_parent(class_=V_ROW_RX)
     # kalau nggak ketemu, ambil parent div terdekat sebagai fallback
     if not row:
         row = label.find_parent("div")
@@ -254,17 +384,17 @@ def parse_detail_deskripsi(html: str) -> Optional[str]:
     # 3) Dari baris itu, ambil kolom kanan yang mengandung .text-body-1
     target = None
     if row:
-        target = row.find(class_=re.compile(r"\btext-body-1\b", re.I))
+        target = row.find(class_=TEXT_BODY_RX)
         # beberapa halaman pakai v-col-md-8 sebagai kolom kanan
         if not target:
-            right = row.find(class_=re.compile(r"\bv-col-md-8\b|\bv-col-12\b", re.I))
+            right = row.find(class_=RIGHT_COL_RX)
             if right:
-                target = right.find(class_=re.compile(r"\btext-body-1\b", re.I)) or right
+                target = right.find(class_=TEXT_BODY_RX) or right
 
     # 4) Fallback terakhir: cari .text-body-1 tepat setelah label
     if not target:
         # cari sibling/next block yang mengandung text-body-1
-        sib = label.find_next(class_=re.compile(r"\btext-body-1\b", re.I))
+        sib = label.find_next(class_=TEXT_BODY_RX)
         if sib:
             target = sib
 
@@ -283,10 +413,27 @@ def parse_detail_deskripsi(html: str) -> Optional[str]:
         if raw:
             parts = [raw]
 
+    # 6) Normalisasi bullet & whitespace
+    return _normalize_deskripsi(parts)
+
+def parse_detail_deskripsi(html: str) -> Optional[str]:
+    """
+    Ambil blok 'Deskripsi' dari halaman detail lowongan.
+
+    Strategi (sesuai prompt):
+    - Cari label 'Deskripsi' (normalize-space).
+    - Ambil ancestor barisnya (v-row / row container).
+    - Dari baris itu, ambil kolom kanan yang mengandung .text-body-1 lalu <p>.
+    - Normalisasi whitespace dan bullet.
+
+    Fallback:
+    - Jika struktur tidak persis sama, cari div.text-body-1 terdekat setelah label.
+    """
+    return _deskripsi_from_label(_find_deskripsi_label(BeautifulSoup(html, "lxml")))
+
+def _normalize_deskripsi(parts: List[str]) -> Optional[str]:
     if not parts:
         return None
-
-    # 6) Normalisasi bullet & whitespace
     text = "\n".join(parts)
     # ubah "- foo" atau "• foo" jadi bullet konsisten
     text = re.sub(r"^\s*[-•]\s*", "• ", text, flags=re.M)
@@ -295,22 +442,7 @@ def parse_detail_deskripsi(html: str) -> Optional[str]:
     return text.strip() or None
 
 # -------- DETAIL PAGE --------
-def parse_detail_program_studi(html: str) -> List[str]:
-    """
-    Ambil daftar Program Studi dari halaman detail lowongan.
-    Struktur yang dicari (kurang lebih):
-      <label>Program Studi</label>
-      <div class="d-flex flex-wrap gap-2">
-         <span class="v-chip ..."><div class="v-chip__content">Teknik Sipil</div></span> ...
-      </div>
-    Return: list of strings (tanpa duplikat, urutan sesuai kemunculan).
-    """
-    soup = BeautifulSoup(html, "lxml")
-
-    # 1) Cari label "Program Studi" (beberapa halaman pakai <label>, kadang <div>)
-    label = None
-    for lab in soup.find_all(["label", "div", "span"], string=re.compile(r"^\s*Program Studi\s*$", re.I)):
-        label = lab; break
+def _prodi_from_label(soup, label) -> List[str]:
     # 2) Jika label tidak ketemu, fallback: langsung sweep semua chip dan lihat konteks terdekat
     containers = []
     if label:
@@ -318,20 +450,390 @@ def parse_detail_program_studi(html: str) -> List[str]:
         # coba parent langsung
         for anc in [label.parent, getattr(label, "find_parent", lambda *_:None)("div")]:
             if not anc: continue
-            cand = anc.find(class_=re.compile(r"(flex-wrap|gap-2)", re.I))
+            cand = anc.find(class_=CHIP_WRAP_RX)
             if cand: containers.append(cand); break
         # fallback: cari sibling kolom kanan terdekat
         if not containers:
-            sib = label.find_next(class_=re.compile(r"(flex-wrap|gap-2)", re.I))
+            sib = label.find_next(class_=CHIP_WRAP_RX)
             if sib: containers.append(sib)
     if not containers:
         # fallback global terakhir: semua wrapper chip di halaman
-        containers = soup.find_all(class_=re.compile(r"(flex-wrap|gap-2)", re.I))
+        containers = soup.find_all(class_=CHIP_WRAP_RX)
 
     prodi: List[str] = []
     for cont in containers:
-        for chip in cont.find_all(class_=re.compile(r"v-chip__content")):
+        for chip in cont.find_all(class_=CHIP_RX):
             t = chip.get_text(strip=True)
             if t and t not in prodi:
                 prodi.append(t)
     return prodi
+
+def parse_detail_program_studi(html: str) -> List[str]:
+    """
+    Ambil daftar Program Studi dari halaman detail lowongan.
+    Struktur yang dicari (kurang lebih):
+      <label>Program Studi</label>
+      <div class="d-flex flex-wrap gap-2">
+         <span class="v-chip ..."><div class="v-chip__content">Teknik Sipil</div></span> ...
+      </div>
+    Return: list of strings (tanpa duplikat, urutan sesuai kemunculan).
+    """
+    soup = BeautifulSoup(html, "lxml")
+
+    # 1) Cari label "Program Studi" (beberapa halaman pakai <label>, kadang <div>)
+    label = soup.find(["label", "div", "span"], string=PRODI_LABEL_RX)
+    return _prodi_from_label(soup, label)
+
+# -------- DETAIL PAGE: satu parse lxml untuk semua field --------
+# Padanan lxml dari lookup BeautifulSoup di atas (hasil program_studi/deskripsi harus identik).
+_XP_ALL_TEXT = etree.XPath("//text()[not(parent::script or parent::style)]")
+_LABEL_TAGS = ("label", "div", "span")
+
+def _lx_has_class(el, rx) -> bool:
+    c = el.get("class")
+    return c is not None and rx.search(c) is not None
+
+def _lx_find(el, rx):
+    """bs4 `el.find(class_=rx)`: turunan pertama (urutan dokumen)."""
+    for d in el.iterdescendants(etree.Element):
+        if _lx_has_class(d, rx):
+            return d
+    return None
+
+def _lx_find_all(el, rx) -> list:
+    return [d for d in el.iter(etree.Element) if _lx_has_class(d, rx)]
+
+def _lx_find_parent(el, rx=None, tag: Optional[str] = None):
+    """bs4 `find_parent(tag)` / `find_parent(class_=rx)`."""
+    for anc in el.iterancestors():
+        if (tag is not None and anc.tag == tag) or (rx is not None and _lx_has_class(anc, rx)):
+            return anc
+    return None
+
+def _lx_find_next(el, rx):
+    """bs4 `find_next(class_=rx)`: elemen setelah `el` dalam urutan dokumen (termasuk turunannya)."""
+    hit = _lx_find(el, rx)
+    if hit is not None:
+        return hit
+    node = el
+    while node is not None:
+        for sib in node.itersiblings():
+            for d in sib.iter(etree.Element):
+                if _lx_has_class(d, rx):
+                    return d
+        node = node.getparent()
+    return None
+
+def _text_parent(t):
+    """Elemen induk sebenarnya dari node teks lxml (teks `tail` milik induk dari elemen pemiliknya)."""
+    owner = t.getparent()
+    return owner.getparent() if t.is_tail else owner
+
+def _lx_only_text(el, t) -> bool:
+    """True kalau `t` satu-satunya string non-kosong (di-strip) di dalam `el` — padanan get_text(strip) == t."""
+    n = 0
+    for x in _XP_TEXT(el):
+        if x.strip():
+            n += 1
+            if n > 1:
+                return False
+    return n == 1
+
+def _lx_deskripsi_label(doc):
+    """
+    Label "Deskripsi" versi bs4: elemen label/div/span PERTAMA (urutan dokumen) yang get_text-nya
+    tepat "Deskripsi". Dicari dari node teks kandidat ke atas — ancestor paling atas yang teksnya masih
+    hanya kandidat itu adalah yang pertama dalam urutan dokumen.
+    """
+    cands = [t for t in _XP_ALL_TEXT(doc) if DESKRIPSI_RX.match(t.strip())]
+    for t in cands:
+        best = None
+        el = _text_parent(t)
+        while el is not None and _lx_only_text(el, t):
+            if el.tag in _LABEL_TAGS:
+                best = el
+            el = el.getparent()
+        if best is not None:
+            return best
+    # fallback bs4: string pertama yang cocok → parent-nya
+    return _text_parent(cands[0]) if cands else None
+
+def _lx_prodi_label(doc):
+    """
+    bs4 `find(["label","div","span"], string=PRODI_LABEL_RX)`: `.string` elemen = satu-satunya node anak
+    (rekursif). Naik dari node teks selama rantainya tetap anak tunggal; ambil label/div/span teratas.
+    """
+    for t in _XP_ALL_TEXT(doc):
+        if not PRODI_LABEL_RX.search(t) or t.is_tail:
+            continue
+        el = t.getparent()
+        if len(el):
+            continue
+        best = None
+        while el is not None:
+            if el.tag in _LABEL_TAGS:
+                best = el
+            up = el.getparent()
+            if up is None or up.text or len(up) != 1 or el.tail:
+                break
+            el = up
+        if best is not None:
+            return best
+    return None
+
+def _lx_prodi(doc, label) -> List[str]:
+    containers = []
+    if label is not None:
+        for anc in (label.getparent(), _lx_find_parent(label, tag="div")):
+            if anc is None:
+                continue
+            cand = _lx_find(anc, CHIP_WRAP_RX)
+            if cand is not None:
+                containers.append(cand)
+                break
+        if not containers:
+            sib = _lx_find_next(label, CHIP_WRAP_RX)
+            if sib is not None:
+                containers.append(sib)
+    if not containers:
+        containers = _lx_find_all(doc, CHIP_WRAP_RX)
+
+    prodi: List[str] = []
+    for cont in containers:
+        for chip in cont.iterdescendants(etree.Element):
+            if _lx_has_class(chip, CHIP_RX):
+                t = _lx_text(chip)
+                if t and t not in prodi:
+                    prodi.append(t)
+    return prodi
+
+def _lx_deskripsi(label) -> Optional[str]:
+    if label is None:
+        return None
+    row = _lx_find_parent(label, rx=V_ROW_RX)
+    if row is None:
+        row = _lx_find_parent(label, tag="div")
+    target = None
+    if row is not None:
+        target = _lx_find(row, TEXT_BODY_RX)
+        if target is None:
+            right = _lx_find(row, RIGHT_COL_RX)
+            if right is not None:
+                target = _lx_find(right, TEXT_BODY_RX)
+                if target is None:
+                    target = right
+    if target is None:
+        target = _lx_find_next(label, TEXT_BODY_RX)
+    if target is None:
+        return None
+    parts = [t for t in (_lx_text(p, " ") for p in target.iterdescendants("p")) if t]
+    if not parts:
+        raw = _lx_text(target, "\n")
+        if raw:
+            parts = [raw]
+    return _normalize_deskripsi(parts)
+
+def parse_detail_page(html: str) -> Dict:
+    """
+    Satu kali parse (lxml) halaman detail → {"program_studi": [...], "deskripsi": str|None}, identik dengan
+    parse_detail_program_studi/parse_detail_deskripsi (BeautifulSoup, dipertahankan sebagai referensi parity).
+    """
+    doc = _lx_document(html)
+    if doc is None:
+        return {"program_studi": [], "deskripsi": None}
+    return {
+        "program_studi": _lx_prodi(doc, _lx_prodi_label(doc)),
+        "deskripsi": _lx_deskripsi(_lx_deskripsi_label(doc)),
+    }
+
+def apply_detail_fields(row: Dict, html: str) -> Dict:
+    """
+    Isi field hasil enrichment (sektor = Program Studi, deskripsi_short) ke `row` dari HTML detail.
+    Dipakai oleh engine enrichment thread maupun async supaya hasilnya identik.
+    """
+    return set_detail_fields(row, *parse_detail_fields(html))
+
+def parse_detail_fields(html: str) -> Tuple[List[str], Optional[str]]:
+    """(program studi, deskripsi) dari HTML detail — fungsi murni, aman dijalankan di worker proses."""
+    d = parse_detail_page(html)
+    return d["program_studi"], d["deskripsi"]
+
+def set_detail_fields(row: Dict, prodi_list: List[str], desc: Optional[str]) -> Dict:
+    if prodi_list:
+        row["sektor"] = "; ".join(prodi_list)
+    if desc:
+        # batasi agar tidak terlalu panjang (opsional)
+        row["deskripsi_short"] = desc[:1200]
+    return row
+
+# -------- JSON (mode network capture: respons XHR situs) --------
+# Nama field API tidak terdokumentasi → cocokkan beberapa kandidat (boleh dotted path "a.b").
+JSON_KEYS = {
+    "id": ["id_posisi", "id_lowongan", "id", "uuid", "slug"],
+    "judul": ["posisi", "judul", "nama_posisi", "judul_posisi", "nama_lowongan", "title"],
+    "perusahaan": ["perusahaan.nama_perusahaan", "perusahaan.nama", "nama_perusahaan", "perusahaan",
+                   "company.name", "company_name", "company"],
+    "kabupaten": ["perusahaan.nama_kabupaten", "nama_kabupaten", "kabupaten", "kota", "lokasi.kabupaten"],
+    "provinsi": ["perusahaan.nama_provinsi", "nama_provinsi", "provinsi", "lokasi.provinsi"],
+    "lokasi": ["lokasi", "alamat_lokasi", "location"],
+    "tanggal": ["tanggal_posting", "tanggal_publikasi", "published_at", "created_at", "tanggal"],
+    "pelamar": ["jumlah_terdaftar", "jumlah_pelamar", "total_pelamar", "pelamar", "applicants"],
+    "kuota": ["jumlah_kuota", "kuota", "jumlah_kebutuhan", "kebutuhan", "quota"],
+    "program_studi": ["program_studi", "prodi", "jurusan", "program_studis"],
+    "deskripsi": ["deskripsi_posisi", "deskripsi", "description"],
+    "total": ["meta.pagination.total", "meta.total", "pagination.total", "total", "total_data", "count"],
+}
+
+def json_get(obj, key: str):
+    """Ambil nilai dotted path ("a.b.c") dari dict; None kalau tidak ada."""
+    cur = obj
+    for part in key.split("."):
+        if not isinstance(cur, dict) or part not in cur:
+            return None
+        cur = cur[part]
+    return cur
+
+def json_pick(obj, field: str):
+    for key in JSON_KEYS[field]:
+        v = json_get(obj, key)
+        if v not in (None, "", [], {}):
+            return v
+    return None
+
+def _json_text(v) -> Optional[str]:
+    """Nilai JSON → teks (dict → ambil nama/name; HTML → teks polos)."""
+    if v is None:
+        return None
+    if isinstance(v, dict):
+        for k in ("nama", "name", "nama_perusahaan", "title", "label"):
+            if v.get(k):
+                return _json_text(v[k])
+        return None
+    t = str(v).strip()
+    if "<" in t and ">" in t:
+        t = BeautifulSoup(t, "lxml").get_text(" ", strip=True)
+    return t or None
+
+def _json_int(v) -> Optional[int]:
+    if isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return int(v)
+    return to_int_id(str(v)) if v is not None else None
+
+def _json_date(v) -> Optional[str]:
+    return id_date_to_iso(_json_text(v))
+
+def find_json_list(payload, min_len: int = 1) -> Tuple[Optional[str], List[Dict]]:
+    """
+    Cari list-of-dict terbesar di payload (BFS). Return (dotted_path, items).
+    Path "" berarti payload itu sendiri sudah list.
+    """
+    best_path, best = None, []
+    queue = [("", payload)]
+    while queue:
+        path, node = queue.pop(0)
+        if isinstance(node, list):
+            dicts = [x for x in node if isinstance(x, dict)]
+            if len(dicts) >= min_len and len(dicts) > len(best):
+                best_path, best = path, dicts
+        elif isinstance(node, dict):
+            for k, v in node.items():
+                queue.append((f"{path}.{k}" if path else k, v))
+    return best_path, best
+
+def parse_total_json(payload) -> Optional[int]:
+    if not isinstance(payload, dict):
+        return None
+    return _json_int(json_pick(payload, "total"))
+
+def listing_json_url(base_root: str, ext_id) -> Optional[str]:
+    """source_url untuk id lowongan JSON — bentuk sama dengan href kartu HTML (`/lowongan/view/<slug>`)."""
+    ext_id = _json_text(ext_id)
+    return f"{base_root}/lowongan/view/{ext_id}" if ext_id else None
+
+def parse_listing_json(payload, base_root: str, list_path: Optional[str] = None,
+                       id_key: Optional[str] = None) -> List[Dict]:
+    """
+    Padanan parse_listing_page untuk respons JSON endpoint listing; baris dibentuk _listing_row yang sama.
+    `id_key` = field JSON yang sudah diverifikasi sama dengan slug href kartu HTML (SiteApi.discover),
+    supaya source_url (kunci upsert) identik di mode html & network. None → tebakan JSON_KEYS["id"].
+    """
+    if list_path is None:
+        _, items = find_json_list(payload)
+    else:
+        items = payload if list_path == "" else (json_get(payload, list_path) or [])
+    rows: List[Dict] = []
+    for it in items:
+        if not isinstance(it, dict):
+            continue
+        ext_id = json_get(it, id_key) if id_key else json_pick(it, "id")
+
+        lokasi = _json_text(json_pick(it, "lokasi"))
+        kab, prov = _json_text(json_pick(it, "kabupaten")), _json_text(json_pick(it, "provinsi"))
+        if kab or prov:
+            lokasi = " , ".join(x for x in (kab, prov) if x)
+
+        rows.append(_listing_row(
+            listing_json_url(base_root, ext_id),
+            _json_text(json_pick(it, "judul")),
+            _json_text(json_pick(it, "perusahaan")),
+            _normalize_lokasi(lokasi),
+            _json_date(json_pick(it, "tanggal")),
+            _json_int(json_pick(it, "pelamar")),
+            _json_int(json_pick(it, "kuota")),
+        ))
+    return rows
+
+def parse_detail_json(payload) -> Tuple[List[str], Optional[str]]:
+    """
+    Padanan parse_detail_program_studi + parse_detail_deskripsi untuk respons JSON detail.
+    Return: (daftar program studi, deskripsi ternormalisasi).
+    """
+    obj = payload
+    # respons umum: {"data": {...}} atau {"data": [{...}]}
+    if isinstance(obj, dict) and isinstance(obj.get("data"), (dict, list)):
+        obj = obj["data"]
+    if isinstance(obj, list):
+        obj = next((x for x in obj if isinstance(x, dict)), {})
+    if not isinstance(obj, dict):
+        return [], None
+
+    prodi: List[str] = []
+    raw = json_pick(obj, "program_studi")
+    if isinstance(raw, str):
+        # kadang berupa JSON string / teks dipisah koma/titik koma
+        try:
+            raw = json.loads(raw)
+        except Exception:
+            raw = re.split(r"[;,]", raw)
+    for v in (raw if isinstance(raw, list) else []):
+        t = _json_text(v)
+        if t and t not in prodi:
+            prodi.append(t)
+
+    desc = None
+    raw_desc = json_pick(obj, "deskripsi")
+    if raw_desc:
+        txt = str(raw_desc)
+        if "<" in txt and ">" in txt:
+            soup = BeautifulSoup(txt, "lxml")
+            parts = []
+            for el in soup.find_all(["p", "li"]):
+                t = el.get_text(" ", strip=True)
+                if t:
+                    parts.append(("• " + t) if el.name == "li" else t)
+            parts = parts or [soup.get_text("\n", strip=True)]
+        else:
+            parts = [ln.strip() for ln in txt.splitlines() if ln.strip()]
+        desc = _normalize_deskripsi(parts)
+    return prodi, desc
+
+def apply_detail_json(row: Dict, payload) -> Dict:
+    """Padanan apply_detail_fields untuk respons JSON detail."""
+    prodi_list, desc = parse_detail_json(payload)
+    if prodi_list:
+        row["sektor"] = "; ".join(prodi_list)
+    if desc:
+        row["deskripsi_short"] = desc[:1200]
+    return row
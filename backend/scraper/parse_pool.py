@@ -0,0 +1,98 @@
+# backend/scraper/parse_pool.py
+import asyncio, multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from ..settings import settings
+from .parse import parse_listing_with_total, parse_detail_fields, set_detail_fields
+
+
+class ParsePool:
+    """
+    Stage parse berbasis ProcessPoolExecutor: HTML mentah masuk, hasil parse (list/tuple biasa) keluar.
+    Parsing BeautifulSoup/lxml yang CPU-bound jadi skala dengan jumlah core dan tidak lagi berebut GIL
+    dengan thread fetch/enrich.
+
+    - `workers` = 0 → parse inline di thread pemanggil (perilaku lama, tanpa proses tambahan)
+    - start method "spawn": proses induk sudah punya thread Playwright, fork tidak aman
+    - worker mati (BrokenProcessPool) → log lalu lanjut inline
+    """
+    def __init__(self, workers: int = None, backend: str = None):
+        self.workers = max(0, settings.PARSE_WORKERS if workers is None else workers)
+        # backend dikirim eksplisit ke worker (settings yang diubah saat runtime tidak ikut ke proses spawn)
+        self.backend = backend or settings.LISTING_PARSER
+        self._ex: Optional[ProcessPoolExecutor] = None
+        if self.workers > 0:
+            self._ex = ProcessPoolExecutor(max_workers=self.workers,
+                                           mp_context=multiprocessing.get_context("spawn"))
+
+    @property
+    def parallel(self) -> bool:
+        return self._ex is not None
+
+    def _submit(self, fn, *args) -> Future:
+        if self._ex is not None:
+            try:
+                return self._ex.submit(fn, *args)
+            except (BrokenProcessPool, RuntimeError) as e:
+                self._fallback(e)
+        fut = Future()
+        try:
+            fut.set_result(fn(*args))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def _result(self, fut: Future, fn, *args):
+        try:
+            return fut.result()
+        except BrokenProcessPool as e:
+            self._fallback(e)
+            return fn(*args)
+
+    def _fallback(self, e):
+        if self._ex is not None:
+            print(f"[WARN] Parse pool rusak ({e}); parse inline.", flush=True)
+            self._ex.shutdown(wait=False, cancel_futures=True)
+            self._ex = None
+
+    # ---- listing ----
+    def submit_listing(self, html: str) -> Future:
+        return self._submit(parse_listing_with_total, html, self.backend)
+
+    def listing_result(self, fut: Future, html: str) -> Tuple[List[Dict], Optional[int]]:
+        return self._result(fut, parse_listing_with_total, html, self.backend)
+
+    # ---- detail ----
+    def submit_detail(self, html: str) -> Future:
+        return self._submit(parse_detail_fields, html)
+
+    def detail_result(self, fut: Future, html: str) -> Tuple[List[str], Optional[str]]:
+        return self._result(fut, parse_detail_fields, html)
+
+    def apply_detail(self, row: Dict, html: str) -> Dict:
+        """Pengganti apply_detail_fields(row, html) yang mem-parse di worker proses."""
+        return set_detail_fields(row, *self.detail_result(self.submit_detail(html), html))
+
+    async def apply_detail_async(self, row: Dict, html: str) -> Dict:
+        if self._ex is None:
+            return await asyncio.to_thread(self.apply_detail, row, html)
+        fut = self.submit_detail(html)
+        try:
+            fields = await asyncio.wrap_future(fut)
+        except BrokenProcessPool as e:
+            self._fallback(e)
+            fields = await asyncio.to_thread(parse_detail_fields, html)
+        return set_detail_fields(row, *fields)
+
+    def close(self):
+        if self._ex is not None:
+            self._ex.shutdown(wait=True, cancel_futures=True)
+            self._ex = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,56 @@
+# backend/scraper/pipeline.py
+import queue, threading
+
+# penanda akhir aliran di setiap queue
+DONE = object()
+
+
+class BoundedPipeline:
+    """
+    Kerangka kecil pipeline thread + queue.Queue(maxsize) (backpressure).
+    - `spawn` menjalankan stage di thread; exception di stage mana pun menghentikan semua stage
+    - `put`/`get` tidak pernah macet selamanya: keduanya berhenti begitu pipeline di-stop
+    - `join` menunggu semua stage lalu me-raise error pertama (kalau ada)
+    """
+    def __init__(self):
+        self.stop = threading.Event()
+        self.errors = []
+        self._threads = []
+
+    def queue(self, maxsize: int) -> "queue.Queue":
+        return queue.Queue(maxsize=max(1, maxsize))
+
+    def put(self, q: "queue.Queue", item) -> bool:
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, q: "queue.Queue"):
+        while True:
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                if self.stop.is_set():
+                    return DONE
+
+    def spawn(self, fn, *args, name: str = None) -> threading.Thread:
+        def run():
+            try:
+                fn(*args)
+            except BaseException as e:
+                self.errors.append(e)
+                self.stop.set()
+        t = threading.Thread(target=run, name=name, daemon=True)
+        t.start()
+        self._threads.append(t)
+        return t
+
+    def join(self):
+        for t in self._threads:
+            t.join()
+        if self.errors:
+            raise self.errors[0]
@@ -0,0 +1,188 @@
+# backend/scraper/pool.py
+import queue, threading
+from concurrent.futures import Future
+from ..settings import settings
+from .fetch import FetchResult, render_detail_page
+from .intercept import install_blocking
+
+_STOP = object()
+
+
+class _Slot:
+    """
+    Satu browser Chromium + context + page hangat milik SATU thread worker.
+    Objek Playwright sync terikat ke thread yang membuatnya, jadi slot tidak boleh disentuh thread lain.
+    """
+    def __init__(self, idx: int, max_pages: int):
+        self.idx = idx
+        self.max_pages = max(1, max_pages)
+        self._pw = None
+        self.browser = None
+        self.ctx = None
+        self.page = None
+        self.pages_served = 0   # jumlah halaman sejak context terakhir dibuat
+        self.launches = 0
+        self.recycles = 0
+        self.crashes = 0
+        self.retries = 0        # render yang diulang setelah crash/timeout
+
+    def alive(self) -> bool:
+        try:
+            return (self.browser is not None and self.browser.is_connected()
+                    and self.page is not None and not self.page.is_closed())
+        except Exception:
+            return False
+
+    def _ensure(self):
+        if self._pw is None:
+            from playwright.sync_api import sync_playwright
+            self._pw = sync_playwright().start()
+        if self.browser is None or not self.browser.is_connected():
+            self._close_browser()
+            self.browser = self._pw.chromium.launch(headless=True)
+            self.launches += 1
+        if self.ctx is None:
+            self.ctx = self.browser.new_context(user_agent=settings.USER_AGENT,
+                                                viewport={"width": 1366, "height": 900})
+            install_blocking(self.ctx)
+            self.page = None
+            self.pages_served = 0
+        if self.page is None or self.page.is_closed():
+            self.page = self.ctx.new_page()
+
+    def render(self, url: str) -> str:
+        self._ensure()
+        html = render_detail_page(self.page, url)
+        self.pages_served += 1
+        # recycle context berkala supaya memori/cache tab tidak menumpuk
+        if self.pages_served >= self.max_pages:
+            self.recycle()
+        return html
+
+    def recycle(self):
+        """Tutup context (beserta page) saja; browser tetap hangat."""
+        try:
+            if self.ctx is not None:
+                self.ctx.close()
+        except Exception:
+            pass
+        self.ctx = None
+        self.page = None
+        self.recycles += 1
+
+    def reset(self):
+        """Crash recovery: buang browser sepenuhnya, launch ulang di job berikutnya."""
+        self.crashes += 1
+        self._close_browser()
+
+    def _close_browser(self):
+        try:
+            if self.browser is not None:
+                self.browser.close()
+        except Exception:
+            pass
+        self.browser = None
+        self.ctx = None
+        self.page = None
+
+    def close(self):
+        self._close_browser()
+        try:
+            if self._pw is not None:
+                self._pw.stop()
+        except Exception:
+            pass
+        self._pw = None
+
+
+class DetailBrowserPool:
+    """
+    Pool browser Playwright yang hidup sepanjang run untuk enrichment halaman detail.
+
+    - `size` thread worker, masing-masing memegang satu browser + page hangat (_Slot)
+    - context di-recycle setiap `max_pages_per_context` halaman
+    - kalau browser crash/putus → slot di-reset lalu job dicoba ulang (maks `retries` kali)
+
+    Dipakai dari thread mana pun lewat `fetch(url)` (blocking) atau `submit(url)` (Future).
+    """
+    def __init__(self, size: int = None, max_pages_per_context: int = None, retries: int = None):
+        self.size = max(1, size or settings.DETAIL_WORKERS)
+        self.max_pages_per_context = max_pages_per_context or settings.DETAIL_PAGES_PER_CONTEXT
+        self.retries = settings.DETAIL_POOL_RETRIES if retries is None else max(0, retries)
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._slots = [_Slot(i, self.max_pages_per_context) for i in range(self.size)]
+        self._threads = []
+        self._closed = False
+        for slot in self._slots:
+            t = threading.Thread(target=self._worker, args=(slot,),
+                                 name=f"detail-pool-{slot.idx}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    # ---- API ----
+    def submit(self, url: str) -> Future:
+        if self._closed:
+            raise RuntimeError("DetailBrowserPool sudah ditutup")
+        fut = Future()
+        self._jobs.put((url, fut))
+        return fut
+
+    def fetch(self, url: str) -> FetchResult:
+        return self.submit(url).result()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "launches": sum(s.launches for s in self._slots),
+            "recycles": sum(s.recycles for s in self._slots),
+            "crashes": sum(s.crashes for s in self._slots),
+            "retries": sum(s.retries for s in self._slots),
+        }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._jobs.put(_STOP)
+        for t in self._threads:
+            t.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---- internal ----
+    def _render(self, slot: _Slot, url: str) -> str:
+        last = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                slot.retries += 1
+            try:
+                return slot.render(url)
+            except Exception as e:
+                last = e
+                # browser mati → launch ulang; kalau cuma page/timeout → cukup context baru
+                if slot.alive():
+                    slot.recycle()
+                else:
+                    slot.reset()
+        raise last
+
+    def _worker(self, slot: _Slot):
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is _STOP:
+                    break
+                url, fut = job
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    fut.set_result(FetchResult(url, self._render(slot, url)))
+                except BaseException as e:
+                    fut.set_exception(e)
+        finally:
+            slot.close()
@@ -0,0 +1,136 @@
+# backend/scraper/readiness.py
+"""
+Readiness berbasis kondisi DOM (pengganti time.sleep / wait_for_timeout / networkidle):
+1) "present": tanda halaman sudah ter-render (kartu listing ada & berubah, label detail ada)
+2) "stable" : signature DOM (jumlah kartu/chip + panjang teks) tidak berubah selama READY_STABLE_MS
+
+Waktu fase 2 dicatat per jenis halaman dan dibandingkan dengan sleep tetap yang digantikannya
+(`budget`), jadi ringkasan `ready_stats` menunjukkan berapa detik yang dihemat.
+"""
+import itertools, threading
+from time import perf_counter
+from typing import Dict, Optional
+
+from ..settings import settings
+
+LISTING_CARD_SELECTOR = "a.v-card.v-card--flat.v-card--link[href*='/lowongan/view/']"
+
+# signature halaman (string) atau null kalau belum siap
+_SIGNATURE_JS = {
+    # arg = teks kartu pertama SEBELUM klik (null saat goto) → belum siap selama masih sama
+    "listing": """(before) => {
+        const cards = document.querySelectorAll("%s");
+        if (!cards.length) return null;
+        const first = (cards[0].innerText || "").trim();
+        if (before !== null && first === (before || "").trim()) return null;
+        return cards.length + "|" + first;
+    }""" % LISTING_CARD_SELECTOR.replace('"', '\\"'),
+    # label Program Studi / Deskripsi muncul; chip Program Studi ikut dihitung di signature
+    "detail": """() => {
+        const labels = Array.from(document.querySelectorAll("label")).map(l => (l.innerText || "").trim());
+        const ok = labels.some(t => t.startsWith("Program Studi") || t.startsWith("Deskripsi"));
+        if (!ok) return null;
+        return document.querySelectorAll(".v-chip__content").length + "|" + document.body.innerText.length;
+    }""",
+    # halaman umum (mis. beranda): teks body sudah berisi & (kalau ada) angka statistik h4 terisi
+    "page": """() => {
+        const body = document.body;
+        const text = body ? (body.innerText || "") : "";
+        if (text.trim().length < 200) return null;
+        return text.length + "|" + document.querySelectorAll("h4").length;
+    }""",
+}
+
+# dirakit per jenis (tanpa eval: aman untuk halaman ber-CSP)
+_PRESENT_JS = {k: "(arg) => (%s)(arg) !== null" % fn for k, fn in _SIGNATURE_JS.items()}
+_STABLE_JS = {k: """([arg, token, stableMs]) => {
+    const sig = (%s)(arg);
+    const st = (window.__mpReady = window.__mpReady || {});
+    const now = performance.now();
+    const prev = st[token];
+    if (sig === null || !prev || prev.sig !== sig) { st[token] = {sig: sig, t: now}; return false; }
+    return now - prev.t >= stableMs;
+}""" % fn for k, fn in _SIGNATURE_JS.items()}
+
+_tokens = itertools.count(1)
+
+
+class ReadinessStats:
+    """Akumulator thread-safe: per jenis → jumlah wait, detik menunggu (fase stable), detik hemat vs sleep tetap."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, float]] = {}
+
+    def record(self, kind: str, waited: float, budget: float, ok: bool):
+        with self._lock:
+            d = self._data.setdefault(kind, {"n": 0, "timeouts": 0, "waited": 0.0, "saved": 0.0})
+            d["n"] += 1
+            d["timeouts"] += 0 if ok else 1
+            d["waited"] += waited
+            d["saved"] += budget - waited
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._data.items()}
+
+    def report(self):
+        for kind, d in sorted(self.snapshot().items()):
+            n = max(1, d["n"])
+            print(f"[time] Readiness {kind}: n={d['n']} timeouts={d['timeouts']} "
+                  f"avg_wait={d['waited']/n:0.2f}s saved≈{d['saved']:0.1f}s "
+                  f"({d['saved']/n:0.2f}s/page vs fixed sleeps)", flush=True)
+
+
+ready_stats = ReadinessStats()
+
+
+def wait_ready(page, kind: str, budget: float = 0.0, timeout: int = 30_000,
+               arg: Optional[str] = None, nudge: bool = False, label: Optional[str] = None) -> bool:
+    """
+    Tunggu halaman `kind` ("listing"|"detail"|"page") siap lalu stabil. `budget` = detik sleep tetap yang
+    digantikan (untuk statistik). `nudge` → scroll ke bawah sekali (lazy-load) sebelum fase stable.
+    Return False kalau timeout (pemanggil tetap boleh ambil page.content()).
+    """
+    try:
+        page.wait_for_function(_PRESENT_JS[kind], arg=arg, timeout=timeout, polling=100)
+    except Exception:
+        ready_stats.record(label or kind, 0.0, 0.0, False)
+        return False
+    if nudge:
+        try:
+            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        except Exception:
+            pass
+    t0 = perf_counter()
+    ok = True
+    try:
+        page.wait_for_function(_STABLE_JS[kind], arg=[arg, f"t{next(_tokens)}", settings.READY_STABLE_MS],
+                               timeout=timeout, polling=100)
+    except Exception:
+        ok = False
+    ready_stats.record(label or kind, perf_counter() - t0, budget, ok)
+    return ok
+
+
+async def wait_ready_async(page, kind: str, budget: float = 0.0, timeout: int = 30_000,
+                           arg: Optional[str] = None, nudge: bool = False, label: Optional[str] = None) -> bool:
+    """Versi async (playwright.async_api) dari wait_ready."""
+    try:
+        await page.wait_for_function(_PRESENT_JS[kind], arg=arg, timeout=timeout, polling=100)
+    except Exception:
+        ready_stats.record(label or kind, 0.0, 0.0, False)
+        return False
+    if nudge:
+        try:
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        except Exception:
+            pass
+    t0 = perf_counter()
+    ok = True
+    try:
+        await page.wait_for_function(_STABLE_JS[kind], arg=[arg, f"t{next(_tokens)}", settings.READY_STABLE_MS],
+                                     timeout=timeout, polling=100)
+    except Exception:
+        ok = False
+    ready_stats.record(label or kind, perf_counter() - t0, budget, ok)
+    return ok
@@ -0,0 +1,173 @@
+# backend/scraper/reparse.py
+"""
+Bangun ulang tabel lowongan dari arsip HTML/JSON mentah (HTML_ARCHIVE_DIR) tanpa menyentuh situs —
+misalnya setelah bug parser diperbaiki.
+
+    python -m backend.scraper.reparse [--run RUN_ID] [--prune] [--dry-run]
+
+- listing: snapshot milik run terakhir (atau `--run`), urutan sesuai manifest
+- detail : snapshot terbaru per source_url dari run mana pun (HTML atau JSON)
+- --prune: hapus baris lowongan yang source_url-nya tidak ada di listing run tersebut
+"""
+import argparse, json, sys
+from collections import deque
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional
+
+from backend.settings import settings
+from backend.models import (upsert_lowongan, recompute_perusahaan, load_lowongan_index, delete_lowongan,
+                            upsert_site_stats)
+from backend.scraper.archive import HtmlArchive, DETAIL_KINDS
+from backend.scraper.netcapture import SiteApi
+from backend.scraper.parse import parse_listing_json, apply_detail_json, set_detail_fields
+from backend.scraper.parse_pool import ParsePool
+from backend.scraper.run_full_scrape import init_db, _base_root, _finalize_row, fmt_dur
+
+
+def _windowed(items, submit, result, window: int) -> Iterator:
+    """submit() maks `window` item sekaligus, yield (item, result) sesuai urutan masuk."""
+    inflight = deque()
+    for it in items:
+        inflight.append((it, submit(it)))
+        if len(inflight) >= window:
+            it0, fut = inflight.popleft()
+            yield it0, result(it0, fut)
+    while inflight:
+        it0, fut = inflight.popleft()
+        yield it0, result(it0, fut)
+
+
+def reparse(run_id: Optional[str] = None, prune: bool = False, dry_run: bool = False,
+            archive_dir: Optional[str] = None) -> Dict:
+    archive = HtmlArchive(archive_dir or settings.HTML_ARCHIVE_DIR)
+    base_root = _base_root()
+    t0 = perf_counter()
+    run_id, listing, latest = archive.select(run_id)
+    detail = {u: e for u, e in latest.items() if e.get("kind") in DETAIL_KINDS}
+    if not listing:
+        print(f"[WARN] Arsip {archive.root}: tidak ada snapshot listing untuk run {run_id!r}.", flush=True)
+        return {"run_id": run_id, "pages": 0, "rows": 0}
+    print(f"[STEP] Reparse run {run_id}: {len(listing)} halaman listing, {len(detail)} snapshot detail "
+          f"(arsip {archive.root})", flush=True)
+
+    api = SiteApi.load(base_root)
+    list_path = api.listing.get("list_path") if api is not None else None
+    id_key = api.listing.get("id_key") if api is not None else None
+    parser = ParsePool()
+    window = max(1, parser.workers * 2)
+    stats = {"run_id": run_id, "pages": 0, "rows": 0, "duplicates": 0, "with_detail": 0,
+             "kept_detail": 0, "missing_blob": 0, "pruned": 0}
+
+    def load(e):
+        try:
+            return archive.get(e["hash"])
+        except KeyError:
+            stats["missing_blob"] += 1
+            return None
+
+    # ---- listing ----
+    rows: List[Dict] = []
+    seen = set()
+
+    def submit_listing(e):
+        content = load(e)
+        if e["kind"] == "listing_json" and id_key is None:
+            return None, None  # tanpa id_key terverifikasi source_url JSON bisa beda dari mode html
+        if content is None or e["kind"] == "listing_json":
+            return content, None
+        return content, parser.submit_listing(content)
+
+    def listing_result(e, pending):
+        content, fut = pending
+        if content is None:
+            return []
+        if fut is None:
+            return parse_listing_json(json.loads(content), base_root, list_path, id_key)
+        return parser.listing_result(fut, content)[0]
+
+    try:
+        for e, page_rows in _windowed(listing, submit_listing, listing_result, window):
+            stats["pages"] += 1
+            for r in page_rows:
+                _finalize_row(r, base_root)
+                r["fetched_at"] = e.get("fetched_at") or r.get("fetched_at")
+                url = r.get("source_url")
+                if url:
+                    if url in seen:
+                        stats["duplicates"] += 1
+                        continue
+                    seen.add(url)
+                rows.append(r)
+
+        # ---- detail ----
+        def submit_detail(r):
+            e = detail.get(r.get("source_url"))
+            content = load(e) if e is not None else None
+            if content is None or e["kind"] == "detail_json":
+                return content, None
+            return content, parser.submit_detail(content)
+
+        def detail_result(r, pending):
+            content, fut = pending
+            if content is None:
+                return False
+            if fut is None:
+                apply_detail_json(r, json.loads(content))
+            else:
+                set_detail_fields(r, *parser.detail_result(fut, content))
+            return True
+
+        # baris tanpa snapshot detail di arsip: sektor/deskripsi hasil enrich yang sudah ada di DB dipertahankan
+        # (upsert menimpa kolom itu dengan excluded.*, jadi None di sini akan menghapus enrichment lama)
+        existing = load_lowongan_index() if not dry_run else {}
+        batch = max(1, settings.UPSERT_BATCH)
+        buf: List[Dict] = []
+        for r, applied in _windowed(rows, submit_detail, detail_result, window):
+            stats["with_detail"] += 1 if applied else 0
+            prev = None if applied else existing.get(r.get("source_url"))
+            if prev:
+                r["sektor"] = prev["sektor"]
+                r["deskripsi_short"] = prev["deskripsi_short"]
+                stats["kept_detail"] += 1
+            buf.append(r)
+            if len(buf) >= batch:
+                if not dry_run:
+                    upsert_lowongan(buf)
+                stats["rows"] += len(buf)
+                buf = []
+        if buf and not dry_run:
+            upsert_lowongan(buf)
+        stats["rows"] += len(buf)
+    finally:
+        parser.close()
+
+    if prune:
+        stale = [u for u in load_lowongan_index() if u not in seen]
+        stats["pruned"] = len(stale)
+        if stale and not dry_run:
+            delete_lowongan(stale)
+    if not dry_run:
+        recompute_perusahaan()
+        upsert_site_stats()  # tanpa argumen: hanya menaikkan snapshot_id → cache respons API ter-invalidasi
+
+    print(f"[time] Reparse complete: pages={stats['pages']} rows={stats['rows']} dup={stats['duplicates']} "
+          f"with_detail={stats['with_detail']} kept_detail={stats['kept_detail']} missing_blob={stats['missing_blob']} pruned={stats['pruned']} "
+          f"dry_run={dry_run} in {fmt_dur(perf_counter()-t0)}", flush=True)
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Rebuild tabel lowongan dari arsip HTML tanpa crawl ulang")
+    ap.add_argument("--run", dest="run_id", default=None, help="run_id sumber listing (default: run terakhir)")
+    ap.add_argument("--prune", action="store_true", help="hapus lowongan yang tidak ada di listing run tsb")
+    ap.add_argument("--dry-run", action="store_true", help="parse saja, tidak menulis DB")
+    ap.add_argument("--archive-dir", default=None, help="override HTML_ARCHIVE_DIR")
+    args = ap.parse_args(argv)
+    if not args.dry_run:
+        init_db()
+    stats = reparse(args.run_id, prune=args.prune, dry_run=args.dry_run, archive_dir=args.archive_dir)
+    return 0 if stats["pages"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# backend/scraper/replay.py
+"""
+Mode replay offline: sajikan halaman yang terekam di arsip HTML (HTML_ARCHIVE_DIR, lihat archive.py)
+lewat server HTTP lokal, supaya scraper bisa dijalankan end-to-end tanpa jaringan.
+
+    # rekam: run biasa dengan HTML_ARCHIVE=1 → listing, detail & beranda masuk arsip
+    python -m backend.scraper.run_full_scrape
+    # sajikan saja (BASE_URL=http://127.0.0.1:8765/lowongan untuk proses lain)
+    python -m backend.scraper.replay serve [--port 8765] [--run RUN_ID] [--latency-ms 50]
+    # server + run_full_scrape.main di proses yang sama, tulis ke SQLite terpisah
+    python -m backend.scraper.replay run --db /tmp/replay.sqlite [--latency-ms 50]
+
+Yang disajikan: /lowongan dan /lowongan?page=N (listing run terpilih), /lowongan/view/<id> (detail
+terbaru), / (beranda). Script asli situs dibuang (DOM sudah ter-render saat direkam); diganti script
+kecil yang membuat tombol v-pagination memuat /lowongan?page=N lalu menukar isi body — perilaku yang
+sama dengan klik Next di SPA, jadi fetch.py (klik, readiness wait, lompat halaman) tetap teruji.
+Hanya mode FETCH_MODE=html; endpoint JSON (network mode) tidak direplay.
+"""
+import argparse, os, re, sys, threading, time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from backend.settings import settings
+from backend.scraper.archive import HtmlArchive
+
+_SCRIPT_RX = re.compile(r"<script\b[^>]*>.*?</script\s*>", re.I | re.S)
+_PRELOAD_RX = re.compile(r"<link\b[^>]*\brel=[\"']?(?:modulepreload|preload|prefetch)[^>]*>", re.I)
+_HEAD_END_RX = re.compile(r"</head\s*>", re.I)
+
+# pagination v-pagination → fetch halaman target & tukar body (tanpa navigasi dokumen)
+REPLAY_JS = """<script>(() => {
+  const current = () => {
+    const a = document.querySelector("li.v-pagination__item--is-active");
+    const n = a ? parseInt((a.innerText || "").trim(), 10) : NaN;
+    return isNaN(n) ? (window.__replayPage || 1) : n;
+  };
+  document.addEventListener("click", async (ev) => {
+    const btn = ev.target.closest("button, a");
+    if (!btn || !btn.closest(".v-pagination")) return;
+    ev.preventDefault();
+    const label = (btn.getAttribute("aria-label") || "") + " " + (btn.innerText || "");
+    let n = null;
+    if (btn.closest(".v-pagination__next") || /next/i.test(label)) n = current() + 1;
+    else if (btn.closest(".v-pagination__prev") || /prev/i.test(label)) n = current() - 1;
+    else { const m = label.match(/(\\d+)/); if (m) n = parseInt(m[1], 10); }
+    if (!n || n < 1) return;
+    const res = await fetch("/lowongan?page=" + n);
+    if (!res.ok) return;
+    const doc = new DOMParser().parseFromString(await res.text(), "text/html");
+    document.body.innerHTML = doc.body.innerHTML;
+    window.__replayPage = n;
+    history.replaceState(null, "", "/lowongan?page=" + n);
+  }, true);
+})();</script>"""
+
+
+def _route_key(url: str) -> str:
+    u = urlsplit(url)
+    path = u.path.rstrip("/") or "/"
+    return f"{path}?{u.query}" if u.query else path
+
+
+def rewrite_html(html: str) -> str:
+    """Buang script/preload situs asli, sisipkan REPLAY_JS di <head>."""
+    html = _PRELOAD_RX.sub("", _SCRIPT_RX.sub("", html))
+    if _HEAD_END_RX.search(html):
+        return _HEAD_END_RX.sub(lambda m: REPLAY_JS + m.group(0), html, count=1)
+    return REPLAY_JS + html
+
+
+class ReplayStore:
+    """Peta path (+query halaman) → entri manifest; isi blob dibaca & ditulis ulang sesuai permintaan."""
+    def __init__(self, archive: HtmlArchive, run_id: Optional[str] = None):
+        self.archive = archive
+        self.run_id, listing, latest = archive.select(run_id)
+        self.routes: Dict[str, Dict] = {}
+        for e in latest.values():
+            if e.get("kind") in ("detail", "home"):
+                self.routes[_route_key(e["url"])] = e
+        for e in listing:
+            if e.get("kind") == "listing":
+                self.routes[_route_key(e["url"])] = e
+        # halaman 1 juga disajikan di /lowongan tanpa query (URL awal pagination)
+        first = self.routes.get("/lowongan?page=1")
+        if first is not None:
+            self.routes.setdefault("/lowongan", first)
+        self.pages = sum(1 for e in listing if e.get("kind") == "listing")
+        self._body = lru_cache(maxsize=512)(self._load)
+
+    def _load(self, digest: str) -> bytes:
+        return rewrite_html(self.archive.get(digest)).encode("utf-8")
+
+    def lookup(self, path: str) -> Optional[bytes]:
+        e = self.routes.get(_route_key(path))
+        if e is None:
+            return None
+        try:
+            return self._body(e["hash"])
+        except KeyError:
+            return None
+
+
+def _make_handler(store: ReplayStore, latency: float, counts: Dict[str, int], lock: threading.Lock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if latency > 0:
+                time.sleep(latency)
+            body = store.lookup(self.path)
+            with lock:
+                counts["hit" if body is not None else "miss"] += 1
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+class ReplayServer:
+    """ThreadingHTTPServer di thread daemon; `url` = root situs pengganti (tanpa /lowongan)."""
+    def __init__(self, store: ReplayStore, host: str = "127.0.0.1", port: int = 0, latency_ms: int = 0):
+        self.store = store
+        self.counts = {"hit": 0, "miss": 0}
+        handler = _make_handler(store, max(0, latency_ms) / 1000.0, self.counts, threading.Lock())
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="replay-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_store(archive_dir: Optional[str] = None, run_id: Optional[str] = None) -> ReplayStore:
+    store = ReplayStore(HtmlArchive(archive_dir or settings.HTML_ARCHIVE_DIR), run_id)
+    if not store.pages:
+        raise SystemExit(f"[ERROR] Arsip {store.archive.root}: tidak ada snapshot listing untuk run {store.run_id!r}.")
+    return store
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay halaman terekam di arsip HTML lewat HTTP lokal")
+    ap.add_argument("mode", choices=["serve", "run"], help="serve = server saja; run = server + run_full_scrape")
+    ap.add_argument("--run", dest="run_id", default=None, help="run_id sumber listing (default: run terakhir)")
+    ap.add_argument("--archive-dir", default=None, help="override HTML_ARCHIVE_DIR")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=None, help="default 8765 (serve) / port acak (run)")
+    ap.add_argument("--latency-ms", type=int, default=0, help="jeda buatan per response (simulasi jaringan)")
+    ap.add_argument("--db", default=None, help="[run] path SQLite tujuan (wajib; DB utama tidak disentuh)")
+    args = ap.parse_args(argv)
+
+    store = open_store(args.archive_dir, args.run_id)
+    port = args.port if args.port is not None else (8765 if args.mode == "serve" else 0)
+    server = ReplayServer(store, args.host, port, args.latency_ms).start()
+    print(f"[INFO] Replay run {store.run_id}: {store.pages} halaman listing, {len(store.routes)} route "
+          f"→ {server.url}/lowongan (latency {args.latency_ms} ms)", flush=True)
+    try:
+        if args.mode == "serve":
+            while True:
+                time.sleep(3600)
+        if not args.db:
+            ap.error("mode run butuh --db")
+        if settings.DATABASE_URL:
+            ap.error("mode run hanya menulis ke SQLite; kosongkan DATABASE_URL")
+        # scraper diarahkan ke server lokal; arsip dimatikan supaya replay tidak merekam dirinya sendiri
+        # (env juga diset: worker ParsePool ber-start "spawn" membaca settings dari env)
+        overrides = {"BASE_URL": f"{server.url}/lowongan", "DB_PATH": args.db, "HTML_ARCHIVE": "0"}
+        os.environ.update(overrides)
+        settings.BASE_URL, settings.DB_PATH, settings.HTML_ARCHIVE = overrides["BASE_URL"], args.db, False
+        from backend.scraper.run_full_scrape import main as scrape_main
+        scrape_main()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(f"[INFO] Replay server: hit={server.counts['hit']} miss={server.counts['miss']}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
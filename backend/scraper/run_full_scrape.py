@@ -1,20 +1,32 @@
 # backend/scraper/run_full_scrape.py
 import os
+from collections import Counter, deque
+from concurrent.futures import Future
 from urllib.parse import urljoin
 from datetime import datetime
+from hashlib import sha256
 from time import perf_counter  # + timing high-res
 
 from backend.settings import settings
 from backend.db import get_conn
 from backend.models import (
-    upsert_lowongan, recompute_perusahaan,
-    upsert_site_stats, replace_timeline
+    upsert_lowongan, recompute_perusahaan, lowongan_companies,
+    upsert_site_stats, replace_timeline, load_lowongan_index, backfill_program_studi
 )
-from backend.scraper.fetch import fetch_html, fetch_listing_pages_playwright, fetch_detail_html
-from backend.scraper.parse import (
-    parse_listing_page, parse_total_lowongan,
-    parse_home_stats, parse_timeline, parse_detail_program_studi, parse_detail_deskripsi
+from backend.scraper.fetch import (
+    fetch_html, iter_listing_pages_playwright, iter_listing_pages_sharded, fetch_detail_html
 )
+from backend.scraper.pool import DetailBrowserPool
+from backend.scraper.readiness import ready_stats
+from backend.scraper.intercept import block_stats
+from backend.scraper.async_enrich import enrich_stream
+from backend.scraper.pipeline import BoundedPipeline, DONE
+from backend.scraper.parse_pool import ParsePool
+from backend.scraper.archive import get_archive
+from backend.scraper.metrics import run_metrics
+from backend.scraper.checkpoint import CrawlCheckpoint
+from backend.scraper.netcapture import SiteApi
+from backend.scraper.parse import parse_home_stats, parse_timeline, apply_detail_fields, site_root
 
 from dotenv import load_dotenv
 load_dotenv()  # baca .env di root project
@@ -32,9 +44,10 @@ def fmt_dur(sec: float) -> str:
     return f"{sec:0.2f}s"
 
 class StepTimer:
-    """Context manager untuk print durasi step dengan prefix [time]."""
-    def __init__(self, label: str):
+    """Context manager untuk print durasi step dengan prefix [time]; `span` → dicatat juga di run_metrics."""
+    def __init__(self, label: str, span: str = None):
         self.label = label
+        self.span = span
         self.t0 = None
     def __enter__(self):
         self.t0 = perf_counter()
@@ -44,6 +57,8 @@ class StepTimer:
         dt = perf_counter() - self.t0
         status = "OK" if exc is None else "ERR"
         print(f"[time] ⏱ {self.label} [{status}] {fmt_dur(dt)}", flush=True)
+        if self.span:
+            run_metrics.add_span(self.span, dt)
 
 
 def _schema_path():
@@ -56,109 +71,406 @@ def _schema_path():
 def init_db():
     schema = _schema_path()
     with open(schema, "r", encoding="utf-8") as f, get_conn(settings.DB_PATH) as conn:
+        # SQLite lama tanpa lowongan_fts: index FTS diisi dari baris yang sudah ada (PG: kolom generated terisi sendiri)
+        new_fts = not settings.DATABASE_URL and conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'lowongan_fts'").fetchone() is None
         conn.executescript(f.read())
+        if new_fts:
+            conn.execute("INSERT INTO lowongan_fts(lowongan_fts) VALUES('rebuild')")
+        # SQLite tidak punya ADD COLUMN IF NOT EXISTS (PG: di schema_postgres.sql)
+        if not settings.DATABASE_URL:
+            cols = {r[1] for r in conn.execute("PRAGMA table_info(site_stats)").fetchall()}
+            for col, decl in (("snapshot_id", "INTEGER DEFAULT 0"), ("snapshot_at", "TEXT")):
+                if col not in cols:
+                    conn.execute(f"ALTER TABLE site_stats ADD COLUMN {col} {decl}")
+    # DB lama: tabel join program studi diisi dari kolom sektor yang sudah ada
+    n = backfill_program_studi()
+    if n:
+        print(f"[INFO] Backfill program_studi dari {n} lowongan", flush=True)
 
 
 def _base_root():
-    base = settings.BASE_URL.strip().rstrip("/")
-    return base.split("/lowongan")[0] if "/lowongan" in base else base
+    return site_root()
 
-def crawl_listing():
-    base_root = _base_root()
+def _make_enrich_one(api=None, pool=None, parser=None, archive=None):
+    """
+    Enrich satu baris (engine thread): endpoint JSON detail dulu kalau ada (SiteApi),
+    lalu render HTML lewat DetailBrowserPool / Playwright sebagai fallback.
+    `parser` (ParsePool) → parsing HTML detail di worker proses, bukan di thread ini.
+    `archive` (HtmlArchive) → HTML detail mentah disimpan untuk reparse offline.
+    """
+    def enrich_one(r):
+        url = r.get("source_url")
+        if not url:
+            return r
+        t0 = perf_counter()
+        try:
+            if api is not None and api.enrich(r):
+                run_metrics.inc("detail_ok")
+                return r
+            det = fetch_detail_html(url, pool=pool)
+            if archive is not None:
+                archive.put(url, det.html, "detail", digest=det.hash)
+            # Program Studi + Deskripsi
+            if parser is not None:
+                parser.apply_detail(r, det.html)
+            else:
+                apply_detail_fields(r, det.html)
+            run_metrics.inc("detail_ok" if (r.get("sektor") or r.get("deskripsi_short")) else "detail_empty")
+        except Exception as e:
+            run_metrics.inc("detail_fail")
+            run_metrics.error("enrich", e, url)
+        finally:
+            run_metrics.add_span("enrich", perf_counter() - t0)
+        return r
+    return enrich_one
 
-    # total dari halaman 1 (untuk estimasi)
-    first = fetch_html(f"{base_root}/lowongan")
-    total_lowongan = parse_total_lowongan(first.html)
+def _finalize_row(r, base_root):
+    """Lengkapi source_url absolut + content_hash (dipakai jalur HTML maupun JSON)."""
+    if (r.get("source_url") or "").startswith("/"):
+        r["source_url"] = urljoin(base_root, r["source_url"])
+    key = f"{r.get('judul')}|{r.get('perusahaan')}|{r.get('pelamar')}|{r.get('kuota')}|{r.get('tanggal_posting')}"
+    r["content_hash"] = sha256(key.encode("utf-8")).hexdigest()
+    return r
 
-    all_rows, pages_html = [], []
+def _iter_listing_source(base_root, api=None, start_page=1):
+    """
+    Stage sumber: yield ("rows", rows, total, page_no) per halaman JSON API, atau
+    ("html", html, None, page_no) per halaman listing yang di-render. Tidak ada yang ditumpuk di memori.
+    `start_page` > 1 → resume dari checkpoint (halaman sebelumnya dilewati).
+    """
+    if api is not None:
+        n = 0
+        try:
+            for page_no, rows, total in api.iter_listing_pages(settings.MAX_PAGES, start_page):
+                n += len(rows)
+                yield ("rows", rows, total, page_no)
+        except Exception as e:
+            print(f"[WARN] JSON API gagal di tengah ({e}); lanjut dengan {n} baris.", flush=True)
+        if n:
+            return
+        print("[WARN] JSON API tidak mengembalikan data; fallback ke render HTML.", flush=True)
 
     if settings.USE_PLAYWRIGHT:
-        print("[STEP] 1/4 Pagination with Playwright…", flush=True)
-        t_pag = perf_counter()
-        pages_html = fetch_listing_pages_playwright(base_root, settings.MAX_PAGES)
-        print(f"[time] Pagination collected {len(pages_html)} pages in {fmt_dur(perf_counter()-t_pag)}", flush=True)
-    else:
-        print("[WARN] Static mode: hanya ambil halaman 1.", flush=True)
-        pages_html = [fetch_html(f"{base_root}/lowongan").html]
-
-    # -------- Parse listing pages --------
-    from hashlib import sha256
-    print(f"[STEP] 2/4 Parsing {len(pages_html)} pages into cards…", flush=True)
-    t_parse = perf_counter()                                      
-    for pi, html in enumerate(pages_html, 1):        
-        rows = parse_listing_page(html)
+        shards = max(1, getattr(settings, "LISTING_SHARDS", 1))
+        if shards > 1:
+            print(f"[STEP] 1/4 Pagination with Playwright (sharded ×{shards})…", flush=True)
+            for page_no, html in iter_listing_pages_sharded(base_root, settings.MAX_PAGES, shards, start_page):
+                yield ("html", html, None, page_no)
+            return
+        print("[STEP] 1/4 Pagination with Playwright (streaming)…", flush=True)
+        pages = iter_listing_pages_playwright(base_root, settings.MAX_PAGES, start_page)
+        for page_no, html in enumerate(pages, start_page):
+            yield ("html", html, None, page_no)
+    elif start_page <= 1:
+        print("[WARN] Static mode: hanya ambil halaman 1 (pakai FETCH_MODE=network untuk paginasi via API).", flush=True)
+        yield ("html", fetch_html(f"{base_root}/lowongan").html, None, 1)
+
+def _is_unchanged(r, index):
+    """
+    Mode incremental: kartu yang content_hash-nya sama dengan di DB (dan sudah pernah ter-enrich)
+    tidak di-enrich ulang dan tidak di-upsert; sektor/deskripsi lamanya disalin dari index.
+    """
+    prev = index.get(r.get("source_url"))
+    if prev and prev["content_hash"] == r.get("content_hash") \
+            and (prev["sektor"] or prev["deskripsi_short"]):
+        r["sektor"] = prev["sektor"]
+        r["deskripsi_short"] = prev["deskripsi_short"]
+        return True
+    return False
+
+def crawl_listing(sink=None, checkpoint=None):
+    """
+    Pipeline streaming: pagination → parse → enrich → upsert.
+    Antar stage dihubungkan queue berkapasitas tetap (backpressure), jadi memori puncak datar:
+    halaman di-parse begitu ter-capture, kartu di-enrich begitu ter-parse, dan baris dikirim ke
+    `sink` (mis. upsert_lowongan) per UPSERT_BATCH begitu selesai — progres tetap tersimpan
+    walau run gagal di tengah. Tanpa `sink` = dry run (tidak menulis DB).
+
+    `checkpoint` (CrawlCheckpoint) → mulai dari halaman setelah watermark tersimpan, lewati
+    source_url yang sudah tersimpan di run ini, dan majukan watermark tiap batch ter-upsert.
+
+    Return: (summary, total_lowongan) — summary berisi counter + sampel baris, bukan semua baris.
+    """
+    base_root = _base_root()
+
+    # -------- Mode network: replay endpoint JSON situs (browser hanya untuk discovery) --------
+    api = None
+    if (getattr(settings, "FETCH_MODE", "html") or "html") == "network":
+        try:
+            api = SiteApi.discover(base_root, use_browser=settings.USE_PLAYWRIGHT)
+        except Exception as e:
+            print(f"[WARN] Network capture gagal ({e}); fallback ke render HTML.", flush=True)
+            api = None
+
+    # -------- INCREMENTAL: index content_hash dari DB --------
+    index = None
+    if getattr(settings, "INCREMENTAL", False):
+        t0 = perf_counter()
+        index = load_lowongan_index()
+        print(f"[INFO] Incremental: index={len(index)} rows loaded in {fmt_dur(perf_counter()-t0)}", flush=True)
+
+    enrich_on  = bool(getattr(settings, "DETAIL_ENRICH", True))
+    detail_max = max(0, getattr(settings, "DETAIL_MAX", 400))
+    engine     = (getattr(settings, "DETAIL_ENGINE", "threads") or "threads").lower()
+    use_async  = enrich_on and engine == "async" and not (api is not None and api.detail)
+    workers    = max(1, getattr(settings, "DETAIL_WORKERS", 6))
+    batch_size = max(1, getattr(settings, "UPSERT_BATCH", 200))
+    n_enrichers = (1 if use_async else workers) if enrich_on else 0
+
+    # snapshot HTML/JSON mentah → backend/archive (reparse offline tanpa crawl ulang)
+    archive = get_archive()
+    if archive is not None:
+        archive.run_id = checkpoint.run_id if checkpoint is not None else datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        if api is not None:
+            api.archive = archive
+
+    # parse listing/detail di worker proses (PARSE_WORKERS=0 → inline seperti dulu)
+    parser = ParsePool()
+    pool = None
+    if enrich_on and not use_async and getattr(settings, "DETAIL_POOL", True):
+        # satu browser hangat per worker; dipakai ulang lintas enrich_one (bukan launch per URL)
+        pool = DetailBrowserPool(size=workers)
+    enrich_one = _make_enrich_one(api=api, pool=pool, parser=parser, archive=archive)
+
+    print(f"[STEP] Pipeline: enrich={enrich_on} engine={'async' if use_async else 'threads'} "
+          f"enrichers={n_enrichers} detail_max={detail_max} batch={batch_size} pool={pool is not None} "
+          f"parse_workers={parser.workers}", flush=True)
+
+    pl = BoundedPipeline()
+    q_pages = pl.queue(getattr(settings, "PIPELINE_PAGE_QUEUE", 4))
+    q_cards = pl.queue(getattr(settings, "PIPELINE_CARD_QUEUE", 100))
+    q_rows  = pl.queue(batch_size * 2)
+    stats = {"pages": 0, "cards": 0, "duplicates": 0, "unchanged": 0, "resumed": 0,
+             "enrich_queued": 0, "total_lowongan": None}
+    seen_urls = set()  # dedup per source_url (halaman shard bisa overlap kalau listing bergeser)
+    start_page = checkpoint.start_page if checkpoint is not None else 1
+
+    source_errors = []
+
+    def stage_source():
+        t_start = t = perf_counter()
+        try:
+            for item in _iter_listing_source(base_root, api, start_page):
+                # latency per halaman listing = jarak antar halaman dari sumber (klik/goto + readiness)
+                now = perf_counter()
+                run_metrics.observe("listing_page" if item[0] == "html" else "listing_json", now - t)
+                if item[0] == "html":
+                    run_metrics.inc("bytes_fetched", len(item[1].encode("utf-8")))
+                if not pl.put(q_pages, item):
+                    return
+                t = perf_counter()  # waktu tunggu backpressure tidak dihitung
+        except Exception as e:
+            # jangan hentikan stage hilir: halaman yang sudah ter-capture tetap diproses & disimpan
+            source_errors.append(e)
+            run_metrics.error("pagination", e, log=False)
+            print(f"[WARN] Pagination gagal ({e}); memproses halaman yang sudah ter-capture.", flush=True)
+        finally:
+            run_metrics.add_span("pagination", perf_counter() - t_start)
+            pl.put(q_pages, DONE)
+
+    def handle_page(page_no, rows, total):
+        stats["pages"] += 1
+        stats["total_lowongan"] = stats["total_lowongan"] or total
         for r in rows:
-            if r.get("source_url", "").startswith("/"):
-                r["source_url"] = urljoin(base_root, r["source_url"])
-            key = f"{r.get('judul')}|{r.get('perusahaan')}|{r.get('pelamar')}|{r.get('kuota')}|{r.get('tanggal_posting')}"
-            r["content_hash"] = sha256(key.encode("utf-8")).hexdigest()
-        all_rows.extend(rows)
-        if pi % 10 == 0 or pi == len(pages_html):
-            print(f"[INFO]  … parsed pages {pi}/{len(pages_html)} (cards so far: {len(all_rows)})", flush=True)
-
-    print(f"[time] Parsed listing cards total: {len(all_rows)} in {fmt_dur(perf_counter()-t_parse)}", flush=True)  # +
-
-    # -------- ENRICH (Program Studi) --------
-    if getattr(settings, "DETAIL_ENRICH", True) and all_rows:
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        limit   = min(getattr(settings, "DETAIL_MAX", 400), len(all_rows))
-        workers = max(1, getattr(settings, "DETAIL_WORKERS", 6))
-        print(f"[STEP] 3/4 Enrich detail pages: limit={limit}, workers={workers}, playwright_detail={getattr(settings,'USE_PLAYWRIGHT_DETAIL', False)}", flush=True)
-
-        def enrich_one(r):
+            _finalize_row(r, base_root)
             url = r.get("source_url")
-            if not url:
-                return r
-            try:
-                det = fetch_detail_html(url)
-                # Program Studi
-                prodi_list = parse_detail_program_studi(det.html) or []
-                if prodi_list:
-                    r["sektor"] = "; ".join(prodi_list)
-
-                # Deskripsi (baru!)
-                desc = parse_detail_deskripsi(det.html)
-                if desc:
-                    # batasi agar tidak terlalu panjang (opsional)
-                    r["deskripsi_short"] = desc[:1200]
-            except Exception:
-                pass
-            return r
-        
-        # === ENRICH: Program Studi (sektor) dari halaman detail ===
-        # Aman: batasi jumlah parallelism implicit (disini sequential; bisa diparalelkan jika perlu)
-        # Ikuti throttle global via settings.THROTTLE_SECONDS (sudah diterapkan di fetch requests).
-            
-        t_enrich = perf_counter()
-        enriched = []
-        with ThreadPoolExecutor(max_workers=workers) as ex:
-            futures = [ex.submit(enrich_one, all_rows[i]) for i in range(limit)]
-            done = 0
-            for fut in as_completed(futures):
-                enriched.append(fut.result())
-                done += 1
-                if done % 50 == 0 or done == limit:               
-                    elapsed = perf_counter() - t_enrich           
-                    rate = done / elapsed if elapsed > 0 else 0.0
-                    print(f"[INFO]  … detail done {done}/{limit} • {rate:0.2f} jobs/s • elapsed {fmt_dur(elapsed)}", flush=True)
-
-        dt_enrich = perf_counter() - t_enrich
-        all_rows = enriched + all_rows[limit:]        
-        n_with = sum(1 for r in all_rows[:limit] if (r.get("sektor") or "").strip())
-        print(f"[time] Enrichment complete: with_prodi={n_with}/{limit} in {fmt_dur(dt_enrich)}", flush=True)
+            if url:
+                if url in seen_urls:
+                    stats["duplicates"] += 1
+                    continue
+                seen_urls.add(url)
+            stats["cards"] += 1
+            if index is not None and _is_unchanged(r, index):
+                stats["unchanged"] += 1
+                continue
+            if checkpoint is not None:
+                if r.get("source_url") in checkpoint.done:
+                    stats["resumed"] += 1
+                    continue
+                checkpoint.track(page_no, r)
+            if enrich_on and stats["enrich_queued"] < detail_max:
+                stats["enrich_queued"] += 1
+                pl.put(q_cards, r)
+            else:
+                pl.put(q_rows, r)
+        if checkpoint is not None:
+            checkpoint.page_parsed(page_no)
+        if stats["pages"] % 10 == 0:
+            print(f"[INFO]  … parsed pages {stats['pages']} (cards so far: {stats['cards']})", flush=True)
+
+    def stage_parse():
+        # HTML di-parse di worker proses (ParsePool); maks `window` halaman in-flight,
+        # hasilnya diproses sesuai urutan masuk
+        inflight = deque()
+        window = max(1, parser.workers * 2)
+
+        def pop_one():
+            page_no, html, fut = inflight.popleft()
+            t0 = perf_counter()
+            if html is None:
+                rows, total = fut.result()
+            else:
+                rows, total = parser.listing_result(fut, html)
+            handle_page(page_no, rows, total)
+            run_metrics.add_span("parse", perf_counter() - t0)
+
+        try:
+            while True:
+                item = pl.get(q_pages)
+                if item is DONE:
+                    break
+                kind, payload, total, page_no = item
+                if kind == "html":
+                    if archive is not None:
+                        archive.put(f"{base_root}/lowongan?page={page_no}", payload, "listing")
+                    inflight.append((page_no, payload, parser.submit_listing(payload)))
+                else:
+                    done = Future()
+                    done.set_result((payload, total))
+                    inflight.append((page_no, None, done))
+                while len(inflight) >= window:
+                    pop_one()
+            while inflight:
+                pop_one()
+        finally:
+            if enrich_on:
+                pl.put(q_cards, DONE)
+            pl.put(q_rows, DONE)
+
+    def stage_enrich_thread():
+        try:
+            while True:
+                r = pl.get(q_cards)
+                if r is DONE:
+                    pl.put(q_cards, DONE)  # teruskan ke worker lain
+                    break
+                if pl.stop.is_set():
+                    # stage lain gagal: kartu yang masih antre tidak di-render (get tetap mengembalikannya)
+                    break
+                pl.put(q_rows, enrich_one(r))
+        finally:
+            pl.put(q_rows, DONE)
+
+    def stage_enrich_async():
+        def get_row():
+            r = pl.get(q_cards)
+            return None if r is DONE or pl.stop.is_set() else r
+        try:
+            enrich_stream(get_row, lambda r: pl.put(q_rows, r), parser=parser, archive=archive)
+        finally:
+            pl.put(q_rows, DONE)
+
+    summary = {"cards": 0, "sent": 0, "with_prodi": 0, "unchanged": 0, "pages": 0,
+               "sample": [], "prodi_counts": Counter()}
+    buf = []
+
+    def flush():
+        if not buf:
+            return
+        if sink is not None:
+            t0 = perf_counter()
+            sink(list(buf))
+            run_metrics.add_span("upsert", perf_counter() - t0)
+            run_metrics.inc("rows_upserted", len(buf))
+        if checkpoint is not None:
+            checkpoint.flushed(buf)
+        summary["sent"] += len(buf)
+        buf.clear()
+
+    t_run = perf_counter()
+    pl.spawn(stage_source, name="pipeline-source")
+    pl.spawn(stage_parse, name="pipeline-parse")
+    if use_async:
+        pl.spawn(stage_enrich_async, name="pipeline-enrich-async")
     else:
-        print("[INFO] Detail enrichment disabled or no rows.", flush=True)
+        for i in range(n_enrichers):
+            pl.spawn(stage_enrich_thread, name=f"pipeline-enrich-{i}")
 
-    return all_rows, total_lowongan
+    # -------- Writer (thread utama): batch → sink --------
+    try:
+        pending_done = 1 + n_enrichers
+        while pending_done > 0:
+            r = pl.get(q_rows)
+            if r is DONE:
+                pending_done -= 1
+                continue
+            buf.append(r)
+            if (r.get("sektor") or "").strip():
+                summary["with_prodi"] += 1
+                for p in r["sektor"].split(";"):
+                    if p.strip():
+                        summary["prodi_counts"][p.strip()] += 1
+            if len(summary["sample"]) < 12:
+                summary["sample"].append(r)
+            if len(buf) >= batch_size:
+                flush()
+                elapsed = perf_counter() - t_run
+                rate = summary["sent"] / elapsed if elapsed > 0 else 0.0
+                print(f"[INFO]  … upserted {summary['sent']} rows • pages {stats['pages']} • cards {stats['cards']} "
+                      f"• {rate:0.2f} rows/s • elapsed {fmt_dur(elapsed)}", flush=True)
+        # baris yang sudah selesai tetap disimpan walau ada stage yang error
+        flush()
+    except BaseException:
+        pl.stop.set()
+        raise
+    finally:
+        try:
+            pl.join()
+        finally:
+            parser.close()
+            if pool is not None:
+                pool.close()
+                pool_stats = pool.stats()
+                print(f"[INFO] Browser pool: {pool_stats}", flush=True)
+                for k in ("launches", "recycles", "crashes", "retries"):
+                    run_metrics.inc(f"pool_{k}", pool_stats.get(k, 0))
+
+    summary.update(cards=stats["cards"], unchanged=stats["unchanged"], pages=stats["pages"])
+    for k in ("pages", "cards", "duplicates", "unchanged", "resumed", "enrich_queued"):
+        run_metrics.inc(k, stats[k])
+    print(f"[time] Pipeline complete: pages={stats['pages']} (from {start_page}) cards={stats['cards']} "
+          f"dup={stats['duplicates']} unchanged={stats['unchanged']} resumed_skip={stats['resumed']} "
+          f"enriched={stats['enrich_queued']} with_prodi={summary['with_prodi']} sent={summary['sent']} "
+          f"in {fmt_dur(perf_counter()-t_run)}", flush=True)
+    ready_stats.report()  # waktu tunggu readiness vs sleep tetap lama, per jenis halaman
+    block_stats.report()  # request/byte yang tidak diunduh browser (BLOCK_RESOURCES)
+    if archive is not None:
+        archive.report()
+    if source_errors:
+        raise source_errors[0]
+    return summary, stats["total_lowongan"]
 
 def crawl_home():
     base_root = _base_root()
     res = fetch_html(f"{base_root}/")
+    archive = get_archive()
+    if archive is not None:
+        archive.put(res.url, res.html, "home", digest=res.hash)
     perusahaan, lamaran = parse_home_stats(res.html)
     timeline = parse_timeline(res.html)
     return perusahaan, lamaran, timeline
 
-def main():
+def main(resume: bool = False, run_id: str = None):
+    """Run penuh + metrics: span/counter/histogram → tabel scrape_runs (& METRICS_TEXTFILE)."""
+    run_metrics.reset(run_id or getattr(settings, "RUN_ID", None))
+    ok = False
+    try:
+        _run(resume=resume, run_id=run_id)
+        ok = True
+    finally:
+        run_metrics.finish(ok)
+        if not ok:
+            # run gagal bisa sudah meng-upsert sebagian lowongan → versi snapshot tetap dinaikkan
+            # supaya cache respons API tidak menyajikan data sebelum run
+            try:
+                upsert_site_stats()
+            except Exception as e:
+                print(f"[WARN] Naikkan snapshot_id gagal: {e}", flush=True)
+        run_metrics.report()
+        run_metrics.save()
+
+def _run(resume: bool = False, run_id: str = None):
     t_all = perf_counter()  # + total wall-time
     from backend.settings import settings
     print(f"[cfg] MAX_PAGES={settings.MAX_PAGES} | DETAIL_MAX={getattr(settings,'DETAIL_MAX',None)} | "
@@ -167,22 +479,39 @@ def main():
     print("[STEP] 0/4 Init DB schema…", flush=True)
     
     
-    with StepTimer("Init DB schema"):                      
+    with StepTimer("Init DB schema", span="init"):                      
         init_db()
 
     print("[STEP] 1/4 Crawl listing (pagination + parsing)…", flush=True)
-    with StepTimer("Crawl listing (pagination + parsing + enrich)"):  
-        rows, total_low = crawl_listing()
-        print(f"[INFO] Crawl complete. Rows parsed: {len(rows)} • Est. total_lowongan: {total_low}", flush=True)
+    with StepTimer("Crawl listing (pagination + parsing + enrich)", span="crawl"):  
+        # checkpoint per run: resume lompat ke halaman tersimpan & lewati baris yang sudah masuk DB
+        checkpoint = CrawlCheckpoint.open(run_id or getattr(settings, "RUN_ID", None), resume=resume)
+        print(f"[INFO] run_id={checkpoint.run_id}", flush=True)
+        run_metrics.run_id = checkpoint.run_id
+        # baris di-upsert bertahap oleh crawl_listing (sink) begitu selesai di-enrich;
+        # perusahaan yang tersentuh (nama baru + nama lama baris itu) dicatat untuk recompute inkremental
+        touched = set()
+
+        def sink(rows):
+            touched.update(lowongan_companies([r.get("source_url") for r in rows]))
+            touched.update(r.get("perusahaan") for r in rows)
+            upsert_lowongan(rows)
+
+        resumed = bool(checkpoint.last_page or checkpoint.done)
+        summary, total_low = crawl_listing(sink=sink, checkpoint=checkpoint)
+        checkpoint.finish()
+        print(f"[INFO] Crawl complete. Cards: {summary['cards']} • upserted: {summary['sent']} • "
+              f"Est. total_lowongan: {total_low}", flush=True)
 
-    print("[STEP] 2/4 Upsert listing → DB…", flush=True)
-    with StepTimer("Upsert listing & recompute perusahaan"):           
-        upsert_lowongan(rows)
-        recompute_perusahaan()
-        print("[INFO] Upsert & recompute_perusahaan selesai.", flush=True)
+    print("[STEP] 2/4 Recompute perusahaan…", flush=True)
+    with StepTimer("Recompute perusahaan", span="recompute"):
+        # run resume: batch dari percobaan sebelumnya tidak tercatat di `touched` → hitung ulang semua
+        n = recompute_perusahaan(None if resumed else touched)
+        print(f"[INFO] recompute_perusahaan selesai ({'full' if resumed else 'incremental'}: {n} perusahaan).",
+              flush=True)
 
     print("[STEP] 3/4 Fetch home stats & timeline…", flush=True)
-    with StepTimer("Fetch home stats & timeline + upsert"):            
+    with StepTimer("Fetch home stats & timeline + upsert", span="home"):            
         perusahaan, lamaran, tl = crawl_home()
         upsert_site_stats(
             jumlah_perusahaan=perusahaan,
@@ -195,11 +524,12 @@ def main():
         print("[INFO] Home stats & timeline disimpan.", flush=True)
 
     # ---- LOG VERIFIKASI ENRICHMENT (tetap seperti punyamu) ----
-    n_with_prodi = sum(1 for r in rows if (r.get("sektor") or "").strip() != "")
+    rows = summary["sample"]
     print(
-        f"[SUMMARY] Lowongan upserted: {len(rows)} | total_lowongan={total_low} | "
+        f"[SUMMARY] Lowongan scraped: {summary['cards']} | upserted={summary['sent']} | "
+        f"unchanged={summary['unchanged']} | total_lowongan={total_low} | "
         f"perusahaan={perusahaan} | lamaran={lamaran} | timeline_items={len(tl or [])} | "
-        f"dengan_ProgramStudi={n_with_prodi}",
+        f"dengan_ProgramStudi={summary['with_prodi']}",
         flush=True
     )
 
@@ -210,16 +540,11 @@ def main():
         ])
         print("\n=== SAMPLE HASIL SCRAPE (head) ===", flush=True)
         print(df.head(12).to_string(index=False), flush=True)
-        # ringkasan unik prodi (10 contoh)
-        semua_prodi = []
-        for s in df["sektor"].dropna():
-            for p in str(s).split(";"):
-                p = p.strip()
-                if p: semua_prodi.append(p)
-        top = pd.Series(semua_prodi).value_counts().head(10) if semua_prodi else None
-        if top is not None:
+        # ringkasan unik prodi (10 contoh) — dihitung streaming di crawl_listing
+        top = summary["prodi_counts"].most_common(10)
+        if top:
             print("\nTop Program Studi (contoh):", flush=True)
-            print(top.to_string(), flush=True)
+            print(pd.Series(dict(top)).to_string(), flush=True)
     except Exception as e:
         # fallback simple print jika pandas tidak ada
         print("\n(pandas tidak tersedia / gagal cetak head, fallback list 5 baris)", flush=True)
@@ -229,4 +554,10 @@ def main():
     print(f"[DONE] 4/4 All tasks finished ✅ • total wall time {fmt_dur(perf_counter()-t_all)}", flush=True)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    ap = argparse.ArgumentParser(description="MagangPulse full scrape")
+    ap.add_argument("--resume", action="store_true",
+                    help="lanjutkan run yang belum selesai (run_id sama / run 'running' terakhir)")
+    ap.add_argument("--run-id", default=None, help="id run untuk checkpoint (default: RUN_ID / GITHUB_RUN_ID)")
+    args = ap.parse_args()
+    main(resume=args.resume, run_id=args.run_id)
\ No newline at end of file
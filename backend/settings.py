@@ -52,4 +52,105 @@ class Settings(BaseModel):
         # fallback ke USE_PLAYWRIGHT bila tidak diset
         default=_as_bool(os.getenv("USE_PLAYWRIGHT"), False))
 
+    # ==== Browser pool untuk enrichment detail (1 browser hangat per worker) ====
+    DETAIL_POOL: bool = _as_bool(os.getenv("DETAIL_POOL"), default=True)
+    # recycle context setiap N halaman detail (hindari memori tab menumpuk)
+    DETAIL_PAGES_PER_CONTEXT: int = int(os.getenv("DETAIL_PAGES_PER_CONTEXT", "50"))
+    # retry per URL setelah crash/timeout sebelum jatuh ke requests
+    DETAIL_POOL_RETRIES: int = int(os.getenv("DETAIL_POOL_RETRIES", "1"))
+
+    # ==== Engine enrichment: "threads" (sync + pool) | "async" (playwright.async_api) ====
+    DETAIL_ENGINE: str = os.getenv("DETAIL_ENGINE", "threads").strip().lower()
+    # maksimal page detail in-flight untuk engine async
+    DETAIL_CONCURRENCY: int = int(os.getenv("DETAIL_CONCURRENCY", "24"))
+    # jarak minimum (detik) antar *mulai* request ke host yang sama (engine async, non-blocking; 0 = off).
+    # Hanya meratakan lonjakan awal — jumlah page in-flight dibatasi DETAIL_CONCURRENCY
+    DETAIL_HOST_INTERVAL: float = float(os.getenv("DETAIL_HOST_INTERVAL", "0.2"))
+    # jumlah baris per batch upsert saat hasil di-stream ke DB
+    UPSERT_BATCH: int = int(os.getenv("UPSERT_BATCH", "200"))
+    # kapasitas queue antar stage pipeline (halaman HTML / kartu menunggu enrich)
+    PIPELINE_PAGE_QUEUE: int = int(os.getenv("PIPELINE_PAGE_QUEUE", "4"))
+    PIPELINE_CARD_QUEUE: int = int(os.getenv("PIPELINE_CARD_QUEUE", "100"))
+
+    # ==== Connection pool DB: PG → psycopg_pool.ConnectionPool; SQLite → koneksi WAL di-cache per thread (0 = koneksi baru per get_conn) ====
+    DB_POOL: bool = _as_bool(os.getenv("DB_POOL"), default=True)
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "4"))
+    # detik menunggu koneksi bebas dari pool (SQLite: busy timeout saat DB dikunci penulis lain)
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # koneksi PG di atas min_size yang idle selama N detik ditutup
+    DB_POOL_MAX_IDLE: float = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+    # health check sebelum koneksi dipinjamkan (PG: ping; SQLite: file DB masih sama)
+    DB_POOL_CHECK: bool = _as_bool(os.getenv("DB_POOL_CHECK"), default=True)
+
+    # ==== Cache statement SQL: LRU teks SQL terkonversi (PG) / cached_statements sqlite3, per koneksi ====
+    SQL_CACHE_SIZE: int = int(os.getenv("SQL_CACHE_SIZE", "256"))
+    # prepared statement server-side untuk query panas (matikan kalau lewat pgbouncer transaction-mode < 1.21)
+    PG_PREPARE: bool = _as_bool(os.getenv("PG_PREPARE"), default=True)
+
+    # ==== Pencarian /api/lowongan?query=: full-text (FTS5 / tsvector, prefix + ranking) | 0 = LIKE lama ====
+    SEARCH_FTS: bool = _as_bool(os.getenv("SEARCH_FTS"), default=True)
+
+    # ==== /api/lowongan/export: baris per batch yang diambil dari cursor DB & diserialisasi sekaligus ====
+    EXPORT_BATCH: int = int(os.getenv("EXPORT_BATCH", "1000"))
+
+    # ==== Cache respons endpoint baca (home/options/perusahaan/lowongan), di-key versi snapshot data (0 = off) ====
+    RESPONSE_CACHE: bool = _as_bool(os.getenv("RESPONSE_CACHE"), default=True)
+    # batas LRU in-process per worker: umur maksimum entri (detik), jumlah entri, total ukuran body (MB)
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "21600"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    RESPONSE_CACHE_MAX_MB: float = float(os.getenv("RESPONSE_CACHE_MAX_MB", "64"))
+    # opsional: file SQLite cache bersama antar worker gunicorn di host yang sama (kosong = tidak dipakai)
+    RESPONSE_CACHE_FILE: str | None = os.getenv("RESPONSE_CACHE_FILE") or None
+    # jarak minimum (detik) antar cek versi snapshot (site_stats.snapshot_id) ke DB
+    SNAPSHOT_CHECK_SECONDS: float = float(os.getenv("SNAPSHOT_CHECK_SECONDS", "60"))
+    # Cache-Control max-age untuk browser/CDN (revalidasi berikutnya lewat ETag → 304)
+    RESPONSE_CACHE_MAX_AGE: int = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "60"))
+
+    # ==== Postgres: upsert lowongan lewat COPY ke tabel staging + satu INSERT ... SELECT (0 = executemany) ====
+    PG_COPY_UPSERT: bool = _as_bool(os.getenv("PG_COPY_UPSERT"), default=True)
+
+    # ==== Incremental: skip enrich + upsert untuk kartu yang content_hash-nya tidak berubah ====
+    INCREMENTAL: bool = _as_bool(os.getenv("INCREMENTAL"), default=False)
+
+    # ==== Readiness: halaman dianggap siap kalau signature DOM-nya tidak berubah selama N ms ====
+    READY_STABLE_MS: int = int(os.getenv("READY_STABLE_MS", "300"))
+
+    # ==== Blokir resource non-esensial di browser scraper: off | lite (gambar/media/font/tracker) | strict (+CSS, pihak ketiga) ====
+    BLOCK_RESOURCES: str = os.getenv("BLOCK_RESOURCES", "lite").strip().lower()
+
+    # ==== Parser listing: "lxml" (satu pass, XPath terkompilasi) | "bs4" (BeautifulSoup, implementasi lama) ====
+    LISTING_PARSER: str = os.getenv("LISTING_PARSER", "lxml").strip().lower()
+
+    # ==== Worker proses untuk parsing HTML listing/detail (0 = parse inline di thread pipeline) ====
+    PARSE_WORKERS: int = int(os.getenv("PARSE_WORKERS", str(max(0, (os.cpu_count() or 1) - 1))))
+
+    # ==== Arsip HTML/JSON mentah (content-addressed, terkompresi) untuk reparse offline ====
+    # default off: di CI (scrape.yml) direktori arsip tidak disimpan, jadi biaya kompresi/tulis terbuang
+    HTML_ARCHIVE: bool = _as_bool(os.getenv("HTML_ARCHIVE"), default=False)
+    HTML_ARCHIVE_DIR: str = os.getenv(
+        "HTML_ARCHIVE_DIR",
+        os.path.abspath(os.path.join(os.path.dirname(__file__), "archive"))
+    )
+
+    # ==== Metrics run scraper: tabel scrape_runs selalu; file teks Prometheus kalau path diset ====
+    METRICS_TEXTFILE: str | None = os.getenv("METRICS_TEXTFILE") or None
+
+    # ==== Pagination listing paralel: >1 → rentang halaman dibagi ke N browser context ====
+    LISTING_SHARDS: int = int(os.getenv("LISTING_SHARDS", "1"))
+
+    # ==== Checkpoint/resume: id run (GitHub re-run memakai GITHUB_RUN_ID yang sama) ====
+    RUN_ID: str | None = os.getenv("RUN_ID") or os.getenv("GITHUB_RUN_ID") or None
+
+    # ==== Fetch mode: "html" (render Vuetify) | "network" (replay endpoint JSON/XHR situs) ====
+    FETCH_MODE: str = os.getenv("FETCH_MODE", "html").strip().lower()
+    # cache endpoint hasil network capture (dipakai ulang juga di static mode / tanpa browser)
+    API_ENDPOINTS_FILE: str = os.getenv(
+        "API_ENDPOINTS_FILE",
+        os.path.abspath(os.path.join(os.path.dirname(__file__), "api_endpoints.json"))
+    )
+    # opsional: override manual URL endpoint listing (GET, dengan parameter halaman)
+    API_LISTING_URL: str | None = os.getenv("API_LISTING_URL") or None
+    API_THROTTLE_SECONDS: float = float(os.getenv("API_THROTTLE_SECONDS", "0.25"))
+
 settings = Settings()
\ No newline at end of file
@@ -127,7 +127,7 @@ async function loadHome() {
   const url = `${API_BASE}/api/home`;
   let res;
   try{
-    res = await fetch(url, { cache: "no-store" });
+    res = await fetch(url, { cache: "no-cache" });  // no-cache: selalu revalidasi ke API (ETag → 304 tanpa body)
   }catch(e){
     console.error("Home fetch error:", e);
     renderTimeline([]);
@@ -202,7 +202,7 @@ async function fetchJobsPage(){
   while (tries < 3){
     tries++;
     try{
-      res = await fetch(url, { cache: "no-store" });
+      res = await fetch(url, { cache: "no-cache" });
       if(!res.ok) throw new Error(`HTTP ${res.status}`);
       json = await res.json(); break;
     }catch(e){
@@ -345,7 +345,7 @@ async function fetchSomeJobsForOptions(maxPages=3, pageSize=100){
     p.set("page", String(page));
     p.set("page_size", String(pageSize));
     p.set("sort", "recent");
-    const res = await fetch(`${API_BASE}/api/lowongan?`+p.toString(), { cache:"no-store" });
+    const res = await fetch(`${API_BASE}/api/lowongan?`+p.toString(), { cache:"no-cache" });
     if(!res.ok) break;
     const j = await res.json();
     total = j.total ?? 0;
@@ -385,7 +385,7 @@ async function loadCompanies(){
   const ord = $("#co-order")?.value || "desc";
   const sort = mapSort(k, ord);
   try{
-    const res = await fetch(`${API_BASE}/api/perusahaan?sort=${encodeURIComponent(sort)}&page=1&page_size=15`, { cache:"no-store" });
+    const res = await fetch(`${API_BASE}/api/perusahaan?sort=${encodeURIComponent(sort)}&page=1&page_size=15`, { cache:"no-cache" });
     const json = await res.json();
     const host = $("#companies");
     if (!host) return;
@@ -412,25 +412,27 @@ async function exportXLSX(){
   const all = [];
   // ambil snapshot filter saat ini
   const snap = { ...STATE };
-  let page = 1, total = Infinity;
+  let cursor = null;
 
-  while ((page-1)*100 < total){
+  // keyset: ikuti next_cursor (tiap halaman sama murahnya; COUNT hanya di halaman pertama)
+  while (true){
     const p = new URLSearchParams();
-    p.set("page", String(page)); p.set("page_size", "100");
+    p.set("page_size", "100");
+    p.set("with_total", "false");
     p.set("sort", snap.sort || "recent");
+    if (cursor) p.set("cursor", cursor);
     if (snap.q) p.set("query", snap.q);
-    if (snap.lokasi) p.set("lokasi", snap.lokasi);
-    if (snap.sektor) p.set("sektor", snap.sektor);
-    if (snap.perusahaan) p.set("perusahaan", snap.perusahaan);
+    (snap.lokasi||[]).forEach(v => p.append("lokasi", v));
+    (snap.sektor||[]).forEach(v => p.append("sektor", v));
+    (snap.perusahaan||[]).forEach(v => p.append("perusahaan", v));
     if (snap.min_ar != null && snap.min_ar!=="") p.set("min_ar", snap.min_ar);
     if (snap.max_ar != null && snap.max_ar!=="") p.set("max_ar", snap.max_ar);
 
     const res = await fetch(`${API_BASE}/api/lowongan?`+p.toString(), { cache:"no-store" });
     const j = await res.json();
-    total = j.total ?? 0;
     (j.data||[]).forEach(r=>all.push(r));
-    if (!(j.data||[]).length) break;
-    page++;
+    cursor = j.next_cursor;
+    if (!cursor || !(j.data||[]).length) break;
   }
 
   const rows = all.map(r=>({
@@ -451,6 +453,19 @@ async function exportXLSX(){
   XLSX.writeFile(wb, "magangpulse_lowongan.xlsx");
 }
 
+// ========= Export CSV (di-stream server dari /api/lowongan/export, filter sama dengan tabel) =========
+function exportCSV(){
+  const p = paramsFromState();
+  p.delete("page"); p.delete("page_size");
+  p.set("format", "csv");
+  const a = document.createElement("a");
+  a.href = `${API_BASE}/api/lowongan/export?` + p.toString();
+  a.download = "magangpulse_lowongan.csv";
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+}
+
 // ========= Init =========
 window.addEventListener("DOMContentLoaded", async () => {
   startCountdown();
@@ -525,6 +540,7 @@ window.addEventListener("DOMContentLoaded", async () => {
 
   // Export
   $("#btn-export")?.addEventListener("click", exportXLSX);
+  $("#btn-export-csv")?.addEventListener("click", exportCSV);
 });
 
 
@@ -567,7 +583,7 @@ window.addEventListener("DOMContentLoaded", async () => {
 // ========= Options endpoint (lebih akurat & cepat) =========
 async function loadOptions() {
   try {
-    const res = await fetch(`${API_BASE}/api/options`, { cache: "no-store" });
+    const res = await fetch(`${API_BASE}/api/options`, { cache: "no-cache" });
     if (!res.ok) throw new Error("HTTP " + res.status);
     const j = await res.json();
     msLokasi?.setOptions(j.lokasi || []);
@@ -37,9 +37,9 @@ async function searchJobs(q){
   const p = new URLSearchParams();
   p.set("page", "1");
   p.set("page_size", "10");
-  p.set("sort", "recent");
+  p.set("sort", "relevance");
   p.set("query", q);
-  const res = await fetch(`${API_BASE}/api/lowongan?`+p.toString(), {cache:"no-store"});
+  const res = await fetch(`${API_BASE}/api/lowongan?`+p.toString(), {cache:"no-cache"});
   if(!res.ok) return [];
   const j = await res.json();
   return j.data || [];